@@ -0,0 +1,111 @@
+import os
+import gc
+import copy
+import gzip
+import json
+import time
+import pickle
+import argparse
+import tracemalloc
+from datetime import datetime
+from langgraph.runtime import Runtime
+
+from generate_knowledge_graph.nodes import DataLoader, IntroBodySeparator, HeadingStructureParser
+from generate_knowledge_graph.pipeline import build_context
+
+
+BENCHMARK_RESULT_DIR = "./data/benchmark_results"
+
+
+def count_nodes(chunk) -> int:
+    return 1 + sum(count_nodes(child) for child in chunk.children)
+
+
+def traced_bytes(fn):
+    """fn()이 만든 객체 중 반환 시점에 살아 있는 메모리(바이트)와 결과"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = fn()
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return current, result
+
+
+def cache_entry_bytes(trees, dump) -> int:
+    return sum(
+        len(gzip.compress(json.dumps({k: dump(v) for k, v in children.items()}, ensure_ascii=False).encode("utf-8")))
+        for children in trees
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunk 트리 표현(SpanChunk vs content를 가진 Chunk)별 메모리/pickle 크기 비교")
+    parser.add_argument("--benchmark-name", default="maud")
+    parser.add_argument("--num-documents", type=int, default=None, help="기본은 전체 corpus")
+    args = parser.parse_args()
+
+    runtime = Runtime(context=build_context({"benchmark_name": args.benchmark_name}))
+    data_loader = DataLoader()
+    file_paths = data_loader.get_document_file_paths(args.benchmark_name)[:args.num_documents]
+    documents = list(data_loader.load_documents(args.benchmark_name, file_paths))
+    documents = IntroBodySeparator(None).process(documents, runtime)
+
+    # 본문(Document.content)은 두 표현이 공유하므로 트리 자체가 추가로 잡는 메모리만 비교
+    started = time.perf_counter()
+    # LLM 없이 만들 수 있는 트리(규칙 기반 파서)로 측정: SpanChunk 트리
+    span_bytes, documents = traced_bytes(lambda: HeadingStructureParser().process(documents, runtime))
+    build_seconds = time.perf_counter() - started
+    documents = [doc for doc in documents if doc.structure_source == "heading_parser"]
+    span_trees = [doc.children for doc in documents]
+
+    materialized_bytes, materialized_trees = traced_bytes(
+        lambda: [{k: v.to_chunk() for k, v in children.items()} for children in span_trees]
+    )
+
+    materialized_documents = []
+    for doc, children in zip(documents, materialized_trees):
+        materialized = copy.copy(doc)
+        materialized.children = children
+        materialized_documents.append(materialized)
+
+    started = time.perf_counter()
+    span_pickle = len(pickle.dumps(documents, protocol=pickle.HIGHEST_PROTOCOL))
+    span_pickle_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    materialized_pickle = len(pickle.dumps(materialized_documents, protocol=pickle.HIGHEST_PROTOCOL))
+    materialized_pickle_seconds = time.perf_counter() - started
+
+    # 표현이 달라도 그래프에 적재되는 content/해시는 같아야 함
+    identical = all(
+        a.model_dump() == b.model_dump() for a, b in zip(documents, materialized_documents)
+    )
+
+    result = {
+        "benchmark_name": args.benchmark_name,
+        "documents": len(file_paths),
+        "parsed_documents": len(documents),
+        "chunk_nodes": sum(count_nodes(chunk) for children in span_trees for chunk in children.values()),
+        "content_bytes": sum(len(doc.content.encode("utf-8")) for doc in documents),
+        "build_seconds": build_seconds,
+        "tree_memory_bytes": {"span": span_bytes, "materialized": materialized_bytes},
+        "pickle_bytes": {"span": span_pickle, "materialized": materialized_pickle},
+        "pickle_seconds": {"span": span_pickle_seconds, "materialized": materialized_pickle_seconds},
+        "cache_entry_gzip_bytes": {
+            "span": cache_entry_bytes(span_trees, lambda chunk: chunk.compact_dump()),
+            "materialized": cache_entry_bytes(span_trees, lambda chunk: chunk.model_dump()),
+        },
+        "identical_dump": identical,
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=4))
+
+    os.makedirs(BENCHMARK_RESULT_DIR, exist_ok=True)
+    result_path = os.path.join(BENCHMARK_RESULT_DIR, f"chunk_memory_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import os
+import copy
+import json
+import time
+import argparse
+import threading
+from datetime import datetime
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+
+from generate_knowledge_graph.builder import llm, data_loader, document_stages
+from generate_knowledge_graph.nodes import Chunker
+from generate_knowledge_graph.pipeline import build_context
+from generate_knowledge_graph.utils.concurrency import rate_limited, llm_endpoint
+from langgraph.runtime import Runtime
+
+
+load_dotenv(override=True)
+
+BENCHMARK_RESULT_DIR = "./data/benchmark_results"
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """LLM 호출마다 입력/출력 토큰 수를 누적합니다."""
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.calls = 0
+
+    def on_llm_end(self, response, **kwargs):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", 0)
+        if not usage:
+            for generations in response.generations:
+                for generation in generations:
+                    metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    prompt_tokens += metadata.get("input_tokens", 0)
+                    completion_tokens += metadata.get("output_tokens", 0)
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+
+def leaf_spans(document) -> dict:
+    spans = {}
+
+    def walk(chunk, path):
+        if not chunk.children:
+            spans[path] = tuple(chunk.span)
+        for child in chunk.children:
+            walk(child, f"{path}/{child.name}")
+
+    for key, chunk in document.children.items():
+        walk(chunk, key)
+    return spans
+
+
+def span_iou(a, b) -> float:
+    intersection = max(0, min(a[1], b[1]) - max(a[0], b[0]))
+    union = max(a[1], b[1]) - min(a[0], b[0])
+    return intersection / union if union > 0 else 0.0
+
+
+def prepare_documents(benchmark_name: str, num_documents: int, runtime):
+    # 목차까지는 두 프로토콜이 공유 (단계 캐시 사용)
+    documents = []
+    for document in data_loader.load_documents(benchmark_name):
+        documents.append(document)
+        if len(documents) >= num_documents:
+            break
+    for name, node in document_stages:
+        if name == "Chunker":
+            break
+        documents = node.process(documents, runtime)
+    return documents
+
+
+def run_protocol(protocol: str, documents, context: dict, window_tokens: int):
+    usage = TokenUsageCallback()
+    # 응답 캐시를 끄고 실제 호출 시간을 측정
+    uncached = llm.model_copy(update={"cache": False})
+    chunker = Chunker(rate_limited(uncached, llm_endpoint(uncached)).with_config(callbacks=[usage]))
+    runtime = Runtime(context=build_context({
+        **context,
+        "use_cache": False,
+        "chunking_protocol": protocol,
+        "chunker_window_tokens": window_tokens,
+    }))
+    documents = copy.deepcopy(documents)
+    started = time.perf_counter()
+    documents = chunker.process(documents, runtime)
+    elapsed = time.perf_counter() - started
+    return documents, {
+        "protocol": protocol,
+        "seconds": elapsed,
+        "llm_calls": usage.calls,
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "leaves": sum(len(leaf_spans(doc)) for doc in documents),
+        "empty_documents": sum(1 for doc in documents if not doc.children),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunker 프로토콜별 출력 토큰/지연 시간 비교")
+    parser.add_argument("--benchmark-name", default="maud")
+    parser.add_argument("--num-documents", type=int, default=10)
+    parser.add_argument("--protocols", nargs="+", choices=["sentence", "line"], default=["sentence", "line"])
+    parser.add_argument("--window-tokens", type=int, default=24000)
+    args = parser.parse_args()
+
+    # 규칙 기반 파서를 끄고 모든 문서를 Chunker로 보냄
+    context = {"benchmark_name": args.benchmark_name, "use_cache": True, "use_heading_parser": False}
+    documents = prepare_documents(args.benchmark_name, args.num_documents, Runtime(context=build_context(context)))
+
+    results = []
+    baseline = None
+    for protocol in args.protocols:
+        chunked, result = run_protocol(protocol, documents, context, args.window_tokens)
+        # 첫 프로토콜 대비 같은 (목차 경로) 리프의 span 겹침 비율
+        spans = [leaf_spans(doc) for doc in chunked]
+        if baseline is None:
+            baseline = (protocol, spans)
+        else:
+            ious = [
+                span_iou(base[path], span)
+                for base, current in zip(baseline[1], spans)
+                for path, span in current.items() if path in base
+            ]
+            result[f"mean_span_iou_vs_{baseline[0]}"] = sum(ious) / len(ious) if ious else 0.0
+        results.append(result)
+        print(json.dumps(result, ensure_ascii=False))
+
+    os.makedirs(BENCHMARK_RESULT_DIR, exist_ok=True)
+    result_path = os.path.join(BENCHMARK_RESULT_DIR, f"chunking_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump({"num_documents": len(documents), "results": results}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
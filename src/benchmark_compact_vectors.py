@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import asyncio
+import argparse
+from datetime import datetime
+import numpy as np
+
+from search_knowledge_graph import neo4j_driver, async_neo4j_driver, embedding_model
+from search_knowledge_graph.vector_cache import ChildVectorCache, CompactSpec, CompactMatrix
+from search_knowledge_graph.retriever import VectorTreeRetriever
+
+
+BENCHMARK_RESULT_DIR = "./data/benchmark_results"
+
+
+def load_queries(benchmark_name: str, num_queries: int) -> list:
+    with open(f"./data/benchmarks/{benchmark_name}.json", encoding="utf-8") as f:
+        tests = json.load(f)["tests"]
+    return [test["query"] for test in tests[:num_queries]]
+
+
+def operating_points(args):
+    """(dims, dtype, rescore_factor, 재점수 벡터 위치) 조합별 CompactSpec"""
+    for dims in args.dims:
+        for dtype in args.dtypes:
+            for factor in args.rescore_factors:
+                # 재점수를 하지 않으면 full 벡터 위치는 의미 없음
+                for source in (args.rescore_sources if factor else ["memory"]):
+                    yield CompactSpec(dims=dims or None, dtype=dtype, rescore_factor=factor, keep_full=source == "memory")
+
+
+def spec_label(spec: CompactSpec) -> dict:
+    if spec is None:
+        return {"dims": "full", "dtype": "float32", "rescore_factor": 0, "rescore_source": None}
+    return {
+        "dims": spec.dims or "full",
+        "dtype": spec.dtype,
+        "rescore_factor": spec.rescore_factor,
+        "rescore_source": ("memory" if spec.keep_full else "neo4j") if spec.rescore_factor else None,
+    }
+
+
+def latency_stats(seconds: list) -> dict:
+    millis = np.asarray(seconds) * 1000.0
+    return {
+        "mean_ms": float(millis.mean()),
+        "p50_ms": float(np.percentile(millis, 50)),
+        "p95_ms": float(np.percentile(millis, 95)),
+    }
+
+
+def recall(approx_ids, exact_ids) -> float:
+    exact_ids = set(exact_ids)
+    if not exact_ids:
+        return 1.0
+    return len(set(approx_ids) & exact_ids) / len(exact_ids)
+
+
+def mark_pareto(results: list, latency_key: str):
+    # recall이 같거나 높으면서 더 빠른 운영점이 없으면 pareto
+    for result in results:
+        result["pareto"] = not any(
+            other is not result
+            and other["recall"] >= result["recall"]
+            and other[latency_key] <= result[latency_key]
+            and (other["recall"] > result["recall"] or other[latency_key] < result[latency_key])
+            for other in results
+        )
+
+
+def flat_benchmark(full: np.ndarray, query_vectors: np.ndarray, specs: list, top_k: int) -> list:
+    """모든 Chunk 벡터를 한 행렬로 두고 전체 검색 (gds.similarity.cosine 전체 스캔에 해당, Neo4j 왕복 제외)"""
+    exact = [ChildVectorCache._top(full @ query, top_k) for query in query_vectors]
+    results = []
+    for spec in [None, *specs]:
+        if spec is not None and not spec.keep_full and spec.rescore_factor:
+            # 재점수 위치는 트리 검색에서만 비교 (여기서는 memory와 같은 계산)
+            continue
+        compact = CompactMatrix(full, spec) if spec is not None else None
+        seconds, recalls = [], []
+        for query, exact_top in zip(query_vectors, exact):
+            started = time.perf_counter()
+            if compact is None:
+                top = ChildVectorCache._top(full @ query, top_k)
+            else:
+                scores = compact.scores(query)
+                if spec.rescore_factor:
+                    shortlist = ChildVectorCache._top(scores, top_k * spec.rescore_factor)
+                    top = shortlist[ChildVectorCache._top(full[shortlist] @ query, top_k)]
+                else:
+                    top = ChildVectorCache._top(scores, top_k)
+            seconds.append(time.perf_counter() - started)
+            recalls.append(recall(top.tolist(), exact_top.tolist()))
+        result = spec_label(spec)
+        result["rescore_source"] = None
+        result["recall"] = float(np.mean(recalls))
+        result["first_pass_bytes"] = full.nbytes if compact is None else compact.codes.nbytes + (compact.scales.nbytes if compact.scales is not None else 0)
+        result.update(latency_stats(seconds))
+        results.append(result)
+        print(json.dumps({"mode": "flat", **result}, ensure_ascii=False))
+    mark_pareto(results, "p95_ms")
+    return results
+
+
+async def tree_benchmark(query_vectors: np.ndarray, specs: list, cache_bytes: int, top_n: int) -> list:
+    """VectorTreeRetriever 빔 탐색을 운영점별 캐시로 실행하고, full 정밀도 결과 대비 리프 recall과 지연 시간을 측정"""
+    exact_leaves = None
+    results = []
+    for spec in [None, *specs]:
+        vector_cache = ChildVectorCache(neo4j_driver, max_bytes=cache_bytes, async_neo4j_driver=async_neo4j_driver, compact=spec)
+        vector_cache.warm_up()
+        vector_cache.get(None)
+        search_retriever = VectorTreeRetriever(embedding_model, vector_cache, None, top_n=top_n)
+        seconds, leaves = [], []
+        for query in query_vectors:
+            started = time.perf_counter()
+            ranked = await search_retriever._descend(query.tolist())
+            seconds.append(time.perf_counter() - started)
+            leaves.append([node_id for node_id, _ in ranked[:top_n]])
+        if exact_leaves is None:
+            exact_leaves = leaves
+        result = spec_label(spec)
+        result["recall"] = float(np.mean([recall(a, e) for a, e in zip(leaves, exact_leaves)]))
+        result["cache_bytes"] = vector_cache._nbytes
+        result["cached_parents"] = len(vector_cache._entries)
+        result.update(latency_stats(seconds))
+        results.append(result)
+        print(json.dumps({"mode": "tree", **result}, ensure_ascii=False))
+    mark_pareto(results, "p95_ms")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="압축 벡터(차원 절단 + float16/int8) 운영점별 recall/지연 시간/메모리 비교 (기준: full 정밀도 float32)")
+    parser.add_argument("--benchmark-name", default="maud")
+    parser.add_argument("--num-queries", type=int, default=194)
+    parser.add_argument("--dims", type=int, nargs="+", default=[256, 512, 1024, 0], help="앞쪽 차원 수 (0은 전체 차원)")
+    parser.add_argument("--dtypes", nargs="+", default=["float16", "int8"], choices=["float16", "int8"])
+    parser.add_argument("--rescore-factors", type=int, nargs="+", default=[0, 2, 4, 8], help="top_k * factor개를 full 벡터로 재점수 (0은 재점수 없음)")
+    parser.add_argument("--rescore-sources", nargs="+", default=["memory", "neo4j"], choices=["memory", "neo4j"], help="재점수용 full 벡터 위치 (트리 검색만)")
+    parser.add_argument("--top-k", type=int, default=10, help="전체 검색의 recall@k")
+    parser.add_argument("--top-n", type=int, default=2, help="트리 검색 결과 리프 수 (VectorTreeRetriever.top_n)")
+    parser.add_argument("--cache-bytes", type=int, default=4 * 1024 * 1024 * 1024, help="운영점별 캐시 크기 (기본은 전체 적재)")
+    parser.add_argument("--skip-tree", action="store_true", help="Neo4j를 쓰는 트리 검색 측정 생략")
+    args = parser.parse_args()
+
+    queries = load_queries(args.benchmark_name, args.num_queries)
+    query_vectors = ChildVectorCache._normalized_matrix(embedding_model.embed_documents(queries))
+    specs = list(operating_points(args))
+
+    # 전체 검색용 행렬: full 정밀도 캐시에 적재된 모든 Chunk 벡터
+    exact_cache = ChildVectorCache(neo4j_driver, max_bytes=args.cache_bytes)
+    exact_cache.warm_up()
+    matrices = [matrix for _, matrix in exact_cache._entries.values() if matrix.size]
+    full = np.vstack(matrices) if matrices else np.zeros((0, query_vectors.shape[1]), dtype=np.float32)
+
+    report = {
+        "benchmark_name": args.benchmark_name,
+        "queries": len(queries),
+        "chunks": int(full.shape[0]),
+        "dimensions": int(full.shape[1]),
+        "vector_property": exact_cache.vector_property,
+        "flat": flat_benchmark(full, query_vectors, specs, args.top_k) if full.shape[0] else [],
+    }
+    if not args.skip_tree:
+        report["tree"] = asyncio.run(tree_benchmark(query_vectors, specs, args.cache_bytes, args.top_n))
+
+    os.makedirs(BENCHMARK_RESULT_DIR, exist_ok=True)
+    result_path = os.path.join(BENCHMARK_RESULT_DIR, f"compact_vectors_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=4)
+    print(f"결과 저장: {result_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import os
+import json
+import time
+import argparse
+from datetime import datetime
+from langgraph.runtime import Runtime
+
+from generate_knowledge_graph.nodes import DataLoader, IntroBodySeparator, HeadingStructureParser
+from generate_knowledge_graph.nodes.chunker import resolve_document
+from generate_knowledge_graph.nodes.heading_structure_parser import parse_document_structure
+from generate_knowledge_graph.pipeline import build_context
+from generate_knowledge_graph.utils.executor import StageExecutor
+from generate_knowledge_graph.utils.windowing import plan_windows
+
+
+BENCHMARK_RESULT_DIR = "./data/benchmark_results"
+
+
+def edge_sentence(text: str, words: int, last: bool) -> str:
+    tokens = text.split()
+    return " ".join(tokens[-words:] if last else tokens[:words])
+
+
+def synthetic_response(children: dict, base: int, window) -> dict:
+    """규칙 기반 파서 트리에서 Chunker 응답(start/end_sentence)을 만들어 LLM 없이 정렬 작업량을 재현합니다."""
+    def convert(chunk):
+        if chunk.children:
+            converted = {child.name: convert(child) for child in chunk.children}
+            return {k: v for k, v in converted.items() if v is not None} or None
+        if not window.start <= chunk.span[0] - base < window.end:
+            return None
+        return {
+            "start_sentence": edge_sentence(chunk.content, 12, last=False),
+            "end_sentence": edge_sentence(chunk.content, 12, last=True),
+        }
+
+    response = {key: convert(chunk) for key, chunk in children.items()}
+    return {k: v for k, v in response.items() if v is not None}
+
+
+def timed_map(executor: StageExecutor, fn, tasks) -> float:
+    started = time.perf_counter()
+    executor.map(fn, tasks)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU 단계(Chunker 정렬, 규칙 기반 파싱)의 프로세스 수별 처리 시간/확장 효율")
+    parser.add_argument("--benchmark-name", default="maud")
+    parser.add_argument("--num-documents", type=int, default=None, help="기본은 전체 corpus")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--window-tokens", type=int, default=24000)
+    parser.add_argument("--repeat", type=int, default=3, help="측정 반복 횟수 (최솟값 사용)")
+    args = parser.parse_args()
+
+    context = build_context({"benchmark_name": args.benchmark_name})
+    runtime = Runtime(context=context)
+    data_loader = DataLoader()
+    file_paths = data_loader.get_document_file_paths(args.benchmark_name)[:args.num_documents]
+    documents = IntroBodySeparator(None).process(list(data_loader.load_documents(args.benchmark_name, file_paths)), runtime)
+    documents = HeadingStructureParser().process(documents, runtime)
+
+    parse_tasks = [(doc.content, doc.span, context.heading_parser_min_articles) for doc in documents]
+    align_tasks = []
+    for doc in documents:
+        if doc.structure_source != "heading_parser":
+            continue
+        windows = plan_windows(doc.content, doc.table_of_contents, args.window_tokens, context.chunker_window_overlap_tokens)
+        responses = [synthetic_response(doc.children, doc.span[0], window) for window in windows]
+        align_tasks.append((doc.content, windows, responses, "sentence"))
+
+    results = []
+    baseline = {}
+    for workers in args.workers:
+        executor = StageExecutor(workers)
+        # 풀 생성/워커 import 비용은 제외
+        executor.map(parse_document_structure, parse_tasks[:workers * 2])
+        result = {"workers": workers}
+        for name, fn, tasks in [
+            ("chunker_alignment", resolve_document, align_tasks),
+            ("heading_parser", parse_document_structure, parse_tasks),
+        ]:
+            seconds = min(timed_map(executor, fn, tasks) for _ in range(max(1, args.repeat)))
+            baseline.setdefault(name, seconds)
+            speedup = baseline[name] / seconds if seconds > 0 else 0.0
+            result[name] = {
+                "seconds": seconds,
+                "documents_per_second": len(tasks) / seconds if seconds > 0 else 0.0,
+                "speedup": speedup,
+                # 이상적인 선형 확장 대비 비율
+                "efficiency": speedup * args.workers[0] / workers,
+            }
+        executor.shutdown()
+        results.append(result)
+        print(json.dumps(result, ensure_ascii=False))
+
+    os.makedirs(BENCHMARK_RESULT_DIR, exist_ok=True)
+    result_path = os.path.join(BENCHMARK_RESULT_DIR, f"cpu_scaling_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "benchmark_name": args.benchmark_name,
+            "documents": len(documents),
+            "aligned_documents": len(align_tasks),
+            "cpu_count": os.cpu_count(),
+            "results": results,
+        }, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
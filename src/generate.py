@@ -1,6 +1,12 @@
 import os
+import asyncio
+import fnmatch
+import argparse
 from dotenv import load_dotenv
-from generate_knowledge_graph.builder import graph
+from generate_knowledge_graph.builder import graph, async_graph, pipeline, stage_runner, data_loader, neo4j_client, llm_cache
+from logger import setup_logger
+from generate_knowledge_graph.utils.concurrency import get_controller
+from generate_knowledge_graph.pipeline import build_context
 from langfuse import get_client
 from langfuse.langchain import CallbackHandler
 from langchain_core.prompts import ChatPromptTemplate
@@ -12,6 +18,8 @@ from generate_knowledge_graph.nodes.summarizer import SYSTEM_TEMPLATE as SUMMARI
 
 load_dotenv(override=True)
 
+logger = setup_logger()
+
 default_prompt = {
     "table-of-contents-extractor": {
         "system": TABLE_OF_CONTENTS_EXTRACTOR_SYSTEM_TEMPLATE,
@@ -38,10 +46,9 @@ def get_system_prompt(prompt_name: str):
     return prompt
 
 
-def main():
-    langfuse_handler = CallbackHandler()
-    input = {}
+def build_run_context(args) -> dict:
     context = {
+        "benchmark_name": getattr(args, "benchmark_name", "maud"),
         "table_of_contents_extractor_prompt": get_system_prompt("table-of-contents-extractor"),
         "summarizer_prompt": get_system_prompt("summarizer"),
         "semantic_chunking_config": {
@@ -51,9 +58,111 @@ def main():
         },
         "hierarchical_chunking_level": 3,
         "use_cache": True,
+        "retry_dead_letter": getattr(args, "retry_dead_letter", False),
+        "use_document_store": getattr(args, "document_store", False),
+        "cpu_workers": getattr(args, "cpu_workers", 1),
+        # snapshot은 중간 단계부터 다시 실행할 때만 필요
+        "save_stage_snapshots": bool(
+            getattr(args, "save_snapshots", False)
+            or getattr(args, "from_stage", None)
+            or getattr(args, "to_stage", None)
+            or getattr(args, "summary_only", False)
+        ),
     }
+    # 지정한 동시성 설정만 덮어씀 (나머지는 ContextSchema 기본값)
+    for key in (
+        "llm_max_concurrency",
+        "summarizer_max_concurrency",
+        "graph_write_concurrency",
+        "graph_write_batch_size",
+        "document_window_size",
+    ):
+        if getattr(args, key, None) is not None:
+            context[key] = getattr(args, key)
+    return context
+
+
+def select_documents(args):
+    """--documents(glob)/--file-list로 처리할 문서를 고릅니다. 필터가 없으면 None(전체)"""
+    if not args.documents and not args.file_list:
+        return None
+    candidates = data_loader.get_document_file_paths(args.benchmark_name)
+    selected = set()
+    for pattern in args.documents or []:
+        selected.update(path for path in candidates if fnmatch.fnmatch(path, pattern))
+    if args.file_list:
+        with open(args.file_list, encoding="utf-8") as f:
+            selected.update(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    logger.info(f"문서 필터: {len(selected)}건 선택")
+    return sorted(selected)
+
+
+async def run_async_graph(input, context, config):
+    # LLM 요청/Neo4j 쓰기를 하나의 이벤트 루프에서 실행하고, 같은 루프에서 비동기 드라이버를 닫음
+    try:
+        return await async_graph.ainvoke(input, context=context, config=config)
+    finally:
+        await neo4j_client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate knowledge graph")
+    parser.add_argument("--streaming", action="store_true", help="문서 단위 스트리밍 파이프라인으로 실행 (단계 간 배리어 없음)")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="async_graph.ainvoke로 실행: LLM 요청/Neo4j 쓰기를 하나의 이벤트 루프에서 처리 (기본은 스레드 풀 기반 동기 graph.invoke)")
+    parser.add_argument("--document-store", action="store_true", help="문서를 State 대신 디스크 저장소에 두고 window 단위로 처리 (전체 corpus를 메모리에 올리지 않음)")
+    parser.add_argument("--cpu-workers", type=int, default=1, help="CPU 작업(Chunker 정렬, 규칙 기반 파싱)을 나눠 실행할 프로세스 수")
+    parser.add_argument("--retry-dead-letter", action="store_true", help="dead-letter 파일에 기록된(이전 실행에서 실패한) 문서만 다시 처리")
+    parser.add_argument("--benchmark-name", default="maud")
+
+    # 단계 선택 실행: 앞 단계의 snapshot(./data/cache/snapshots)에서 입력을 읽고 선택한 단계만 실행
+    stage_group = parser.add_argument_group("단계 선택 실행")
+    stage_group.add_argument("--from", dest="from_stage", default=None, help=f"시작 단계 ({', '.join(stage_runner.stage_names)})")
+    stage_group.add_argument("--to", dest="to_stage", default=None, help="끝 단계 (기본 GraphDBWriter)")
+    stage_group.add_argument("--documents", nargs="+", default=None, help="처리할 문서 glob (예: 'maud/A*.txt')")
+    stage_group.add_argument("--file-list", default=None, help="처리할 문서 경로 목록 파일 (한 줄에 하나)")
+    stage_group.add_argument("--save-snapshots", action="store_true", help="단계별 출력 snapshot 기록 (--from/--to 실행에서는 항상 기록)")
+    stage_group.add_argument("--summary-only", action="store_true", help="Chunker snapshot에서 요약만 다시 만들고, 기존 그래프의 summary/vector 속성만 제자리 갱신")
+
+    concurrency_group = parser.add_argument_group("동시성 설정 (기본은 ContextSchema 값)")
+    concurrency_group.add_argument("--llm-max-concurrency", type=int, default=None)
+    concurrency_group.add_argument("--summarizer-max-concurrency", type=int, default=None)
+    concurrency_group.add_argument("--graph-write-concurrency", type=int, default=None)
+    concurrency_group.add_argument("--graph-write-batch-size", type=int, default=None)
+    concurrency_group.add_argument("--document-window-size", type=int, default=None)
+    args = parser.parse_args()
+
+    langfuse_handler = CallbackHandler()
+    input = {}
+    context = build_run_context(args)
     config = {"callbacks": [langfuse_handler], "metadata": {"langfuse_tags": ["generate"]}}
-    _ = graph.invoke(input, context=context, config=config)
+    try:
+        if args.summary_only or args.from_stage or args.to_stage or args.documents or args.file_list:
+            if args.summary_only:
+                args.from_stage = args.from_stage or "Summarizer"
+                args.to_stage = args.to_stage or "GraphDBWriter"
+            report = stage_runner.run(
+                context,
+                start=args.from_stage,
+                end=args.to_stage,
+                file_paths=select_documents(args),
+                summary_only=args.summary_only,
+            )
+            if report["missing"]:
+                raise SystemExit(f"문서 {len(report['missing'])}건을 처리하지 못했습니다: {report['missing']}")
+        elif args.streaming:
+            runtime_context = build_context(context)
+            documents = data_loader.load_documents(
+                runtime_context.benchmark_name, data_loader.select_file_paths(runtime_context)
+            )
+            pipeline.run(documents, context)
+        elif args.use_async:
+            asyncio.run(run_async_graph(input, context, config))
+        else:
+            _ = graph.invoke(input, context=context, config=config)
+    finally:
+        neo4j_client.close()
+    logger.info(f"LLM cache stats: {llm_cache.stats()}")
+    logger.info(f"Concurrency limits: {get_controller().stats()}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -4,17 +4,29 @@ from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langgraph.graph import StateGraph
 from generate_knowledge_graph.state import State, ContextSchema
 from generate_knowledge_graph.nodes import *
+from generate_knowledge_graph.pipeline import StreamingPipeline, StageRunner
 from generate_knowledge_graph.utils.database import Neo4jConnection
+from generate_knowledge_graph.utils.embedding import CachedEmbeddings
+from generate_knowledge_graph.utils.llm_cache import SQLiteLLMCache
+from generate_knowledge_graph.utils.concurrency import rate_limited
 
 load_dotenv(override=True)
 
-# LLM 설정
-llm = ChatOpenAI(
-    base_url=os.getenv("LLM_BASE_URL"),
-    model=os.getenv("LLM_MODEL"),
-    # temperature=0.0,
-    api_key=os.getenv("LLM_API_KEY"),
-    max_tokens=32768
+# LLM 응답 캐시 (렌더링된 메시지 + 모델 + 샘플링 파라미터 기준). 실패 후 재실행 시 끝난 호출은 재사용
+llm_cache = SQLiteLLMCache()
+
+# LLM 설정 (모든 노드가 프로세스 공용 동시성 제어기의 허가를 받아 호출)
+# SDK 내부 재시도를 끄고 429/Retry-After가 제어기에 그대로 전달되게 함 (429 재시도는 제어기가, 그 밖의 실패는 항목 단위 재시도가 담당)
+llm = rate_limited(
+    ChatOpenAI(
+        base_url=os.getenv("LLM_BASE_URL"),
+        model=os.getenv("LLM_MODEL"),
+        # temperature=0.0,
+        api_key=os.getenv("LLM_API_KEY"),
+        max_tokens=32768,
+        max_retries=0,
+        cache=llm_cache
+    )
 )
 
 # reasoning_llm = ChatOpenAI(
@@ -32,10 +44,13 @@ llm = ChatOpenAI(
 #     # }
 # )
 
-embedding_model = OpenAIEmbeddings(
-    base_url=os.getenv("EMBEDDING_BASE_URL"),
-    model=os.getenv("EMBEDDING_MODEL"),
-    api_key=os.getenv("EMBEDDING_API_KEY")
+# 임베딩 설정 (중복 제거 + 영구 캐시: 바뀐 텍스트만 다시 임베딩)
+embedding_model = CachedEmbeddings(
+    OpenAIEmbeddings(
+        base_url=os.getenv("EMBEDDING_BASE_URL"),
+        model=os.getenv("EMBEDDING_MODEL"),
+        api_key=os.getenv("EMBEDDING_API_KEY")
+    )
 )
 
 # Neo4j 설정 (임베딩 모델 포함)
@@ -46,21 +61,41 @@ neo4j_client = Neo4jConnection(
     embedding_model=embedding_model
 )
 
-# 워크플로우 생성
-workflow = StateGraph(State, context_schema=ContextSchema)
+# 노드 생성 (워크플로우와 스트리밍 파이프라인이 같은 인스턴스를 공유)
+data_loader = DataLoader()
+document_stages = [
+    ("IntroBodySeparator", IntroBodySeparator(llm)),
+    ("HeadingStructureParser", HeadingStructureParser()),
+    ("TableOfContentsExtractor", TableOfContentsExtractor(llm)),
+    ("Chunker", Chunker(llm)),
+    ("Summarizer", Summarizer(llm)),
+]
+graph_db_writer = GraphDBWriter(neo4j_client)
+
+
+def build_graph(use_async: bool = False):
+    """워크플로우를 컴파일합니다. use_async=True면 노드의 acall(비동기 구현)을 등록해 graph.ainvoke로 하나의 이벤트 루프에서 실행"""
+    workflow = StateGraph(State, context_schema=ContextSchema)
+
+    # 노드 추가
+    nodes = [("DataLoader", data_loader), *document_stages, ("GraphDBWriter", graph_db_writer)]
+    for name, node in nodes:
+        workflow.add_node(name, node.acall if use_async else node)
+
+    # 엣지 추가
+    workflow.add_edge("__start__", "DataLoader")
+
+    # 워크플로우 컴파일
+    compiled = workflow.compile()
+    compiled.name = "generate_knowledge_graph_async" if use_async else "generate_knowledge_graph"
+    return compiled
 
-# 노드 추가
-workflow.add_node("DataLoader", DataLoader())
-workflow.add_node("IntroBodySeparator", IntroBodySeparator(llm))
-workflow.add_node("TableOfContentsExtractor", TableOfContentsExtractor(llm))
-workflow.add_node("Chunker", Chunker(llm))
-workflow.add_node("Summarizer", Summarizer(llm))
-workflow.add_node("GraphDBWriter", GraphDBWriter(neo4j_client))
 
+graph = build_graph()
+async_graph = build_graph(use_async=True)
 
-# 엣지 추가
-workflow.add_edge("__start__", "DataLoader")
+# 문서 단위 스트리밍 실행 모드
+pipeline = StreamingPipeline(document_stages, graph_db_writer)
 
-# 워크플로우 컴파일
-graph = workflow.compile()
-graph.name = "generate_knowledge_graph"
+# 선택한 단계 범위만 snapshot에서 이어 실행하는 모드
+stage_runner = StageRunner(document_stages, graph_db_writer, data_loader)
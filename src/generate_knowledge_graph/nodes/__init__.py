@@ -1,3 +1,4 @@
+from .base import DocumentNode
 from .data_loader import DataLoader
 from .chunker import Chunker
 from .document_structure_detector import DocumentStructureDetector
@@ -5,5 +6,6 @@ from .graph_db_writer import GraphDBWriter
 from .summarizer import Summarizer
 from .table_of_contents_extractor import TableOfContentsExtractor
 from .intro_body_separator import IntroBodySeparator
+from .heading_structure_parser import HeadingStructureParser
 
-__all__ = ["DataLoader", "Chunker", "DocumentStructureDetector", "GraphDBWriter", "Summarizer", "TableOfContentsExtractor", "IntroBodySeparator"]
\ No newline at end of file
+__all__ = ["DocumentNode", "DataLoader", "Chunker", "DocumentStructureDetector", "GraphDBWriter", "Summarizer", "TableOfContentsExtractor", "IntroBodySeparator", "HeadingStructureParser"]
\ No newline at end of file
@@ -0,0 +1,61 @@
+import asyncio
+from langgraph.types import Command
+from langgraph.runtime import Runtime
+
+from generate_knowledge_graph.state import ContextSchema
+from generate_knowledge_graph.utils.document_store import DocumentStore, stage_snapshot
+
+
+class DocumentNode:
+    """문서 목록을 받아 처리된 문서 목록을 반환하는 노드의 공통 베이스입니다.
+
+    LangGraph 워크플로우에서는 __call__(동기 graph) 또는 acall(async_graph)로 전체 문서를 처리하고,
+    스트리밍 파이프라인에서는 process()를 문서 단위로 호출합니다.
+    LLM/네트워크 단계는 aprocess()를 이벤트 루프 네이티브로 구현하고, 나머지는 기본 구현(스레드에서 process 실행)을 씁니다.
+    State에 document_store(경로)가 있으면 저장소에서 document_window_size개씩 읽어 처리하고 다시 씁니다.
+    save_stage_snapshots면 단계 출력을 <stage_snapshot_dir>/<클래스 이름>.sqlite에도 기록합니다. (StageRunner의 중간 단계 입력)
+    """
+
+    goto: str = "__end__"
+
+    def process(self, documents: list, runtime: Runtime[ContextSchema]) -> list:
+        raise NotImplementedError
+
+    async def aprocess(self, documents: list, runtime: Runtime[ContextSchema]) -> list:
+        return await asyncio.to_thread(self.process, documents, runtime)
+
+    def save_snapshot(self, documents: list, runtime: Runtime[ContextSchema]):
+        if getattr(runtime.context, "save_stage_snapshots", False):
+            stage_snapshot(runtime.context.stage_snapshot_dir, type(self).__name__).put_many(documents)
+
+    def __call__(self, state, runtime: Runtime[ContextSchema]):
+        store_path = getattr(state, "document_store", "")
+        if store_path:
+            store = DocumentStore(store_path)
+            for window in store.iter_windows(runtime.context.document_window_size):
+                window = self.process(window, runtime)
+                store.put_many(window)
+                self.save_snapshot(window, runtime)
+            return Command(update={}, goto=self.goto)
+
+        documents = self.process(getattr(state, "documents", []) or [], runtime)
+        self.save_snapshot(documents, runtime)
+        return Command(update={"documents": documents}, goto=self.goto)
+
+    async def acall(self, state, runtime: Runtime[ContextSchema]):
+        store_path = getattr(state, "document_store", "")
+        if store_path:
+            store = DocumentStore(store_path)
+            position = -1
+            while True:
+                window, position = await asyncio.to_thread(store.read_window, position, runtime.context.document_window_size)
+                if not window:
+                    break
+                window = await self.aprocess(window, runtime)
+                await asyncio.to_thread(store.put_many, window)
+                await asyncio.to_thread(self.save_snapshot, window, runtime)
+            return Command(update={}, goto=self.goto)
+
+        documents = await self.aprocess(getattr(state, "documents", []) or [], runtime)
+        await asyncio.to_thread(self.save_snapshot, documents, runtime)
+        return Command(update={"documents": documents}, goto=self.goto)
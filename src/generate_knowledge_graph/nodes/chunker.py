@@ -1,18 +1,23 @@
 import os
 import re
+import asyncio
 from logger import setup_logger
-import difflib
 from langchain_openai.embeddings import OpenAIEmbeddings
 from langchain_experimental.text_splitter import SemanticChunker
-from langgraph.types import Command
 from langgraph.runtime import Runtime
 from langchain_core.prompts import ChatPromptTemplate
-import pickle
 
-from generate_knowledge_graph.utils.model import Chunk
+from generate_knowledge_graph.utils.model import SpanChunk
+from generate_knowledge_graph.utils.alignment import SentenceAligner
+from generate_knowledge_graph.utils.windowing import Window, plan_windows
+from generate_knowledge_graph.utils.segmentation import segment_lines
 from generate_knowledge_graph.utils.parser import JsonOutputParser
 from generate_knowledge_graph.utils.callback import BatchCallback
+from generate_knowledge_graph.utils.stage_cache import StageCache
+from generate_knowledge_graph.utils.executor import get_stage_executor
+from generate_knowledge_graph.utils.failures import batch_with_retry, ainvoke_with_retry, get_dead_letter_queue, mark_failed
 from generate_knowledge_graph.state import ContextSchema
+from generate_knowledge_graph.nodes.base import DocumentNode
 
 
 logger = setup_logger()
@@ -46,6 +51,25 @@ USER_TEMPLATE = """<Table_of_Contents>
 </Legal_Contract>
 """
 
+# 줄 번호 프로토콜: 본문을 "[번호] 내용" 줄로 주고, 문장 대신 줄 번호만 받음 (출력 토큰 감소 + 정렬 불필요)
+LINE_SYSTEM_TEMPLATE = """You are a legal contract document analysis assistant. Your task is to split the content of the legal contract according to the Table of Contents.
+
+The Legal_Contract is given as numbered lines in the form "[line_number] text".
+
+Inputs:  
+- Table_of_Contents  
+- Legal_Contract (numbered lines)
+
+Output Format (must follow exactly):  
+{{  
+  "table_of_contents_key_1": {{  
+    "table_of_contents_key_1_1": {{"start_line": <number of the first line of table_of_contents_key_1_1>, "end_line": <number of the last line of table_of_contents_key_1_1>}},  
+    "table_of_contents_key_1_2": {{"start_line": <number>, "end_line": <number>}}  
+  }}  
+}}"""
+
+LINE_USER_TEMPLATE = USER_TEMPLATE
+
 
 # SYSTEM_TEMPLATE = """You are a legal contract document analysis assistant. Your task is to split the content of the legal contract according to the Table of Contents. 
 
@@ -90,118 +114,310 @@ USER_TEMPLATE = """<Table_of_Contents>
 # REMINDER: Process ALL sections listed in the Table of Contents above. Do not stop at early sections - continue through the entire document to capture every article, section, and subsection listed."""
 
 
-def _best_window_by_words(content: str, target_sentence: str):
-    token_spans = [(m.start(), m.end()) for m in re.finditer(r'\S+', content)]
-    words_in_target = re.findall(r'\S+', target_sentence)
-    window_words = len(words_in_target)
-    if window_words <= 0 or not token_spans:
-        return 0, 0, 0.0
-
-    best_score = -1.0
-    best_start_char, best_end_char = 0, 0
-    cp_lower = content.lower()
-    target_lower = target_sentence.lower()
-
-    max_start = len(token_spans) - window_words
-    for i in range(max_start + 1):
-        w_start = token_spans[i][0]
-        w_end = token_spans[i + window_words - 1][1]
-        window_text = cp_lower[w_start:w_end]
-        score = difflib.SequenceMatcher(None, target_lower, window_text).ratio()
-        if score > best_score:
-            best_score = score
-            best_start_char, best_end_char = w_start, w_end
-
-    return best_start_char, best_end_char, best_score
-
-
-def find_sentence_range(content: str, start_sentence: str, end_sentence: str):
-    s_start, s_end, _ = _best_window_by_words(content, start_sentence)
-    e_start, e_end, _ = _best_window_by_words(content, end_sentence)
-    return s_start, e_end
-
+def has_leaf(node, keys) -> bool:
+    if isinstance(node, dict):
+        if all(isinstance(node.get(k), (str, int)) for k in keys):
+            return True
+        return any(has_leaf(v, keys) for v in node.values())
+    return False
+
+
+def chunk_response_validator(protocol: str):
+    keys = ("start_line", "end_line") if protocol == "line" else ("start_sentence", "end_sentence")
+
+    def validate(response):
+        if not isinstance(response, dict) or not response:
+            return "chunk tree is empty or not a JSON object"
+        if not has_leaf(response, keys):
+            return f"chunk tree has no leaf with {keys[0]}/{keys[1]}"
+        return None
+
+    return validate
+
+
+# 정렬하지 못한 리프: 트리에서 제외
+UNRESOLVED = object()
+
+
+def sentence_leaf(node, aligner: SentenceAligner, window: Window, cursor: dict):
+    # 리프(start_sentence/end_sentence)를 본문 기준 (start, end, (두 문장 모두 찾음, 소유 여부))로 변환
+    # cursor["end"]: 같은 윈도우에서 바로 앞 리프의 끝 위치 (윈도우 기준)
+    if isinstance(node, dict) and "start_sentence" in node and "end_sentence" in node \
+       and isinstance(node["start_sentence"], str) and isinstance(node["end_sentence"], str):
+        content = aligner.content
+        s, _, s_score = aligner.best_window(node["start_sentence"])
+        if s_score <= 0.0:
+            # 시작 문장을 찾지 못하면 앞 리프의 끝에서 시작 (앞 리프가 없으면 윈도우 시작부터 덮지 않도록 제외)
+            if cursor["end"] is None:
+                return UNRESOLVED
+            s = cursor["end"]
+        # 끝 문장은 시작 문장 이후에서 먼저 찾고, 없으면 윈도우 전체에서 찾음 (find_range와 동일)
+        _, e, e_score = aligner.best_window(node["end_sentence"], min_start=s)
+        if e_score <= 0.0:
+            _, e, e_score = aligner.best_window(node["end_sentence"])
+            if e_score <= 0.0:
+                return UNRESOLVED
+        if e < s:
+            s, e = e, s
+        s = max(0, min(s, len(content)))
+        e = max(0, min(e, len(content)))
+        cursor["end"] = e
+        return (s + window.start, e + window.start, (s_score > 0.0 and e_score > 0.0, window.owns(s + window.start)))
+    return None
+
+
+def line_leaf(node, segmentation, window: Window):
+    # 리프(start_line/end_line)를 줄 오프셋 표로 바로 span 변환 (정렬 불필요)
+    if not (isinstance(node, dict) and "start_line" in node and "end_line" in node):
+        return None
+    try:
+        first, last = int(node["start_line"]), int(node["end_line"])
+    except (TypeError, ValueError):
+        return None
+    if not len(segmentation):
+        return None
+    if last < first:
+        first, last = last, first
+    first = max(1, min(first, len(segmentation)))
+    last = max(1, min(last, len(segmentation)))
+    window_first, window_last = segmentation.line_range(window.start, window.end)
+    s, e = segmentation.span(first, last)
+    return (s, e, (window_first <= first and last <= window_last, window.owns(s)))
+
+
+def resolve_leaves(node, resolve_leaf):
+    leaf = resolve_leaf(node)
+    if leaf is UNRESOLVED:
+        return None
+    if leaf is not None:
+        return leaf
+    if isinstance(node, dict):
+        resolved = {}
+        for k, v in node.items():
+            child = resolve_leaves(v, resolve_leaf)
+            # 리프가 모두 제외된 내부 노드는 span을 만들 수 없으므로 함께 제외
+            if child is not None and child != {}:
+                resolved[k] = child
+        return resolved
+    # list는 무시(예상치 않음)
+    return None
+
+
+def resolve_window(content: str, window: Window, response, protocol: str) -> dict:
+    """윈도우 하나의 LLM 응답을 본문 기준 span 트리로 변환합니다. (CPU 작업: 비동기 실행에서는 executor에서 실행)"""
+    if not isinstance(response, dict):
+        return {}
+    if protocol == "line":
+        segmentation = segment_lines(content)
+        return resolve_leaves(response, lambda node: line_leaf(node, segmentation, window))
+    # 윈도우마다 정렬 인덱스를 한 번만 생성
+    aligner = SentenceAligner(content[window.start:window.end])
+    cursor = {"end": None}
+    return resolve_leaves(response, lambda node: sentence_leaf(node, aligner, window, cursor))
+
+
+def merge_trees(target: dict, source: dict):
+    # 윈도우 순서대로 병합: 같은 리프가 겹침 구간에서 두 번 나오면
+    # 시작/끝 문장을 모두 찾은 결과, 그다음 시작 위치를 소유한 윈도우의 결과가 우선 (동률이면 앞 윈도우)
+    for k, v in source.items():
+        current = target.get(k)
+        if current is None:
+            target[k] = v
+        elif isinstance(current, dict) and isinstance(v, dict):
+            merge_trees(current, v)
+        elif isinstance(current, tuple) and isinstance(v, tuple) and v[2] > current[2]:
+            target[k] = v
+
+
+def build_chunk(node, content: str, name: str = "", base: int = 0):
+    # base: 본문(body)이 원문에서 시작하는 위치. span은 원문 기준 절대 좌표로 저장
+    # content는 복사하지 않고 모든 노드가 본문 문자열을 참조 (SpanChunk.content가 필요할 때 잘라 만듦)
+    if isinstance(node, tuple):
+        s, e, _ = node
+        return SpanChunk(name=name, span=(s + base, e + base), buffer=content, base=base)
+
+    # 내부 노드: 하위 key들로 children을 생성하고 span을 집계 (content는 자식 content의 연결)
+    children = [build_chunk(v, content, name=k, base=base) for k, v in node.items()]
+    if children:
+        agg_start = min(c.span[0] for c in children if isinstance(c.span[0], int))
+        agg_end = max(c.span[1] for c in children if isinstance(c.span[1], int))
+    else:
+        agg_start, agg_end = 0, 0
+    return SpanChunk(name=name, span=(agg_start, agg_end), children=children, buffer=content, base=base)
+
+
+def resolve_document(content: str, windows, responses, protocol: str):
+    """문서 하나의 윈도우별 응답을 정렬해 병합한 span 트리와 오류. (프로세스 풀 task: 인자/결과가 작은 pickle 형태)"""
+    try:
+        merged = {}
+        for window, response in zip(windows, responses):
+            merge_trees(merged, resolve_window(content, window, response, protocol))
+        return merged, None
+    except Exception as e:
+        return {}, f"{type(e).__name__}: {e}"
+
+
+class Chunker(DocumentNode):
+    goto = "Summarizer"
 
-class Chunker:
     def __init__(self, llm):
         self.llm = llm
 
-    def __call__(self, state, runtime: Runtime[ContextSchema]):
-        # 캐시 로드 시도
-        cache_path = os.path.join("./data/cache", "chunker_documents.pkl")
-        if getattr(runtime.context, "use_cache", False) and os.path.exists(cache_path):
-            try:
-                with open(cache_path, "rb") as f:
-                    documents = pickle.load(f)
-                logger.info(f"Loaded documents from cache: {cache_path}")
-                return Command(update={"documents": documents}, goto="Summarizer")
-            except Exception as e:
-                logger.error(f"Failed to load Chunker cache. Fallback to generation. err={e}")
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", SYSTEM_TEMPLATE),
-            ("user", USER_TEMPLATE),
-        ])
-
-        chain = prompt | self.llm | JsonOutputParser()
-        queries = [{"table_of_contents": doc.table_of_contents, "legal_contract": doc.content} for doc in state.documents]
-
-        with BatchCallback(total=len(queries), desc="Chunker") as cb:
-            responses = chain.batch(queries, config={"callbacks": [cb], "max_concurrency": 4})
-
-        def transform_tree(node, content: str, name: str = ""):
-            # 리프 판단: start_sentence/end_sentence를 가진 dict
-            if isinstance(node, dict) and "start_sentence" in node and "end_sentence" in node \
-               and isinstance(node["start_sentence"], str) and isinstance(node["end_sentence"], str):
-                s, e = find_sentence_range(content, node["start_sentence"], node["end_sentence"])
-                if e < s:
-                    s, e = e, s
-                s = max(0, min(s, len(content)))
-                e = max(0, min(e, len(content)))
-                text = content[s:e] if s < e else ""
-                return Chunk(name=name, span=(s, e), content=text, children=[])
-
-            # 내부 노드: 하위 key들로 children을 생성하고 content/span을 집계
-            if isinstance(node, dict):
-                children = []
-                for k, v in node.items():
-                    child_chunk = transform_tree(v, content, name=k)
-                    if child_chunk is None:
-                        continue
-                    children.append(child_chunk)
-                # 집계
-                if children:
-                    agg_start = min(c.span[0] for c in children if isinstance(c.span[0], int))
-                    agg_end = max(c.span[1] for c in children if isinstance(c.span[1], int))
-                    agg_content = "".join(c.content for c in children)
+    def prepare(self, documents, runtime: Runtime[ContextSchema]):
+        """(chain, cache, 캐시에 없는 [(doc, key)], 문서별 윈도우, 윈도우별 query) — 동기/비동기 실행이 공유"""
+        protocol = runtime.context.chunking_protocol
+        if protocol == "line":
+            prompt = ChatPromptTemplate.from_messages([
+                ("system", LINE_SYSTEM_TEMPLATE),
+                ("user", LINE_USER_TEMPLATE),
+            ])
+        else:
+            prompt = ChatPromptTemplate.from_messages([
+                ("system", SYSTEM_TEMPLATE),
+                ("user", USER_TEMPLATE),
+            ])
+
+        window_tokens = runtime.context.chunker_window_tokens
+        overlap_tokens = runtime.context.chunker_window_overlap_tokens
+
+        # 문서 단위 캐시: 본문/목차/span/윈도우 설정/프로토콜/프롬프트/모델이 같으면 이전 트리를 재사용하고 나머지만 생성
+        cache = StageCache("chunker", llm=self.llm, prompt=prompt, enabled=getattr(runtime.context, "use_cache", False))
+        # 규칙 기반 파서로 트리를 만든 문서는 건너뜀
+        targets = [doc for doc in documents if doc.structure_source != "heading_parser" and not doc.failed_stage]
+        keys = [cache.key(doc.content, doc.table_of_contents, doc.span, window_tokens, overlap_tokens, protocol) for doc in targets]
+        missing = []
+        for doc, key in zip(targets, keys):
+            cached = cache.get(key)
+            if cached is None:
+                missing.append((doc, key))
+            else:
+                doc.children = {k: SpanChunk.from_dump(v, doc.content, doc.span[0]) for k, v in cached.items()}
+        logger.info(f"Chunker cache: {cache.hits} hit / {len(missing)} miss")
+
+        # 긴 문서는 조항 경계에서 겹치는 윈도우로 나눠 모든 문서의 윈도우를 함께 병렬 요청
+        windows_by_doc = []
+        queries = []
+        for doc, _ in missing:
+            windows = plan_windows(doc.content, doc.table_of_contents, window_tokens, overlap_tokens)
+            if len(windows) > 1:
+                logger.info(f"Chunker: {doc.file_path} -> {len(windows)} windows")
+            windows_by_doc.append(windows)
+            for window in windows:
+                if protocol == "line":
+                    # 줄 번호는 문서 전체 기준이므로 윈도우가 달라도 같은 줄은 같은 번호
+                    segmentation = segment_lines(doc.content)
+                    legal_contract = segmentation.render(*segmentation.line_range(window.start, window.end))
                 else:
-                    agg_start, agg_end, agg_content = 0, 0, ""
-                return Chunk(name=name, span=(agg_start, agg_end), content=agg_content, children=children)
-
-            # list는 무시(예상치 않음)
-            return None
+                    legal_contract = doc.content[window.start:window.end]
+                queries.append({"table_of_contents": window.table_of_contents, "legal_contract": legal_contract})
 
-        documents = []
-        for doc, resp in zip(state.documents, responses):
+        chain = prompt | self.llm | JsonOutputParser()
+        return chain, cache, missing, windows_by_doc, queries
+
+    def retry_options(self, runtime: Runtime[ContextSchema]) -> dict:
+        return {
+            "validate": chunk_response_validator(runtime.context.chunking_protocol),
+            "max_attempts": runtime.context.llm_max_attempts,
+            "backoff": runtime.context.llm_retry_backoff,
+        }
+
+    def assemble(self, missing, merged_trees, doc_errors, cache, runtime: Runtime[ContextSchema]):
+        """문서별로 병합된 span 트리로 Chunk 트리를 만들고 캐시에 저장합니다."""
+        dead_letter = get_dead_letter_queue(runtime.context.dead_letter_path)
+        for (doc, key), merged, error in zip(missing, merged_trees, doc_errors):
+            if error is not None:
+                # 일부 윈도우만 빠진 트리를 적재하지 않도록 문서 전체를 실패로 처리
+                logger.error(f"Chunker failed: {doc.file_path} err={error}")
+                mark_failed(doc, "Chunker", error, dead_letter)
+                continue
             try:
-                transformed_root = {}
-                if isinstance(resp, dict):
-                    for top_key, subtree in resp.items():
-                        ch = transform_tree(subtree, doc.content, name=top_key)
-                        if ch is not None:
-                            transformed_root[top_key] = ch
-                else:
-                    transformed_root = {}
-            except Exception:
+                transformed_root = {
+                    top_key: build_chunk(subtree, doc.content, name=top_key, base=doc.span[0])
+                    for top_key, subtree in merged.items()
+                }
+            except Exception as e:
+                logger.error(f"Chunker failed to build tree: {doc.file_path} err={e}")
                 transformed_root = {}
             doc.children = transformed_root
-            documents.append(doc)
-
-        # 캐시 저장 시도 (반환 직전)
-        try:
-            os.makedirs("./data/cache", exist_ok=True)
-            with open(cache_path, "wb") as f:
-                pickle.dump(documents, f)
-            logger.info(f"Saved documents to cache: {cache_path}")
-        except Exception as e:
-            logger.error(f"Failed to save Chunker cache: {e}")
-
-        return Command(update={"documents": documents}, goto="Summarizer")
+            if not transformed_root:
+                # 실패/빈 결과는 캐시하지 않고 dead-letter로 보내 다음 실행에서 다시 시도
+                mark_failed(doc, "Chunker", "no leaf could be aligned to the document", dead_letter)
+                continue
+            try:
+                cache.put(key, {k: v.compact_dump() for k, v in transformed_root.items()})
+            except Exception as e:
+                logger.error(f"Failed to save Chunker cache: {e}")
+
+    def process(self, documents, runtime: Runtime[ContextSchema]):
+        protocol = runtime.context.chunking_protocol
+        chain, cache, missing, windows_by_doc, queries = self.prepare(documents, runtime)
+        with BatchCallback(total=len(queries), desc="Chunker") as cb:
+            # 윈도우 단위로 실패를 격리해 실패한 윈도우만 다시 요청
+            responses, errors = batch_with_retry(
+                chain,
+                queries,
+                config={"callbacks": [cb], "max_concurrency": runtime.context.llm_max_concurrency},
+                **self.retry_options(runtime),
+            )
+
+        # 응답 정렬/병합은 문서 단위 task로 프로세스 풀(cpu_workers)에서 실행
+        tasks, task_index, doc_errors = [], [], []
+        offset = 0
+        for i, ((doc, _), windows) in enumerate(zip(missing, windows_by_doc)):
+            window_errors = [error for error in errors[offset:offset + len(windows)] if error is not None]
+            if window_errors:
+                doc_errors.append(f"{len(window_errors)}/{len(windows)} windows failed: {window_errors[0]}")
+            else:
+                doc_errors.append(None)
+                tasks.append((doc.content, windows, responses[offset:offset + len(windows)], protocol))
+                task_index.append(i)
+            offset += len(windows)
+
+        merged_trees = [{} for _ in missing]
+        executor = get_stage_executor(runtime.context.cpu_workers)
+        for i, (merged, error) in zip(task_index, executor.map(resolve_document, tasks)):
+            merged_trees[i] = merged
+            doc_errors[i] = error
+        self.assemble(missing, merged_trees, doc_errors, cache, runtime)
+        return documents
+
+    async def aprocess(self, documents, runtime: Runtime[ContextSchema]):
+        protocol = runtime.context.chunking_protocol
+        chain, cache, missing, windows_by_doc, queries = await asyncio.to_thread(self.prepare, documents, runtime)
+        windows = [(doc, window) for (doc, _), doc_windows in zip(missing, windows_by_doc) for window in doc_windows]
+        semaphore = asyncio.Semaphore(max(1, runtime.context.llm_max_concurrency))
+        options = self.retry_options(runtime)
+        executor = get_stage_executor(runtime.context.cpu_workers)
+
+        with BatchCallback(total=len(queries), desc="Chunker") as cb:
+            async def chunk_window(doc, window, query):
+                async with semaphore:
+                    response, error = await ainvoke_with_retry(chain, query, config={"callbacks": [cb]}, **options)
+                if error is not None:
+                    return {}, error
+                # 응답이 온 윈도우부터 바로 정렬(프로세스 풀 또는 스레드): 다른 윈도우의 네트워크 대기와 겹쳐 실행
+                try:
+                    return await executor.run(resolve_window, doc.content, window, response, protocol), None
+                except Exception as e:
+                    return {}, f"{type(e).__name__}: {e}"
+
+            results = await asyncio.gather(*[
+                chunk_window(doc, window, query) for (doc, window), query in zip(windows, queries)
+            ])
+
+        merged_trees, doc_errors = [], []
+        offset = 0
+        for windows_of_doc in windows_by_doc:
+            doc_results = results[offset:offset + len(windows_of_doc)]
+            offset += len(windows_of_doc)
+            window_errors = [error for _, error in doc_results if error is not None]
+            merged = {}
+            if window_errors:
+                doc_errors.append(f"{len(window_errors)}/{len(windows_of_doc)} windows failed: {window_errors[0]}")
+            else:
+                for tree, _ in doc_results:
+                    merge_trees(merged, tree)
+                doc_errors.append(None)
+            merged_trees.append(merged)
+        await asyncio.to_thread(self.assemble, missing, merged_trees, doc_errors, cache, runtime)
+        return documents
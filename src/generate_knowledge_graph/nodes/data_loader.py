@@ -1,4 +1,5 @@
 import random
+import asyncio
 from typing_extensions import Self
 from collections.abc import Sequence
 from pydantic import BaseModel, model_validator, computed_field
@@ -6,6 +7,8 @@ from logger import setup_logger
 from langgraph.types import Command
 from langgraph.runtime import Runtime
 from generate_knowledge_graph.utils.model import Document
+from generate_knowledge_graph.utils.failures import get_dead_letter_queue
+from generate_knowledge_graph.utils.document_store import DocumentStore
 from generate_knowledge_graph.state import ContextSchema
 
 
@@ -56,13 +59,11 @@ class Benchmark(BaseModel):
 
 
 class DataLoader:
-    def __call__(self, state, runtime: Runtime[ContextSchema]):
-        logger.info("Loading data...")
-        
+    def get_document_file_paths(self, benchmark_name: str) -> list[str]:
         all_tests: list[QAGroundTruth] = []
         document_file_paths_set: set[str] = set()
         used_document_file_paths_set: set[str] = set()
-        with open(f"./data/benchmarks/{runtime.context.benchmark_name}.json", encoding="utf-8") as f:
+        with open(f"./data/benchmarks/{benchmark_name}.json", encoding="utf-8") as f:
             benchmark = Benchmark.model_validate_json(f.read())
             tests = benchmark.tests
             document_file_paths_set |= {
@@ -81,28 +82,61 @@ class DataLoader:
                 snippet.file_path for test in tests for snippet in test.snippets
             }
             for test in tests:
-                test.tags = [runtime.context.benchmark_name]
+                test.tags = [benchmark_name]
             all_tests.extend(tests)
-        
 
-        benchmark = Benchmark(
-            tests=all_tests,
-        )
-
-        # Create corpus (sorted for consistent processing)
-        corpus: list[Document] = []
-        for document_file_path in sorted(used_document_file_paths_set):
+        # sorted for consistent processing
+        return sorted(used_document_file_paths_set)
+
+    def select_file_paths(self, context: ContextSchema) -> list[str]:
+        """retry_dead_letter면 dead-letter 파일에 남은 문서만, 아니면 벤치마크의 전체 문서"""
+        file_paths = self.get_document_file_paths(context.benchmark_name)
+        if context.retry_dead_letter:
+            dead_lettered = get_dead_letter_queue(context.dead_letter_path).load()
+            file_paths = [path for path in file_paths if path in dead_lettered]
+            logger.info(f"dead-letter 문서 {len(file_paths)}건만 다시 처리")
+        return file_paths
+
+    def load_documents(self, benchmark_name: str, file_paths=None):
+        """문서를 하나씩 읽어 반환하는 generator (스트리밍 파이프라인에서 전체 corpus를 메모리에 올리지 않음)"""
+        if file_paths is None:
+            file_paths = self.get_document_file_paths(benchmark_name)
+        for document_file_path in file_paths:
             # if document_file_path != "maud/DSP_Group_Synaptics_Incorporated.txt" and document_file_path != "maud/Adamas_Pharmaceuticals_Supernus_Pharmaceuticals.txt":
             # if document_file_path != "maud/TIFFANY_&_CO._LVMH_MOËT_HENNESSY-LOUIS_VUITTON.txt":
             #     continue
             with open(f"./data/corpus/{document_file_path}", encoding="utf-8") as f:
-                corpus.append(
-                    Document(
-                        file_path=document_file_path,
-                        content=f.read(),
-                    )
+                yield Document(
+                    file_path=document_file_path,
+                    content=f.read(),
                 )
-        
+
+    def __call__(self, state, runtime: Runtime[ContextSchema]):
+        logger.info("Loading data...")
+
+        if runtime.context.use_document_store:
+            # corpus 전체를 메모리에 올리지 않고 window 단위로 저장소에 기록한 뒤 경로만 전달
+            store = DocumentStore(runtime.context.document_store_path)
+            store.clear()
+            window = []
+            for document in self.load_documents(runtime.context.benchmark_name, self.select_file_paths(runtime.context)):
+                window.append(document)
+                if len(window) >= runtime.context.document_window_size:
+                    store.put_many(window)
+                    window = []
+            store.put_many(window)
+            logger.info(f"loaded {store.count()} documents into {store.path}")
+            return Command(
+                update={
+                    "document_store": store.path
+                },
+                goto="IntroBodySeparator"
+            )
+
+        corpus: list[Document] = list(
+            self.load_documents(runtime.context.benchmark_name, self.select_file_paths(runtime.context))
+        )
+
         logger.info(f"loaded {len(corpus)} documents")
         
         return Command(
@@ -110,4 +144,8 @@ class DataLoader:
                 "documents": corpus
             },
             goto="IntroBodySeparator"
-        )
\ No newline at end of file
+        )
+
+    async def acall(self, state, runtime: Runtime[ContextSchema]):
+        # 파일 읽기는 이벤트 루프를 막지 않도록 스레드에서 실행
+        return await asyncio.to_thread(self, state, runtime)
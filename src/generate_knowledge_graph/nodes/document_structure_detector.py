@@ -1,6 +1,5 @@
 import re
 import json
-import difflib
 from langchain_core.prompts import ChatPromptTemplate
 from generate_knowledge_graph.utils import *
 from logger import setup_logger
@@ -8,6 +7,7 @@ from langgraph.types import Command
 from langgraph.runtime import Runtime
 
 from generate_knowledge_graph.utils.callback import BatchCallback
+from generate_knowledge_graph.utils.alignment import find_sentence_range
 from generate_knowledge_graph.state import ContextSchema
 
 logger = setup_logger()
@@ -53,35 +53,6 @@ USER_TEMPLATE = """<Table_of_Contents>
 </Current_Page>
 """
 
-def _best_window_by_words(current_page: str, target_sentence: str):
-    token_spans = [(m.start(), m.end()) for m in re.finditer(r'\S+', current_page)]
-    words_in_target = re.findall(r'\S+', target_sentence)
-    window_words = len(words_in_target)
-    if window_words <= 0 or not token_spans:
-        return 0, 0, 0.0
-
-    best_score = -1.0
-    best_start_char, best_end_char = 0, 0
-    cp_lower = current_page.lower()
-    target_lower = target_sentence.lower()
-
-    max_start = len(token_spans) - window_words
-    for i in range(max_start + 1):
-        w_start = token_spans[i][0]
-        w_end = token_spans[i + window_words - 1][1]
-        window_text = cp_lower[w_start:w_end]
-        score = difflib.SequenceMatcher(None, target_lower, window_text).ratio()
-        if score > best_score:
-            best_score = score
-            best_start_char, best_end_char = w_start, w_end
-
-    return best_start_char, best_end_char, best_score
-
-def find_sentence_range(current_page: str, start_sentence: str, end_sentence: str):
-    s_start, s_end, _ = _best_window_by_words(current_page, start_sentence)
-    e_start, e_end, _ = _best_window_by_words(current_page, end_sentence)
-    return s_start, e_end
-
 
 class DocumentStructureDetector:
     def __init__(self, llm):
@@ -1,4 +1,5 @@
 import json
+import asyncio
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_openai import ChatOpenAI
@@ -9,31 +10,163 @@ from uuid import uuid4
 from langgraph.runtime import Runtime
 
 from generate_knowledge_graph.state import ContextSchema
+from generate_knowledge_graph.utils.failures import get_dead_letter_queue
+from generate_knowledge_graph.utils.document_store import DocumentStore
 
 
 logger = setup_logger()
 
 
+def merge_stats(total: dict, stats: dict) -> dict:
+    for key, value in stats.items():
+        total[key] = total.get(key, 0) + value
+    return total
+
+
 class GraphDBWriter:
     def __init__(self, neo4j_client):
         self.neo4j_client = neo4j_client
 
-    def __call__(self, state, runtime: Runtime[ContextSchema]):
-        # 데이터베이스 초기화 여부 확인
+    def prepare(self, runtime: Runtime[ContextSchema]):
+        # 제약 조건과 벡터 인덱스는 항상 유지 (없을 때만 생성)
+        logger.info("Neo4j 데이터베이스 인덱스 및 제약 조건 확인 중...")
+        self.neo4j_client.setup_constraints()
+        self.neo4j_client.setup_vector_indexes()
+
+        # 전체 재적재가 필요할 때만 데이터 삭제
         if runtime.context.clear_database:
             logger.info("Neo4j 데이터베이스 초기화 중...")
             self.neo4j_client.clear_database()
-            
-            # 벡터 인덱스 및 제약 조건 재설정
-            logger.info("Neo4j 데이터베이스 인덱스 및 제약 조건 설정 중...")
-            self.neo4j_client.setup_constraints()
-            self.neo4j_client.setup_vector_indexes()
-        
-        # Summarizer에서 업데이트된 documents를 DB에 적재
-        documents = getattr(state, "documents", []) or []
-        self.neo4j_client.create_nodes_and_relationships(documents)
-        self.neo4j_client.close()
-        
+
+    def process(self, documents, runtime: Runtime[ContextSchema]) -> dict:
+        """문서를 내용 해시 기준으로 증분 적재합니다. (입력에 없는 문서 삭제는 finalize에서 수행)
+
+        앞 단계에서 실패한 문서(failed_stage)는 적재하지 않아 기존 그래프 내용을 그대로 둡니다.
+        """
+        failed = [doc for doc in documents if doc.failed_stage]
+        documents = [doc for doc in documents if not doc.failed_stage]
+        if failed:
+            logger.warning(f"실패한 문서 {len(failed)}건은 적재하지 않음: {[(doc.file_path, doc.failed_stage) for doc in failed]}")
+        stats = self.neo4j_client.sync_documents(
+            documents,
+            batch_size=runtime.context.graph_write_batch_size,
+            max_workers=runtime.context.graph_write_concurrency,
+            delete_missing=False,
+        )
+        # 바뀐 내용이 있을 때만 검색 측 벡터 캐시 무효화
+        if stats["created"] or stats["updated"]:
+            self.neo4j_client.bump_graph_version()
+        # 이전 실행에서 dead-letter로 남았던 문서가 이번에 적재되면 기록 삭제
+        get_dead_letter_queue(runtime.context.dead_letter_path).resolve([doc.file_path for doc in documents])
+        stats["failed"] = len(failed)
+        return stats
+
+    def refresh_summaries(self, documents, runtime: Runtime[ContextSchema]) -> dict:
+        """요약만 다시 만든 문서의 summary/vector 속성을 기존 그래프에서 제자리 갱신합니다."""
+        failed = [doc for doc in documents if doc.failed_stage]
+        documents = [doc for doc in documents if not doc.failed_stage]
+        stats = self.neo4j_client.refresh_summaries(documents, batch_size=runtime.context.graph_write_batch_size)
+        if stats["summaries"] or stats["fallback"]:
+            self.neo4j_client.bump_graph_version()
+        get_dead_letter_queue(runtime.context.dead_letter_path).resolve([doc.file_path for doc in documents])
+        stats["failed"] = len(failed)
+        return stats
+
+    def finalize(self, file_paths, runtime: Runtime[ContextSchema]) -> int:
+        """전체 입력 문서 목록에 없는 Corpus를 삭제합니다."""
+        # dead-letter 재처리는 일부 문서만 입력으로 받으므로 삭제하지 않음
+        if not runtime.context.delete_missing_documents or runtime.context.retry_dead_letter:
+            return 0
+        deleted = self.neo4j_client.delete_missing_documents(
+            file_paths, batch_size=runtime.context.graph_write_batch_size
+        )
+        if deleted:
+            self.neo4j_client.bump_graph_version()
+        return deleted
+
+    def __call__(self, state, runtime: Runtime[ContextSchema]):
+        self.prepare(runtime)
+
+        store_path = getattr(state, "document_store", "")
+        if store_path:
+            # 저장소의 문서를 window 단위로 적재
+            store = DocumentStore(store_path)
+            stats = {}
+            for window in store.iter_windows(runtime.context.document_window_size):
+                merge_stats(stats, self.process(window, runtime))
+            file_paths = store.file_paths()
+        else:
+            # Summarizer에서 업데이트된 documents를 DB에 적재
+            documents = getattr(state, "documents", []) or []
+            stats = self.process(documents, runtime)
+            file_paths = [doc.file_path for doc in documents]
+        stats["deleted"] = self.finalize(file_paths, runtime)
+        logger.info(f"Neo4j 증분 적재 결과: {stats}")
+
+        logger.info("Neo4j 그래프 데이터베이스에 데이터 저장 완료")
+        return Command(
+            update={},
+            goto="__end__"
+        )
+
+    # --- async_graph용: 비동기 Neo4j 드라이버로 같은 단계를 실행 ---
+    async def aprepare(self, runtime: Runtime[ContextSchema]):
+        logger.info("Neo4j 데이터베이스 인덱스 및 제약 조건 확인 중...")
+        await self.neo4j_client.asetup_constraints()
+        await self.neo4j_client.asetup_vector_indexes()
+        if runtime.context.clear_database:
+            logger.info("Neo4j 데이터베이스 초기화 중...")
+            await self.neo4j_client.aclear_database()
+
+    async def aprocess(self, documents, runtime: Runtime[ContextSchema]) -> dict:
+        failed = [doc for doc in documents if doc.failed_stage]
+        documents = [doc for doc in documents if not doc.failed_stage]
+        if failed:
+            logger.warning(f"실패한 문서 {len(failed)}건은 적재하지 않음: {[(doc.file_path, doc.failed_stage) for doc in failed]}")
+        stats = await self.neo4j_client.async_sync_documents(
+            documents,
+            batch_size=runtime.context.graph_write_batch_size,
+            max_workers=runtime.context.graph_write_concurrency,
+            delete_missing=False,
+        )
+        if stats["created"] or stats["updated"]:
+            await self.neo4j_client.abump_graph_version()
+        await asyncio.to_thread(
+            get_dead_letter_queue(runtime.context.dead_letter_path).resolve, [doc.file_path for doc in documents]
+        )
+        stats["failed"] = len(failed)
+        return stats
+
+    async def afinalize(self, file_paths, runtime: Runtime[ContextSchema]) -> int:
+        if not runtime.context.delete_missing_documents or runtime.context.retry_dead_letter:
+            return 0
+        deleted = await self.neo4j_client.adelete_missing_documents(
+            file_paths, batch_size=runtime.context.graph_write_batch_size
+        )
+        if deleted:
+            await self.neo4j_client.abump_graph_version()
+        return deleted
+
+    async def acall(self, state, runtime: Runtime[ContextSchema]):
+        await self.aprepare(runtime)
+        store_path = getattr(state, "document_store", "")
+        if store_path:
+            store = DocumentStore(store_path)
+            stats = {}
+            position = -1
+            while True:
+                window, position = await asyncio.to_thread(store.read_window, position, runtime.context.document_window_size)
+                if not window:
+                    break
+                merge_stats(stats, await self.aprocess(window, runtime))
+            file_paths = await asyncio.to_thread(store.file_paths)
+        else:
+            documents = getattr(state, "documents", []) or []
+            stats = await self.aprocess(documents, runtime)
+            file_paths = [doc.file_path for doc in documents]
+        stats["deleted"] = await self.afinalize(file_paths, runtime)
+        logger.info(f"Neo4j 증분 적재 결과: {stats}")
+
         logger.info("Neo4j 그래프 데이터베이스에 데이터 저장 완료")
         return Command(
             update={},
@@ -0,0 +1,203 @@
+import re
+from collections import Counter
+from logger import setup_logger
+from langgraph.runtime import Runtime
+
+from generate_knowledge_graph.utils.model import Document, SpanChunk
+from generate_knowledge_graph.utils.executor import get_stage_executor
+from generate_knowledge_graph.state import ContextSchema
+from generate_knowledge_graph.nodes.base import DocumentNode
+
+logger = setup_logger()
+
+
+ARTICLE_PATTERN = re.compile(r"^[ \t]*ARTICLE[ \t]+([IVXLCDM]+|\d+)\b\.?[ \t]*(.*)$", re.IGNORECASE | re.MULTILINE)
+SECTION_PATTERN = re.compile(r"^[ \t]*(?:SECTION[ \t]+)?(\d+)\.(\d+)\b\.?[ \t]*(.*)$", re.IGNORECASE | re.MULTILINE)
+ATTACHMENT_PATTERN = re.compile(r"^[ \t]*(EXHIBIT|ANNEX)[ \t]+([A-Z]{1,3}|\d+|[IVX]+)\b[ \t:.\-–—]*(.*)$", re.IGNORECASE | re.MULTILINE)
+
+ROMAN_VALUES = {"I": 1, "V": 5, "X": 10, "L": 50, "C": 100, "D": 500, "M": 1000}
+
+
+def parse_number(token: str) -> int:
+    if token.isdigit():
+        return int(token)
+    total = 0
+    values = [ROMAN_VALUES.get(ch, 0) for ch in token.upper()]
+    for i, value in enumerate(values):
+        total += -value if i + 1 < len(values) and value < values[i + 1] else value
+    return total
+
+
+def heading_title(line_rest: str, content: str, line_end: int) -> str:
+    # 제목이 같은 줄에 없으면 다음 비어 있지 않은 줄을 제목으로 사용
+    title = line_rest.strip()
+    if not title:
+        next_line = content[line_end:line_end + 300].strip().split("\n", 1)[0]
+        title = next_line.strip()
+    # "Definitions. As used in ..."처럼 본문이 이어지면 첫 마침표까지만
+    return title.split(". ", 1)[0].strip().rstrip(".")[:120]
+
+
+def parse_document_structure(content: str, span, min_articles: int):
+    """프로세스 풀 task: (목차, span만 담은 트리 dump, 신뢰도, 오류)"""
+    try:
+        table_of_contents, tree, confidence = HeadingStructureParser().build(Document(content=content, span=span), min_articles)
+    except Exception as e:
+        return None, None, 0.0, f"{type(e).__name__}: {e}"
+    dumps = {key: chunk.compact_dump() for key, chunk in tree.items()} if tree else None
+    return table_of_contents, dumps, confidence, None
+
+
+class HeadingStructureParser(DocumentNode):
+    """ARTICLE / Section / Exhibit / Annex 제목 규칙으로 목차와 Chunk 트리를 LLM 없이 만듭니다.
+
+    번호 순서가 맞는 제목만 받아들이고(본문 속 상호 참조 제거), 커버리지/순서/span 단조성 검증을
+    통과한 문서만 structure_source="heading_parser"로 표시합니다. 나머지는 LLM 단계(목차 추출, Chunker)로 넘어갑니다.
+    """
+
+    goto = "TableOfContentsExtractor"
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def find_headings(self, content: str) -> list:
+        """[(kind, key, title, start, line_end)] 순서대로 받아들인 제목 목록"""
+        headings = []
+        article_no = 0
+        for match in ARTICLE_PATTERN.finditer(content):
+            number = parse_number(match.group(1))
+            if number == article_no + 1:
+                article_no = number
+                headings.append(("article", f"ARTICLE_{match.group(1).upper()}", heading_title(match.group(2), content, match.end()), match.start(), match.end()))
+        if not headings:
+            return []
+
+        # 조항 사이의 Section 제목: 현재 조항 번호와 같고, 번호가 증가하는 것만
+        articles = headings
+        headings = []
+        for i, article in enumerate(articles):
+            headings.append(article)
+            region_end = articles[i + 1][3] if i + 1 < len(articles) else len(content)
+            article_number = i + 1
+            section_no = 0
+            for match in SECTION_PATTERN.finditer(content, article[4], region_end):
+                major, minor = int(match.group(1)), int(match.group(2))
+                if major == article_number and minor > section_no:
+                    section_no = minor
+                    key = f"section_{match.group(1)}_{match.group(2)}"
+                    headings.append(("section", key, heading_title(match.group(3), content, match.end()), match.start(), match.end()))
+
+        # 마지막 Section 이후의 짧은 Exhibit/Annex 제목 (처음 나온 것만)
+        seen = set()
+        for match in ATTACHMENT_PATTERN.finditer(content, headings[-1][4]):
+            line = match.group(0)
+            key = f"{match.group(1).capitalize()}_{match.group(2).upper()}"
+            if len(line.strip()) > 100 or key in seen:
+                continue
+            seen.add(key)
+            headings.append(("attachment", key, heading_title(match.group(3), content, match.end()), match.start(), match.end()))
+        return headings
+
+    def build(self, document, min_articles: int):
+        """(table_of_contents, children, confidence) 또는 검증 실패 시 (None, None, confidence)"""
+        content = document.content or ""
+        headings = self.find_headings(content)
+        articles = [h for h in headings if h[0] == "article"]
+        sections = [h for h in headings if h[0] == "section"]
+        if len(articles) < min_articles or len(sections) < len(articles):
+            return None, None, 0.0
+
+        starts = [h[3] for h in headings] + [len(content)]
+        base = document.span[0]
+
+        def leaf(index: int, name: str) -> SpanChunk:
+            start, end = headings[index][3], starts[index + 1]
+            length = len(content[start:end].rstrip())
+            return SpanChunk(name=name, span=(start + base, start + length + base), buffer=content, base=base)
+
+        def parent(name: str, children: list) -> SpanChunk:
+            return SpanChunk(
+                name=name,
+                span=(children[0].span[0], children[-1].span[1]),
+                children=children,
+                buffer=content,
+                base=base,
+            )
+
+        table_of_contents = {}
+        children = {}
+        attachments = {"Exhibit": ({}, []), "Annex": ({}, [])}
+        current = None
+        for index, (kind, key, title, _, _) in enumerate(headings):
+            if kind == "article":
+                current = {"name": title, "sections": {}}
+                table_of_contents[key] = current
+                children[key] = []
+                article_key = key
+                # 조항에 Section이 없으면 조항 전체가 리프
+                if index + 1 >= len(headings) or headings[index + 1][0] != "section":
+                    children[key].append(leaf(index, key))
+            elif kind == "section":
+                current["sections"][key] = title
+                children[article_key].append(leaf(index, key))
+            else:
+                prefix = key.split("_", 1)[0]
+                toc, chunks = attachments[prefix]
+                toc[key] = title
+                chunks.append(leaf(index, key))
+
+        tree = {}
+        for key, chunks in children.items():
+            if len(chunks) == 1 and chunks[0].name == key:
+                tree[key] = chunks[0]
+            else:
+                tree[key] = parent(key, chunks)
+        for prefix, (toc, chunks) in attachments.items():
+            if chunks:
+                table_of_contents[f"{prefix}s"] = toc
+                tree[f"{prefix}s"] = parent(f"{prefix}s", chunks)
+
+        # 검증: 리프 span 단조 증가/비중첩, 첫 제목 앞 비율, 본문 커버리지
+        leaves = []
+        for chunk in tree.values():
+            leaves.extend(chunk.children or [chunk])
+        for prev, cur in zip(leaves, leaves[1:]):
+            if cur.span[0] < prev.span[1] or cur.span[0] <= prev.span[0]:
+                return None, None, 0.0
+        body_length = max(1, len(content.rstrip()))
+        prefix_ratio = headings[0][3] / body_length
+        coverage = sum(c.span[1] - c.span[0] for c in leaves) / max(1, body_length - headings[0][3])
+        confidence = max(0.0, min(1.0, coverage) * (1.0 - prefix_ratio))
+        return table_of_contents, tree, confidence
+
+    def process(self, documents, runtime: Runtime[ContextSchema]):
+        if not runtime.context.use_heading_parser:
+            for document in documents:
+                document.structure_source = "llm"
+            self.counts["llm"] += len(documents)
+            return documents
+
+        counts = Counter()
+        # 문서 단위 task로 프로세스 풀(cpu_workers)에서 파싱하고, 트리는 span만 받아 본문을 참조하도록 복원
+        executor = get_stage_executor(runtime.context.cpu_workers)
+        results = executor.map(
+            parse_document_structure,
+            [(document.content or "", document.span, runtime.context.heading_parser_min_articles) for document in documents],
+        )
+        for document, (table_of_contents, tree, confidence, error) in zip(documents, results):
+            if error is not None:
+                logger.error(f"HeadingStructureParser failed: {document.file_path} err={error}")
+            if tree and confidence >= runtime.context.heading_parser_min_confidence:
+                document.table_of_contents = table_of_contents
+                document.children = {
+                    key: SpanChunk.from_dump(chunk, document.content, document.span[0]) for key, chunk in tree.items()
+                }
+                document.structure_source = "heading_parser"
+            else:
+                document.structure_source = "llm"
+            counts[document.structure_source] += 1
+        self.counts.update(counts)
+        logger.info(
+            f"HeadingStructureParser: heading_parser {counts['heading_parser']} / llm fallback {counts['llm']} documents"
+        )
+        return documents
@@ -1,21 +1,23 @@
 import json
 from langchain_core.prompts import ChatPromptTemplate
 from logger import setup_logger
-from langgraph.types import Command
 from langgraph.runtime import Runtime
 
 from generate_knowledge_graph.utils.callback import BatchCallback
 from generate_knowledge_graph.state import ContextSchema
+from generate_knowledge_graph.nodes.base import DocumentNode
 from generate_knowledge_graph.utils import JsonOutputParser
 
 logger = setup_logger()
 
 
-class IntroBodySeparator:
+class IntroBodySeparator(DocumentNode):
+    goto = "HeadingStructureParser"
+
     def __init__(self, llm):
         self.llm = llm
 
-    def __call__(self, state, runtime: Runtime[ContextSchema]):
+    def process(self, documents, runtime: Runtime[ContextSchema]):
         # chain = runtime.context.contract_start_finder_prompt | self.llm | JsonOutputParser()
         # queries = [{"legal_contract": document.content.strip()[:10000]} for document in state.documents]
 
@@ -25,7 +27,7 @@ class IntroBodySeparator:
         # contract_start_sentence = {document.file_path: response["contract_start_sentence"] for document, response in zip(state.documents, responses)}
         
         # Filter text after 'follows:' for each document
-        for document in state.documents:
+        for document in documents:
             content = (document.content or "")
             lower_content = content.lower()
             marker = "follows:"
@@ -41,13 +43,8 @@ class IntroBodySeparator:
                 document.span = (start, end)
             else:
                 # 구분자가 없으면 본문 전체로 간주하고 인트로는 빈 문자열
-                document.body = content
+                document.content = content
                 document.intro = ""
                 document.span = (0, len(content))
 
-        return Command(
-            update={
-                "documents": state.documents,
-            },
-            goto="TableOfContentsExtractor"
-        )
\ No newline at end of file
+        return documents
\ No newline at end of file
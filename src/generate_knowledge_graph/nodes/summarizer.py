@@ -1,10 +1,14 @@
+import asyncio
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langgraph.types import Command
 
 from generate_knowledge_graph.utils.parser import JsonOutputParser
 from generate_knowledge_graph.utils.callback import BatchCallback
+from generate_knowledge_graph.utils.scheduler import run_bottom_up
+from generate_knowledge_graph.utils.stage_cache import StageCache
+from generate_knowledge_graph.utils.failures import ainvoke_with_retry, get_dead_letter_queue, mark_failed
 from generate_knowledge_graph.state import ContextSchema
+from generate_knowledge_graph.nodes.base import DocumentNode
 from langgraph.runtime import Runtime
 from logger import setup_logger
 
@@ -21,139 +25,112 @@ USER_TEMPLATE = """
 summary:"""
 
 
-class Summarizer:
+def validate_summary(summary):
+    if not isinstance(summary, str) or not summary.strip():
+        return "summary is empty"
+    return None
+
+
+class Summarizer(DocumentNode):
+    goto = "GraphDBWriter"
+
     def __init__(self, llm):
         self.llm = llm
 
-    def __call__(self, state, runtime: Runtime[ContextSchema]):
+    def process(self, documents, runtime: Runtime[ContextSchema]):
+        # 동기 graph/스트리밍 파이프라인용: 호출 스레드에서 이벤트 루프를 하나 띄워 실행
+        return asyncio.run(self.aprocess(documents, runtime))
+
+    async def aprocess(self, documents, runtime: Runtime[ContextSchema]):
         chain = runtime.context.summarizer_prompt | self.llm | StrOutputParser()
-        documents = getattr(state, "documents", []) or []
-
-        def walk_chunks(tree):
-            # dict 트리: 값으로 저장된 최상위 Chunk들을 순회
-            if isinstance(tree, dict):
-                for v in (tree or {}).values():
-                    yield from walk_chunks(v)
-                return
-            # Chunk 노드
-            if hasattr(tree, "children") and isinstance(getattr(tree, "children"), list):
-                yield tree
-                for child in tree.children or []:
-                    yield from walk_chunks(child)
-
-        def collect_leaves(tree):
-            leaves = []
-            for node in walk_chunks(tree):
-                if not getattr(node, "children", None):
-                    leaves.append(node)
-            return leaves
-
-        def collect_parents_by_depth(tree):
-            # 깊이 계산: 루트 0부터, 자식은 +1. 리프 제외
-            depth_map = {}
-            def dfs(node, depth):
-                if not getattr(node, "children", None):
-                    return
-                depth_map.setdefault(depth, []).append(node)
-                for ch in node.children or []:
-                    dfs(ch, depth + 1)
-            if isinstance(tree, dict):
-                for v in (tree or {}).values():
-                    dfs(v, 0)
-            else:
-                dfs(tree, 0)
-            return depth_map
-
-        def gather_nodes_at_level(tree, level):
-            return [ch for ch in iter_chunks_from_tree(tree or []) if int(getattr(ch, "level", 0) or 0) == level]
-
-        def batch_run(inputs, batch_size=16, desc="Summarizer"):
-            outputs = []
-            if not inputs:
-                return outputs
-            with BatchCallback(total=len(inputs), desc=desc) as cb:
-                outputs = chain.batch(inputs, config={"callbacks": [cb], "max_concurrency": batch_size})
-            return outputs
-
-        def compute_max_depth(tree):
-            max_depth = 0
-            def dfs(node, depth):
-                nonlocal max_depth
-                if isinstance(node, dict):
-                    for v in (node or {}).values():
-                        dfs(v, depth)
-                    return
-                # node is a Chunk
-                if depth > max_depth:
-                    max_depth = depth
-                for ch in (getattr(node, "children", []) or []):
-                    dfs(ch, depth + 1)
-            if isinstance(tree, dict):
-                for v in (tree or {}).values():
-                    dfs(v, 0)
-            else:
-                dfs(tree, 0)
-            return max_depth
-
-        # 레벨(층) 정보 계산: 루트=0, 리프=최대 깊이
-        global_max_depth = 0
-        for d in documents:
-            global_max_depth = max(global_max_depth, compute_max_depth(getattr(d, "children", {}) or {}))
-        total_layers = global_max_depth + 1
-
-        # 1) 모든 문서의 리프를 요약(배치)
-        leaf_inputs = []
-        leaf_nodes = []
-        for d in documents:
-            for leaf in collect_leaves(getattr(d, "children", {}) or {}):
-                leaf_inputs.append({"contents": leaf.content})
-                leaf_nodes.append(leaf)
-        if leaf_inputs:
-            # 리프는 최하단 레벨로 표시
-            leaf_summaries = batch_run(
-                leaf_inputs,
-                desc=f"Summarizer L{global_max_depth + 1}/{total_layers}"
+
+        def get_children(node):
+            # Document는 dict 트리의 최상위 Chunk들, Chunk는 children 리스트
+            children = getattr(node, "children", None) or []
+            return list(children.values()) if isinstance(children, dict) else children
+
+        def build_input(node):
+            children = get_children(node)
+            # 리프 Chunk만 원문 content를 요약 (자식이 없는 Document는 빈 내용으로 요약)
+            if not children and not isinstance(getattr(node, "children", None), dict):
+                return {"contents": getattr(node, "content", "") or ""}
+            # 부모/문서는 자식 요약(없으면 content)을 이어 붙여 요약
+            child_text = "\n\n".join(
+                [(getattr(c, "summary", None) or getattr(c, "content", "") or "").strip() for c in children]
             )
-            for node, summary in zip(leaf_nodes, leaf_summaries):
-                node.summary = summary
-
-        # 2) 부모들을 바텀업으로 요약(깊은 레벨부터)
-        # 문서마다 깊이 맵 생성 후, 가장 깊은 레벨부터 위로 올라가며 요약
-        for d in documents:
-            depth_map = collect_parents_by_depth(getattr(d, "children", {}) or {})
-            for depth in sorted(depth_map.keys(), reverse=True):
-                parents = depth_map[depth]
-                if not parents:
-                    continue
-                inputs = []
-                for node in parents:
-                    child_text = "\n\n".join(
-                        [
-                            (getattr(c, "summary", None) or getattr(c, "content", "") or "").strip()
-                            for c in (getattr(node, "children", []) or [])
-                        ]
+            return {"contents": child_text}
+
+        def iter_nodes(node):
+            # 문서 트리를 고정된 순서(전위 순회)로 나열: 캐시 값의 요약 목록과 1:1 대응
+            yield node
+            for child in get_children(node):
+                yield from iter_nodes(child)
+
+        def tree_fingerprint(node):
+            return [(getattr(n, "name", ""), n.span, n.content) for n in iter_nodes(node)]
+
+        # 문서 단위 캐시: 트리(이름/span/본문)/프롬프트/모델이 같으면 이전 요약을 재사용
+        cache = StageCache("summarizer", llm=self.llm, prompt=runtime.context.summarizer_prompt, enabled=getattr(runtime.context, "use_cache", False))
+        targets = [document for document in documents if not document.failed_stage]
+        keys = [cache.key(tree_fingerprint(document)) for document in targets]
+        pending = []
+        for document, key in zip(targets, keys):
+            nodes = list(iter_nodes(document))
+            cached = cache.get(key)
+            if cached is not None and len(cached) == len(nodes):
+                for node, summary in zip(nodes, cached):
+                    node.summary = summary
+            else:
+                pending.append((document, key))
+        logger.info(f"Summarizer cache: {len(targets) - len(pending)} hit / {len(pending)} miss")
+
+        # 캐시에 없는 문서의 모든 노드를 하나의 DAG로 보고, 자식 요약이 끝난 노드부터 바로 요약
+        total = 0
+        owners = {}
+        for document, _ in pending:
+            stack = [document]
+            while stack:
+                node = stack.pop()
+                total += 1
+                owners[id(node)] = document
+                stack.extend(get_children(node))
+
+        # 노드 하나가 끝내 실패해도 DAG 전체를 멈추지 않고 그 문서만 실패로 기록
+        errors = {}
+
+        async def summarize_all():
+            with BatchCallback(total=total, desc="Summarizer") as cb:
+                async def process(node):
+                    summary, error = await ainvoke_with_retry(
+                        chain,
+                        build_input(node),
+                        config={"callbacks": [cb]},
+                        validate=validate_summary,
+                        max_attempts=runtime.context.llm_max_attempts,
+                        backoff=runtime.context.llm_retry_backoff,
                     )
-                    inputs.append({"contents": child_text})
-                # 부모는 해당 깊이(0부터 시작)를 1-based로 표기
-                summaries = batch_run(
-                    inputs,
-                    desc=f"Summarizer L{depth + 1}/{total_layers}"
+                    node.summary = summary or ""
+                    if error is not None:
+                        errors.setdefault(id(owners[id(node)]), error)
+
+                await run_bottom_up(
+                    [document for document, _ in pending],
+                    get_children,
+                    process,
+                    max_concurrency=runtime.context.summarizer_max_concurrency,
                 )
-                for node, summary in zip(parents, summaries):
-                    node.summary = summary
 
-        # 3) 문서 레벨 요약(배치 처리)
-        doc_inputs = []
-        doc_refs = []
-        for d in documents:
-            top_children = getattr(d, "children", {}) or {}
-            top_chunks = list(top_children.values())
-            contents = "\n\n".join([ (getattr(c, "summary", None) or getattr(c, "content", "") or "").strip() for c in top_chunks ])
-            doc_inputs.append({"contents": contents})
-            doc_refs.append(d)
-        if doc_inputs:
-            doc_summaries = batch_run(doc_inputs)
-            for d, s in zip(doc_refs, doc_summaries):
-                d.summary = s
-
-        return Command(update={"documents": documents}, goto="GraphDBWriter")
+        await summarize_all()
+
+        dead_letter = get_dead_letter_queue(runtime.context.dead_letter_path)
+        for document, key in pending:
+            if id(document) in errors:
+                logger.error(f"Summarizer failed: {document.file_path} err={errors[id(document)]}")
+                mark_failed(document, "Summarizer", errors[id(document)], dead_letter)
+                continue
+            try:
+                cache.put(key, [node.summary for node in iter_nodes(document)])
+            except Exception as e:
+                logger.error(f"Failed to save Summarizer cache: {e}")
+
+        return documents
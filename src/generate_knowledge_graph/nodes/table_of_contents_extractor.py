@@ -1,13 +1,14 @@
 import json
-import os
-import pickle
+import asyncio
 from langchain_core.prompts import ChatPromptTemplate
 from logger import setup_logger
-from langgraph.types import Command
 from langgraph.runtime import Runtime
 from generate_knowledge_graph.utils.parser import JsonOutputParser
 from generate_knowledge_graph.utils.callback import BatchCallback
+from generate_knowledge_graph.utils.stage_cache import StageCache
+from generate_knowledge_graph.utils.failures import batch_with_retry, abatch_with_retry, get_dead_letter_queue, mark_failed
 from generate_knowledge_graph.state import ContextSchema
+from generate_knowledge_graph.nodes.base import DocumentNode
 
 logger = setup_logger()
 
@@ -47,44 +48,87 @@ USER_TEMPLATE = """
 """
 
 
-class TableOfContentsExtractor:
+def validate_table_of_contents(response):
+    # 파싱 실패 시 JsonOutputParser는 {}를 반환하므로 빈 목차도 실패로 처리
+    if not isinstance(response, dict) or not response:
+        return "table of contents is empty or not a JSON object"
+    if not any(isinstance(value, (dict, str)) for value in response.values()):
+        return "table of contents has no article entries"
+    return None
+
+
+class TableOfContentsExtractor(DocumentNode):
+    goto = "Chunker"
+
     def __init__(self, llm):
         self.llm = llm
 
-    def __call__(self, state, runtime: Runtime[ContextSchema]):
-        # 캐시 로드 시도
-        cache_path = os.path.join("./data/cache", "table_of_contents_documents.pkl")
-        if getattr(runtime.context, "use_cache", False) and os.path.exists(cache_path):
+    def prepare(self, documents, runtime: Runtime[ContextSchema]):
+        """(chain, cache, 캐시에 없는 [(document, key)]) — 동기/비동기 실행이 공유"""
+        prompt = runtime.context.table_of_contents_extractor_prompt
+        chain = prompt | self.llm | JsonOutputParser()
+
+        # 문서 단위 캐시: 인트로/프롬프트/모델이 같으면 이전 결과를 재사용하고 나머지만 생성
+        cache = StageCache("table_of_contents", llm=self.llm, prompt=prompt, enabled=getattr(runtime.context, "use_cache", False))
+        # 규칙 기반 파서로 목차를 만든 문서는 건너뜀
+        targets = [
+            document for document in documents
+            if document.structure_source != "heading_parser" and not document.failed_stage
+        ]
+        keys = [cache.key(document.intro.strip()) for document in targets]
+        missing = []
+        for document, key in zip(targets, keys):
+            cached = cache.get(key)
+            if cached is None:
+                missing.append((document, key))
+            else:
+                document.table_of_contents = cached
+        logger.info(f"Table of contents cache: {cache.hits} hit / {len(missing)} miss")
+        return chain, cache, missing
+
+    def retry_options(self, runtime: Runtime[ContextSchema]) -> dict:
+        return {
+            "validate": validate_table_of_contents,
+            "max_attempts": runtime.context.llm_max_attempts,
+            "backoff": runtime.context.llm_retry_backoff,
+        }
+
+    def apply(self, missing, responses, errors, cache, runtime: Runtime[ContextSchema]):
+        dead_letter = get_dead_letter_queue(runtime.context.dead_letter_path)
+        for (document, key), response, error in zip(missing, responses, errors):
+            if error is not None:
+                logger.error(f"TableOfContentsExtractor failed: {document.file_path} err={error}")
+                mark_failed(document, "TableOfContentsExtractor", error, dead_letter)
+                continue
+            document.table_of_contents = response
             try:
-                with open(cache_path, "rb") as f:
-                    cached_docs = pickle.load(f)
-                state.documents = cached_docs
-                logger.info(f"Loaded documents from cache: {cache_path}")
-                return Command(update={"documents": state.documents}, goto="Chunker")
+                cache.put(key, response)
             except Exception as e:
-                logger.error(f"Failed to load TOC cache. Fallback to generation. err={e}")
-
-        chain = runtime.context.table_of_contents_extractor_prompt | self.llm | JsonOutputParser()
-        queries = [{"legal_contract": document.intro.strip()} for document in state.documents]
+                logger.error(f"Failed to save TOC cache: {e}")
 
+    def process(self, documents, runtime: Runtime[ContextSchema]):
+        chain, cache, missing = self.prepare(documents, runtime)
+        queries = [{"legal_contract": document.intro.strip()} for document, _ in missing]
         with BatchCallback(total=len(queries), desc="Table of Contents Extractor") as cb:
-            responses = chain.batch(queries, config={"callbacks": [cb], "max_concurrency": 4})
-          
-        for document, response in zip(state.documents, responses):
-            document.table_of_contents = response
+            responses, errors = batch_with_retry(
+                chain,
+                queries,
+                config={"callbacks": [cb], "max_concurrency": runtime.context.llm_max_concurrency},
+                **self.retry_options(runtime),
+            )
+        self.apply(missing, responses, errors, cache, runtime)
+        return documents
 
-        # 캐시 저장 시도
-        try:
-            os.makedirs("./data/cache", exist_ok=True)
-            with open(cache_path, "wb") as f:
-                pickle.dump(state.documents, f)
-            logger.info(f"Saved documents to cache: {cache_path}")
-        except Exception as e:
-            logger.error(f"Failed to save TOC cache: {e}")
-
-        return Command(
-            update={
-                "documents": state.documents,
-            },
-            goto="Chunker"
-        )
\ No newline at end of file
+    async def aprocess(self, documents, runtime: Runtime[ContextSchema]):
+        # 스레드 풀 없이 이벤트 루프에서 최대 llm_max_concurrency개의 요청을 동시에 보냄
+        chain, cache, missing = await asyncio.to_thread(self.prepare, documents, runtime)
+        queries = [{"legal_contract": document.intro.strip()} for document, _ in missing]
+        with BatchCallback(total=len(queries), desc="Table of Contents Extractor") as cb:
+            responses, errors = await abatch_with_retry(
+                chain,
+                queries,
+                config={"callbacks": [cb], "max_concurrency": runtime.context.llm_max_concurrency},
+                **self.retry_options(runtime),
+            )
+        await asyncio.to_thread(self.apply, missing, responses, errors, cache, runtime)
+        return documents
@@ -0,0 +1,401 @@
+import os
+import time
+import queue
+import socket
+import threading
+from dataclasses import fields
+from langgraph.runtime import Runtime
+from logger import setup_logger
+
+from generate_knowledge_graph.state import ContextSchema
+from generate_knowledge_graph.utils.failures import get_dead_letter_queue
+from generate_knowledge_graph.utils.job_queue import JobQueue
+from generate_knowledge_graph.utils.document_store import stage_snapshot
+from generate_knowledge_graph.nodes.graph_db_writer import merge_stats
+
+
+logger = setup_logger()
+
+# 단계 사이 큐에 넣는 종료 신호
+_DONE = object()
+
+
+def build_context(context) -> ContextSchema:
+    if isinstance(context, ContextSchema):
+        return context
+    # 워크플로우용 context dict에는 ContextSchema에 없는 키가 섞여 있을 수 있음
+    names = {f.name for f in fields(ContextSchema)}
+    return ContextSchema(**{k: v for k, v in (context or {}).items() if k in names})
+
+
+class StreamingPipeline:
+    """문서 하나하나가 단계들을 독립적으로 흘러가는 스트리밍 실행 모드입니다.
+
+    - 단계 사이에 크기가 제한된 큐(pipeline_queue_size)를 두어 backpressure를 걸고,
+      단계별 워커 스레드 수는 ContextSchema.pipeline_workers로 설정
+    - 각 단계는 DocumentNode.process()를 문서 1건씩 호출
+    - 마지막 GraphDBWriter는 문서가 끝나는 즉시 Neo4j에 적재
+    - time-to-first-searchable-document와 전체 처리량을 보고
+    """
+
+    def __init__(self, stages, writer):
+        # stages: [(이름, DocumentNode)], writer: GraphDBWriter
+        self.stages = list(stages)
+        self.writer = writer
+
+    def run(self, documents, context) -> dict:
+        runtime = Runtime(context=build_context(context))
+        workers = runtime.context.pipeline_workers or {}
+        stage_names = [name for name, _ in self.stages] + ["GraphDBWriter"]
+        nodes = dict(self.stages)
+        queues = [queue.Queue(maxsize=max(1, runtime.context.pipeline_queue_size)) for _ in stage_names]
+        lock = threading.Lock()
+        report = {
+            "documents": 0,
+            "written": 0,
+            "failed": 0,
+            "created": 0,
+            "updated": 0,
+            "unchanged": 0,
+            "deleted": 0,
+            "stage_seconds": {name: 0.0 for name in stage_names},
+            "time_to_first_document": None,
+            "structure_sources": {},
+        }
+        file_paths = []
+        dead_letter = get_dead_letter_queue(runtime.context.dead_letter_path)
+
+        self.writer.prepare(runtime)
+        started = time.perf_counter()
+
+        def handle(name, document):
+            if name == "GraphDBWriter":
+                if document.failed_stage:
+                    # 앞 단계에서 dead-letter로 기록된 문서는 적재하지 않음
+                    with lock:
+                        report["failed"] += 1
+                    return []
+                stats = self.writer.process([document], runtime)
+                with lock:
+                    report["written"] += 1
+                    source = document.structure_source or "llm"
+                    report["structure_sources"][source] = report["structure_sources"].get(source, 0) + 1
+                    for key in ("created", "updated", "unchanged"):
+                        report[key] += stats[key]
+                    if report["time_to_first_document"] is None:
+                        report["time_to_first_document"] = time.perf_counter() - started
+                        logger.info(
+                            f"첫 문서 검색 가능: {document.file_path} "
+                            f"({report['time_to_first_document']:.1f}s)"
+                        )
+                return []
+            return nodes[name].process([document], runtime)
+
+        def worker(index: int, name: str):
+            inbox = queues[index]
+            outbox = queues[index + 1] if index + 1 < len(queues) else None
+            while True:
+                document = inbox.get()
+                if document is _DONE:
+                    return
+                stage_started = time.perf_counter()
+                try:
+                    outputs = handle(name, document)
+                except Exception as e:
+                    logger.error(f"[{name}] {document.file_path} 처리 실패: {e}")
+                    dead_letter.record(document.file_path, name, f"{type(e).__name__}: {e}")
+                    with lock:
+                        report["failed"] += 1
+                    continue
+                with lock:
+                    report["stage_seconds"][name] += time.perf_counter() - stage_started
+                for output in outputs:
+                    outbox.put(output)
+
+        threads = []
+        for index, name in enumerate(stage_names):
+            threads.append([
+                threading.Thread(target=worker, args=(index, name), name=f"{name}-{i}", daemon=True)
+                for i in range(max(1, int(workers.get(name, 1))))
+            ])
+            for thread in threads[-1]:
+                thread.start()
+
+        # 입력 큐가 가득 차면 여기서 대기하므로 문서를 필요한 만큼만 읽음
+        for document in documents:
+            file_paths.append(document.file_path)
+            report["documents"] += 1
+            queues[0].put(document)
+
+        # 앞 단계 워커가 모두 끝나면 다음 단계 워커 수만큼 종료 신호 전달
+        for index, stage_threads in enumerate(threads):
+            for _ in stage_threads:
+                queues[index].put(_DONE)
+            for thread in stage_threads:
+                thread.join()
+
+        report["deleted"] = self.writer.finalize(file_paths, runtime)
+        report["total_seconds"] = time.perf_counter() - started
+        report["documents_per_minute"] = (
+            report["written"] / report["total_seconds"] * 60 if report["total_seconds"] > 0 else 0.0
+        )
+        logger.info(f"스트리밍 파이프라인 결과: {report}")
+        return report
+
+
+class QueueWorker:
+    """공유 작업 큐(JobQueue)에서 문서 작업을 lease 받아 처리하는 분산 적재 워커입니다.
+
+    - lease 받은 문서들을 단계(document_stages) 순서대로 처리한 뒤 GraphDBWriter.process로 증분 적재
+    - 처리 중에는 heartbeat 스레드가 lease를 연장하고, lease를 잃은 문서는 적재하지 않음 (다른 워커가 처리)
+    - 인덱스/제약 조건 생성과 입력에 없는 문서 삭제(finalize)는 coordinator가 한 번만 수행
+    """
+
+    def __init__(self, stages, writer, data_loader, job_queue: JobQueue, worker_id: str = None):
+        self.stages = list(stages)
+        self.writer = writer
+        self.data_loader = data_loader
+        self.job_queue = job_queue
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+
+    def _heartbeat(self, job_ids: set, owned: set, lease_seconds: float, stop: threading.Event):
+        while not stop.wait(max(1.0, lease_seconds / 3)):
+            try:
+                still_owned = self.job_queue.heartbeat(job_ids, self.worker_id, lease_seconds)
+            except Exception as e:
+                # 일시적인 잠금 경합 등은 다음 주기에 다시 시도
+                logger.warning(f"[{self.worker_id}] heartbeat 실패: {e}")
+                continue
+            lost = owned - still_owned
+            if lost:
+                logger.warning(f"[{self.worker_id}] lease를 잃은 작업 {sorted(lost)}")
+                owned.intersection_update(still_owned)
+
+    def process_jobs(self, jobs, runtime: Runtime[ContextSchema], lease_seconds: float, max_attempts: int) -> dict:
+        stats = {"done": 0, "retried": 0, "failed": 0, "lost": 0, "created": 0, "updated": 0, "unchanged": 0}
+        jobs_by_path = {job.file_path: job for job in jobs}
+        owned = {job.id for job in jobs}
+        stop = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(set(owned), owned, lease_seconds, stop), name="heartbeat", daemon=True
+        )
+        heartbeat.start()
+        errors = {}
+        try:
+            documents = []
+            for job in jobs:
+                try:
+                    documents.extend(self.data_loader.load_documents(job.benchmark_name, [job.file_path]))
+                except Exception as e:
+                    errors[job.file_path] = f"DataLoader: {type(e).__name__}: {e}"
+            dead_letter = get_dead_letter_queue(runtime.context.dead_letter_path)
+            for name, node in self.stages:
+                try:
+                    documents = node.process(documents, runtime)
+                except Exception as e:
+                    # 단계 전체 예외: lease 받은 문서 모두 실패로 기록
+                    logger.error(f"[{self.worker_id}] [{name}] 처리 실패: {e}")
+                    for document in documents:
+                        dead_letter.record(document.file_path, name, f"{type(e).__name__}: {e}")
+                        errors[document.file_path] = f"{name}: {type(e).__name__}: {e}"
+                    documents = []
+                    break
+
+            # 적재 직전에 lease를 다시 확인해 회수된 문서는 적재하지 않음 (다른 워커와 중복 적재 방지)
+            owned.intersection_update(self.job_queue.heartbeat(owned, self.worker_id, lease_seconds))
+            documents = [doc for doc in documents if jobs_by_path[doc.file_path].id in owned]
+            for document in documents:
+                if document.failed_stage:
+                    errors[document.file_path] = f"failed at {document.failed_stage}"
+            written = set()
+            if documents:
+                try:
+                    write_stats = self.writer.process(documents, runtime)
+                except Exception as e:
+                    logger.error(f"[{self.worker_id}] [GraphDBWriter] 적재 실패: {e}")
+                    for document in documents:
+                        dead_letter.record(document.file_path, "GraphDBWriter", f"{type(e).__name__}: {e}")
+                        errors.setdefault(document.file_path, f"GraphDBWriter: {type(e).__name__}: {e}")
+                else:
+                    merge_stats(stats, {key: write_stats[key] for key in ("created", "updated", "unchanged")})
+                    written = {doc.file_path for doc in documents if not doc.failed_stage}
+        finally:
+            stop.set()
+            heartbeat.join()
+
+        for file_path, job in jobs_by_path.items():
+            if job.id not in owned:
+                stats["lost"] += 1
+            elif file_path in written:
+                if self.job_queue.complete(job.id, self.worker_id):
+                    stats["done"] += 1
+                else:
+                    stats["lost"] += 1
+            else:
+                error = errors.get(file_path, "document was not produced by the pipeline")
+                if not self.job_queue.fail(job.id, self.worker_id, error, max_attempts):
+                    stats["lost"] += 1
+                elif job.attempts >= max_attempts:
+                    stats["failed"] += 1
+                else:
+                    stats["retried"] += 1
+        return stats
+
+    def run(
+        self,
+        context,
+        jobs_per_lease: int = 1,
+        lease_seconds: float = 300,
+        max_attempts: int = 3,
+        poll_seconds: float = 5,
+        wait: bool = False,
+    ) -> dict:
+        """큐가 빌 때까지(wait=True면 중단될 때까지) 작업을 lease 받아 처리합니다."""
+        runtime = Runtime(context=build_context(context))
+        report = {"jobs": 0, "done": 0, "retried": 0, "failed": 0, "lost": 0, "created": 0, "updated": 0, "unchanged": 0}
+        started = time.perf_counter()
+        logger.info(f"[{self.worker_id}] 작업 큐 워커 시작: {self.job_queue.path}")
+        while True:
+            jobs = self.job_queue.lease(self.worker_id, jobs_per_lease, lease_seconds, max_attempts)
+            if not jobs:
+                counts = self.job_queue.stats()
+                # 다른 워커가 처리 중인 작업은 lease가 만료되면 회수될 수 있으므로 끝날 때까지 대기
+                if not wait and counts["pending"] == 0 and counts["leased"] == 0:
+                    break
+                time.sleep(poll_seconds)
+                continue
+            report["jobs"] += len(jobs)
+            stats = self.process_jobs(jobs, runtime, lease_seconds, max_attempts)
+            merge_stats(report, stats)
+            logger.info(f"[{self.worker_id}] {[job.file_path for job in jobs]} 처리 결과: {stats}")
+        report["total_seconds"] = time.perf_counter() - started
+        logger.info(f"[{self.worker_id}] 작업 큐 워커 종료: {report}")
+        return report
+
+
+class StageRunner:
+    """선택한 단계 범위(start~end)만 실행하는 모드입니다. (generate.py --from/--to)
+
+    - 시작 단계의 입력은 바로 앞 단계의 snapshot(<stage_snapshot_dir>/<단계>.sqlite)에서 읽고,
+      첫 문서 단계부터 시작하면 DataLoader로 원문을 읽음
+    - snapshot에 없는 문서는 DataLoader부터 앞 단계들을 다시 실행해 채움 (단계 캐시/LLM 캐시로 대부분 재사용)
+    - 실행한 단계의 출력은 다시 snapshot으로 기록 (다음 부분 실행의 입력)
+    - 문서를 document_window_size개씩 처리하므로 메모리는 window 크기에 비례
+    - summary_only면 GraphDBWriter가 구조를 다시 쓰지 않고 summary/vector 속성만 제자리에서 갱신
+    """
+
+    def __init__(self, stages, writer, data_loader):
+        self.stages = list(stages)
+        self.writer = writer
+        self.data_loader = data_loader
+
+    @property
+    def stage_names(self) -> list:
+        return ["DataLoader", *[name for name, _ in self.stages], "GraphDBWriter"]
+
+    def select(self, start: str = None, end: str = None) -> list:
+        names = self.stage_names
+        start, end = start or names[0], end or names[-1]
+        for name in (start, end):
+            if name not in names:
+                raise ValueError(f"알 수 없는 단계: {name} (가능한 단계: {names})")
+        if names.index(start) > names.index(end):
+            raise ValueError(f"시작 단계({start})가 끝 단계({end})보다 뒤에 있습니다.")
+        return names[names.index(start):names.index(end) + 1]
+
+    def _rebuild(self, paths: list, start_index: int, runtime) -> list:
+        """snapshot에 없는 문서를 원문부터 시작 단계 직전까지 다시 처리합니다. (해당 snapshot도 다시 기록)"""
+        documents = list(self.data_loader.load_documents(runtime.context.benchmark_name, paths))
+        dead_letter = get_dead_letter_queue(runtime.context.dead_letter_path)
+        for name, node in self.stages[:start_index - 1]:
+            try:
+                documents = node.process(documents, runtime)
+            except Exception as e:
+                logger.error(f"[{name}] snapshot 재생성 실패: {e}")
+                for document in documents:
+                    dead_letter.record(document.file_path, name, f"{type(e).__name__}: {e}")
+                return []
+            node.save_snapshot(documents, runtime)
+        return documents
+
+    def _input_windows(self, selected: list, file_paths: list, runtime, report: dict):
+        window_size = max(1, runtime.context.document_window_size)
+        start_index = self.stage_names.index(selected[0])
+        for i in range(0, len(file_paths), window_size):
+            paths = file_paths[i:i + window_size]
+            if start_index <= 1:
+                yield list(self.data_loader.load_documents(runtime.context.benchmark_name, paths))
+                continue
+            previous = self.stage_names[start_index - 1]
+            snapshot = stage_snapshot(runtime.context.stage_snapshot_dir, previous)
+            documents, missing = [], []
+            for path in paths:
+                document = snapshot.get(path)
+                if document is None:
+                    missing.append(path)
+                else:
+                    documents.append(document)
+            if missing:
+                logger.info(f"{previous} snapshot에 없는 문서 {len(missing)}건은 앞 단계부터 다시 처리")
+                rebuilt = self._rebuild(missing, start_index, runtime)
+                report["rebuilt"] += len(rebuilt)
+                rebuilt_paths = {document.file_path for document in rebuilt}
+                report["missing"].extend(path for path in missing if path not in rebuilt_paths)
+                documents.extend(rebuilt)
+            yield documents
+
+    def run(self, context, start: str = None, end: str = None, file_paths=None, summary_only: bool = False) -> dict:
+        runtime = Runtime(context=build_context(context))
+        selected = self.select(start, end)
+        all_file_paths = self.data_loader.select_file_paths(runtime.context)
+        # 문서 필터가 있으면 일부만 처리하므로 입력에 없는 문서 삭제(finalize)는 하지 않음
+        selected_paths = None if file_paths is None else set(file_paths)
+        targets = all_file_paths if selected_paths is None else [path for path in all_file_paths if path in selected_paths]
+        if selected_paths is not None and len(targets) < len(selected_paths):
+            logger.warning(f"입력 문서 목록에 없는 경로 {len(selected_paths) - len(targets)}건은 무시: {sorted(selected_paths - set(targets))}")
+        stages = [(name, node) for name, node in self.stages if name in selected]
+        write = "GraphDBWriter" in selected
+        report = {
+            "stages": selected,
+            "documents": 0,
+            "missing": [],
+            "rebuilt": 0,
+            "failed": 0,
+            "stage_seconds": {name: 0.0 for name, _ in stages},
+            "write": {},
+        }
+        dead_letter = get_dead_letter_queue(runtime.context.dead_letter_path)
+        logger.info(f"단계 {selected} 실행: 문서 {len(targets)}건")
+
+        if write:
+            self.writer.prepare(runtime)
+        started = time.perf_counter()
+        for documents in self._input_windows(selected, targets, runtime, report):
+            report["documents"] += len(documents)
+            for name, node in stages:
+                stage_started = time.perf_counter()
+                try:
+                    documents = node.process(documents, runtime)
+                except Exception as e:
+                    logger.error(f"[{name}] window 처리 실패: {e}")
+                    for document in documents:
+                        dead_letter.record(document.file_path, name, f"{type(e).__name__}: {e}")
+                    report["failed"] += len(documents)
+                    documents = []
+                    break
+                report["stage_seconds"][name] += time.perf_counter() - stage_started
+                node.save_snapshot(documents, runtime)
+            if write and documents:
+                if summary_only:
+                    stats = self.writer.refresh_summaries(documents, runtime)
+                else:
+                    stats = self.writer.process(documents, runtime)
+                merge_stats(report["write"], stats)
+
+        if report["missing"]:
+            logger.error(f"앞 단계 출력을 만들지 못한 문서 {len(report['missing'])}건은 건너뜀 (dead-letter 확인): {report['missing']}")
+        if write and file_paths is None and not summary_only:
+            report["write"]["deleted"] = self.writer.finalize(all_file_paths, runtime)
+        report["total_seconds"] = time.perf_counter() - started
+        logger.info(f"단계 실행 결과: {report}")
+        return report
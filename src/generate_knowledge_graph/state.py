@@ -5,7 +5,10 @@ from langchain_core.prompts import ChatPromptTemplate
 
 @dataclass
 class ContextSchema:
-    clear_database: bool = field(default=True)
+    # True면 적재 전에 모든 노드를 삭제 (기본은 내용 해시 기반 증분 적재)
+    clear_database: bool = field(default=False)
+    # 입력 문서 목록에 없는 Corpus(와 서브트리)를 그래프에서 삭제
+    delete_missing_documents: bool = field(default=True)
     benchmark_name: str = field(default="maud")
     table_of_contents_extractor_prompt: ChatPromptTemplate = field(default=None)
     summarizer_prompt: ChatPromptTemplate = field(default=None)
@@ -13,7 +16,61 @@ class ContextSchema:
     semantic_chunking_config: dict = field(default_factory=dict)
     use_cache: bool = field(default=False)
 
+    # 배치 호출의 동시 실행 상한. 실제 동시 요청 수는 ConcurrencyController가 429/지연 시간에 맞춰 조절
+    llm_max_concurrency: int = field(default=64)
+
+    # HeadingStructureParser: 규칙 기반 목차/트리 생성을 시도하고, 신뢰도가 낮은 문서만 LLM 단계로 보냄
+    use_heading_parser: bool = field(default=True)
+    heading_parser_min_confidence: float = field(default=0.85)
+    heading_parser_min_articles: int = field(default=2)
+
+    # Chunker 프로토콜: "sentence"(시작/끝 문장을 그대로 옮겨 적음) 또는 "line"(번호 붙은 줄의 번호만 반환)
+    chunking_protocol: Literal["sentence", "line"] = field(default="sentence")
+    # Chunker: 본문이 이 토큰 수(추정)를 넘으면 조항 경계에서 겹치는 윈도우로 나눠 병렬 요청
+    chunker_window_tokens: int = field(default=24000)
+    chunker_window_overlap_tokens: int = field(default=500)
+
+    # CPU 작업(Chunker 정렬/병합, 규칙 기반 파싱)을 나눠 실행할 프로세스 수. 1이면 현재 프로세스에서 실행
+    cpu_workers: int = field(default=1)
+
+    # LLM 단계 실패 격리: 예외/스키마 검증 실패 항목만 지수 backoff로 재시도하고, 끝내 실패한 문서는 dead-letter 파일에 기록
+    llm_max_attempts: int = field(default=3)
+    llm_retry_backoff: float = field(default=2.0)
+    dead_letter_path: str = field(default="./data/dead_letter.jsonl")
+    # True면 dead-letter 파일에 있는 문서만 다시 처리 (입력에 없는 문서 삭제는 하지 않음)
+    retry_dead_letter: bool = field(default=False)
+
+    # Summarizer: 문서/레벨 구분 없이 준비된 노드를 처리하는 워커 수
+    summarizer_max_concurrency: int = field(default=16)
+
+    # GraphDBWriter: UNWIND 배치(트랜잭션) 크기와 문서 shard별 동시 writer 세션 수
+    graph_write_batch_size: int = field(default=1000)
+    graph_write_concurrency: int = field(default=1)
+
+    # True면 문서를 State 대신 디스크(DocumentStore)에 두고, 노드가 document_window_size개씩 읽어 처리 (메모리는 window 크기에 비례)
+    use_document_store: bool = field(default=False)
+    document_store_path: str = field(default="./data/cache/document_store.sqlite")
+    document_window_size: int = field(default=32)
+
+    # 단계별 출력 snapshot (<stage_snapshot_dir>/<단계>.sqlite): generate.py --from으로 중간 단계부터 다시 실행할 때 입력으로 사용
+    # 모든 문서를 단계마다 기록하므로 기본은 끄고, 단계 선택 실행(--from/--to)이나 --save-snapshots일 때만 켬
+    save_stage_snapshots: bool = field(default=False)
+    stage_snapshot_dir: str = field(default="./data/cache/snapshots")
+
+    # 스트리밍 파이프라인: 단계 사이 큐 크기와 단계별 워커 수 (없는 단계는 1)
+    pipeline_queue_size: int = field(default=8)
+    pipeline_workers: dict = field(default_factory=lambda: {
+        "IntroBodySeparator": 1,
+        "HeadingStructureParser": 1,
+        "TableOfContentsExtractor": 4,
+        "Chunker": 4,
+        "Summarizer": 2,
+        "GraphDBWriter": 1,
+    })
+
 
 @dataclass
 class State:
-    documents: list = field(default_factory=list)
\ No newline at end of file
+    documents: list = field(default_factory=list)
+    # use_document_store일 때 문서 대신 DocumentStore 경로(handle)만 전달
+    document_store: str = ""
\ No newline at end of file
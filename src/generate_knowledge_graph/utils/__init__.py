@@ -1,6 +1,13 @@
 from .parser import JsonOutputParser
 from .database import Neo4jConnection
 from .callback import BatchCallback
-from .model import Document, Chunk
+from .model import Document, Chunk, SpanChunk
+from .alignment import SentenceAligner, find_sentence_range
+from .embedding import CachedEmbeddings, EmbeddingStore
+from .llm_cache import SQLiteLLMCache
+from .stage_cache import StageCache
+from .document_store import DocumentStore
+from .job_queue import JobQueue
+from .failures import DeadLetterQueue, batch_with_retry, abatch_with_retry, ainvoke_with_retry
 
-__all__ = ["JsonOutputParser", "Neo4jConnection", "BatchCallback", "Document", "Chunk"]
\ No newline at end of file
+__all__ = ["JsonOutputParser", "Neo4jConnection", "BatchCallback", "Document", "Chunk", "SpanChunk", "SentenceAligner", "find_sentence_range", "CachedEmbeddings", "EmbeddingStore", "SQLiteLLMCache", "StageCache", "DocumentStore", "JobQueue", "DeadLetterQueue", "batch_with_retry", "abatch_with_retry", "ainvoke_with_retry"]
\ No newline at end of file
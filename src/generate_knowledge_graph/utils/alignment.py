@@ -0,0 +1,203 @@
+import re
+import string
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from functools import lru_cache
+
+
+_TOKEN_PATTERN = re.compile(r"\S+")
+_PUNCTUATION = string.punctuation + "“”‘’«»–—…"
+
+
+def _normalize_token(token: str) -> str:
+    return token.lower().strip(_PUNCTUATION)
+
+
+def _banded_similarity(a: list, b: list, min_similarity: float) -> float:
+    """두 토큰 시퀀스의 편집거리 유사도(0~1)를 대각선 밴드 안에서만 계산합니다."""
+    n, m = len(a), len(b)
+    longest = max(n, m)
+    if longest == 0:
+        return 1.0
+    band = int(longest * (1.0 - min_similarity))
+    if abs(n - m) > band:
+        return 0.0
+
+    inf = band + 1
+    prev = [j if j <= band else inf for j in range(m + 1)]
+    for i in range(1, n + 1):
+        cur = [inf] * (m + 1)
+        cur[0] = i if i <= band else inf
+        lo = max(1, i - band)
+        hi = min(m, i + band)
+        ai = a[i - 1]
+        row_min = cur[0]
+        for j in range(lo, hi + 1):
+            v = prev[j - 1] + (0 if ai == b[j - 1] else 1)
+            if prev[j] + 1 < v:
+                v = prev[j] + 1
+            if cur[j - 1] + 1 < v:
+                v = cur[j - 1] + 1
+            cur[j] = v if v < inf else inf
+            if v < row_min:
+                row_min = v
+        # 밴드 안의 최소값이 허용 거리를 넘으면 더 볼 필요 없음
+        if row_min > band:
+            return 0.0
+        prev = cur
+
+    distance = prev[m]
+    if distance > band:
+        return 0.0
+    return 1.0 - distance / longest
+
+
+class SentenceAligner:
+    """문서 하나에 대해 인덱스를 한 번만 만들고, LLM이 옮겨 적은 문장의 위치를 찾습니다.
+
+    1) 원문 그대로의 부분 문자열 일치
+    2) 대소문자/공백을 정규화한 부분 문자열 일치
+    3) 단어 n-gram 앵커 인덱스로 후보 위치를 고른 뒤 밴드 편집거리로 점수화
+    """
+
+    def __init__(
+        self,
+        content: str,
+        anchor_size: int = 3,
+        max_postings: int = 64,
+        max_candidates: int = 8,
+        min_similarity: float = 0.5,
+    ):
+        self.content = content
+        self.anchor_size = anchor_size
+        self.max_postings = max_postings
+        self.max_candidates = max_candidates
+        self.min_similarity = min_similarity
+
+        self.token_spans = [(m.start(), m.end()) for m in _TOKEN_PATTERN.finditer(content)]
+        self.token_starts = [s for s, _ in self.token_spans]
+        self.tokens = [_normalize_token(content[s:e]) for s, e in self.token_spans]
+
+        # 공백 정규화 문자열과 토큰 시작 위치(정규화 좌표계)
+        lowered = []
+        self.norm_token_starts = []
+        pos = 0
+        for s, e in self.token_spans:
+            self.norm_token_starts.append(pos)
+            low = content[s:e].lower()
+            if len(low) != e - s:
+                low = content[s:e]
+            lowered.append(low)
+            pos += len(low) + 1
+        self.normalized = " ".join(lowered)
+
+        self._anchor_index = self._build_index(anchor_size)
+        self._unigram_index = None
+
+    def _build_index(self, n: int) -> dict:
+        index = defaultdict(list)
+        tokens = self.tokens
+        for i in range(len(tokens) - n + 1):
+            index[tuple(tokens[i:i + n])].append(i)
+        return index
+
+    def _norm_to_char(self, norm_pos: int) -> int:
+        idx = bisect_right(self.norm_token_starts, norm_pos) - 1
+        idx = max(0, min(idx, len(self.token_spans) - 1))
+        tok_start, tok_end = self.token_spans[idx]
+        return min(tok_start + max(0, norm_pos - self.norm_token_starts[idx]), tok_end)
+
+    def _exact_match(self, target: str, min_start: int):
+        idx = self.content.find(target, min_start)
+        if idx != -1:
+            return idx, idx + len(target), 1.0
+
+        norm_target = " ".join(t.lower() for t in _TOKEN_PATTERN.findall(target))
+        if not norm_target:
+            return None
+        norm_min = 0
+        if min_start > 0:
+            first = bisect_left(self.token_starts, min_start)
+            if first >= len(self.token_starts):
+                return None
+            norm_min = self.norm_token_starts[first]
+        norm_idx = self.normalized.find(norm_target, norm_min)
+        if norm_idx == -1:
+            return None
+        start = self._norm_to_char(norm_idx)
+        end = self._norm_to_char(norm_idx + len(norm_target) - 1) + 1
+        return start, end, 1.0
+
+    def _vote(self, index: dict, n: int, target_tokens: list, min_token: int) -> dict:
+        votes = defaultdict(int)
+        for offset in range(len(target_tokens) - n + 1):
+            postings = index.get(tuple(target_tokens[offset:offset + n]))
+            # 너무 흔한 n-gram은 후보를 구분하지 못하므로 건너뜀
+            if not postings or len(postings) > self.max_postings:
+                continue
+            for pos in postings:
+                start = pos - offset
+                if start >= min_token:
+                    votes[start] += 1
+        return votes
+
+    def best_window(self, target_sentence: str, min_start: int = 0):
+        """`(start, end, score)`를 반환합니다. 찾지 못하면 `(0, 0, 0.0)`."""
+        if not self.token_spans or not target_sentence or not target_sentence.strip():
+            return 0, 0, 0.0
+
+        exact = self._exact_match(target_sentence, min_start)
+        if exact is not None:
+            return exact
+
+        target_tokens = [_normalize_token(t) for t in _TOKEN_PATTERN.findall(target_sentence)]
+        window = len(target_tokens)
+        min_token = bisect_left(self.token_starts, min_start) if min_start > 0 else 0
+
+        votes = {}
+        if window >= self.anchor_size:
+            votes = self._vote(self._anchor_index, self.anchor_size, target_tokens, min_token)
+        if not votes:
+            if self._unigram_index is None:
+                self._unigram_index = self._build_index(1)
+            votes = self._vote(self._unigram_index, 1, target_tokens, min_token)
+        if not votes:
+            return 0, 0, 0.0
+
+        candidates = sorted(votes.items(), key=lambda kv: (-kv[1], kv[0]))[: self.max_candidates]
+        n_tokens = len(self.tokens)
+        best = (0, 0, 0.0)
+        seen = set()
+        for start, _ in candidates:
+            for ds in (0, -1, 1):
+                for dw in (0, -1, 1):
+                    w_start = max(min_token, start + ds)
+                    w_end = min(n_tokens, w_start + window + dw)
+                    if w_end <= w_start or (w_start, w_end) in seen:
+                        continue
+                    seen.add((w_start, w_end))
+                    score = _banded_similarity(target_tokens, self.tokens[w_start:w_end], self.min_similarity)
+                    if score > best[2]:
+                        best = (self.token_spans[w_start][0], self.token_spans[w_end - 1][1], score)
+        return best
+
+    def find_range(self, start_sentence: str, end_sentence: str):
+        s_start, _, _ = self.best_window(start_sentence)
+        # 끝 문장은 시작 문장 이후에서 먼저 찾고, 없으면 문서 전체에서 찾음
+        e_start, e_end, e_score = self.best_window(end_sentence, min_start=s_start)
+        if e_score <= 0.0:
+            e_start, e_end, _ = self.best_window(end_sentence)
+        return s_start, e_end
+
+
+@lru_cache(maxsize=16)
+def get_aligner(content: str) -> SentenceAligner:
+    return SentenceAligner(content)
+
+
+def best_window_by_words(content: str, target_sentence: str):
+    return get_aligner(content).best_window(target_sentence)
+
+
+def find_sentence_range(content: str, start_sentence: str, end_sentence: str):
+    return get_aligner(content).find_range(start_sentence, end_sentence)
@@ -0,0 +1,387 @@
+import math
+import time
+import asyncio
+import threading
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Optional
+from langchain_core.language_models import BaseChatModel
+from langchain_core.rate_limiters import BaseRateLimiter
+from langchain_core.runnables import Runnable, RunnableBinding
+
+
+# 캐시 조회 뒤에 받은 허가의 시작 시각 목록 (EndpointLimiter.call_deferred 호출 단위)
+_deferred_permits: ContextVar = ContextVar("deferred_permits", default=None)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    # openai.RateLimitError 등은 response.headers에 Retry-After(초)를 담고 있음
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _output_tokens(result) -> Optional[int]:
+    # AIMessage.usage_metadata의 출력 토큰 수 (임베딩 등 usage가 없는 결과는 None)
+    usage = getattr(result, "usage_metadata", None) or {}
+    return usage.get("output_tokens") or None
+
+
+def latency_class(latency: float, output_tokens: Optional[int] = None):
+    """(호출 클래스, 비교용 지연 시간)을 반환합니다.
+
+    출력 토큰 수를 4배 단위 구간으로 나누고, 구간 안에서는 토큰당 지연 시간으로 비교합니다.
+    같은 엔드포인트에서 긴 Chunker/TOC 호출과 짧은 요약 호출이 서로의 기준 지연이 되지 않도록 하기 위함입니다.
+    """
+    if not output_tokens:
+        return "default", latency
+    return int(math.log(output_tokens, 4)), latency / output_tokens
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or type(error).__name__ == "RateLimitError"
+
+
+class EndpointLimiter:
+    """엔드포인트 하나의 동시 요청 수를 AIMD 방식으로 조절합니다.
+
+    - 성공: limit += increase / limit (한 라운드에 +increase)
+    - 429: limit *= decrease, Retry-After 동안 새 요청을 막음
+    - 지연 시간 EWMA가 최저 지연의 latency_tolerance배를 넘으면 limit *= latency_decrease
+      (호출 클래스(latency_class)별로 관리. 최저 지연은 최근 latency_window개 표본 기준이며,
+      표본이 latency_min_samples개 미만이면 지연 시간으로는 줄이지 않음)
+    스레드(acquire)와 코루틴(aacquire) 대기자를 같은 FIFO 큐에서 처리합니다.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: float = 4,
+        min_limit: float = 1,
+        max_limit: float = 64,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        latency_tolerance: float = 3.0,
+        latency_decrease: float = 0.9,
+        latency_window: int = 50,
+        latency_min_samples: int = 5,
+        max_retries: int = 3,
+    ):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.latency_decrease = latency_decrease
+        self.latency_window = latency_window
+        self.latency_min_samples = latency_min_samples
+        self.max_retries = max_retries
+        self.in_flight = 0
+        self.throttled = 0
+        self.completed = 0
+        # 호출 클래스 -> {"samples": 최근 지연 표본, "ewma": 지연 EWMA}
+        self._latency = {}
+        self._blocked_until = 0.0
+        self._timer = None
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    # --- 허가(permit) 관리 ---
+    def _can_run(self) -> bool:
+        return time.monotonic() >= self._blocked_until and self.in_flight < max(1, int(self.limit))
+
+    def _wake(self):
+        # lock을 잡은 상태에서 호출: 여유가 있는 만큼 대기자에게 허가를 넘김
+        while self._waiters and self._can_run():
+            waiter = self._waiters.popleft()
+            self.in_flight += 1
+            if isinstance(waiter, threading.Event):
+                waiter.set()
+            else:
+                loop, future = waiter
+                loop.call_soon_threadsafe(lambda f=future: f.done() or f.set_result(None))
+        if self._waiters and time.monotonic() < self._blocked_until and self._timer is None:
+            self._timer = threading.Timer(self._blocked_until - time.monotonic(), self._unblock)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _unblock(self):
+        with self._lock:
+            self._timer = None
+            self._wake()
+
+    def acquire(self):
+        with self._lock:
+            if not self._waiters and self._can_run():
+                self.in_flight += 1
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+            self._wake()
+        event.wait()
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if not self._waiters and self._can_run():
+                self.in_flight += 1
+                return
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+            self._wake()
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove((loop, future))
+                    granted = False
+                except ValueError:
+                    granted = True
+            if granted:
+                self.release()
+            raise
+
+    def release(self, latency: Optional[float] = None, throttled: bool = False, retry_after: Optional[float] = None, output_tokens: Optional[int] = None):
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            if throttled:
+                self.throttled += 1
+                self.limit = max(self.min_limit, self.limit * self.decrease)
+                self._blocked_until = max(self._blocked_until, time.monotonic() + (retry_after or 1.0))
+            elif latency is not None:
+                self.completed += 1
+                key, value = latency_class(latency, output_tokens)
+                baseline = self._latency.get(key)
+                if baseline is None:
+                    baseline = self._latency[key] = {"samples": deque(maxlen=self.latency_window), "ewma": value}
+                else:
+                    baseline["ewma"] = 0.8 * baseline["ewma"] + 0.2 * value
+                samples = baseline["samples"]
+                samples.append(value)
+                if len(samples) >= self.latency_min_samples and baseline["ewma"] > min(samples) * self.latency_tolerance:
+                    self.limit = max(self.min_limit, self.limit * self.latency_decrease)
+                else:
+                    self.limit = min(self.max_limit, self.limit + self.increase / max(1.0, self.limit))
+            self._wake()
+
+    # --- 호출 래퍼 ---
+    def call(self, fn, *args, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            self.acquire()
+            started = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if is_rate_limit_error(e):
+                    self.release(throttled=True, retry_after=_retry_after(e))
+                    if attempt < self.max_retries:
+                        continue
+                else:
+                    self.release()
+                raise
+            self.release(latency=time.monotonic() - started, output_tokens=_output_tokens(result))
+            return result
+
+    async def acall(self, fn, *args, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            await self.aacquire()
+            started = time.monotonic()
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                if is_rate_limit_error(e):
+                    self.release(throttled=True, retry_after=_retry_after(e))
+                    if attempt < self.max_retries:
+                        continue
+                else:
+                    self.release()
+                raise
+            except asyncio.CancelledError:
+                self.release()
+                raise
+            self.release(latency=time.monotonic() - started, output_tokens=_output_tokens(result))
+            return result
+
+    # --- 캐시 뒤에서 허가를 받는 호출 래퍼 (CacheAwareRateLimiter와 함께 사용) ---
+    def _release_deferred(self, permits: list, result=None, error: Optional[BaseException] = None):
+        for started in permits:
+            if error is None:
+                self.release(latency=time.monotonic() - started, output_tokens=_output_tokens(result))
+            elif isinstance(error, Exception) and is_rate_limit_error(error):
+                self.release(throttled=True, retry_after=_retry_after(error))
+            else:
+                self.release()
+        permits.clear()
+
+    def call_deferred(self, fn, *args, **kwargs):
+        """fn 안에서 CacheAwareRateLimiter가 받은 허가만 반환하고 기록합니다. (LLM 캐시 적중이면 허가 없음)"""
+        for attempt in range(self.max_retries + 1):
+            permits = []
+            token = _deferred_permits.set(permits)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                self._release_deferred(permits, error=e)
+                if is_rate_limit_error(e) and attempt < self.max_retries:
+                    continue
+                raise
+            finally:
+                _deferred_permits.reset(token)
+            self._release_deferred(permits, result)
+            return result
+
+    async def acall_deferred(self, fn, *args, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            permits = []
+            token = _deferred_permits.set(permits)
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                self._release_deferred(permits, error=e)
+                if is_rate_limit_error(e) and attempt < self.max_retries:
+                    continue
+                raise
+            except asyncio.CancelledError as e:
+                self._release_deferred(permits, error=e)
+                raise
+            finally:
+                _deferred_permits.reset(token)
+            self._release_deferred(permits, result)
+            return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "queue_depth": len(self._waiters),
+                "throttled": self.throttled,
+                "completed": self.completed,
+                "latency_ewma": {str(key): round(baseline["ewma"], 4) for key, baseline in self._latency.items()},
+                "blocked_for": max(0.0, self._blocked_until - time.monotonic()),
+            }
+
+
+class ConcurrencyController:
+    """프로세스 전체에서 공유하는 엔드포인트별 EndpointLimiter 모음입니다."""
+
+    def __init__(self, **defaults):
+        self.defaults = defaults
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, endpoint: str, **overrides) -> EndpointLimiter:
+        with self._lock:
+            limiter = self._limiters.get(endpoint)
+            if limiter is None:
+                limiter = EndpointLimiter(endpoint, **{**self.defaults, **overrides})
+                self._limiters[endpoint] = limiter
+            return limiter
+
+    def stats(self) -> dict:
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {endpoint: limiter.stats() for endpoint, limiter in limiters.items()}
+
+
+_controller = ConcurrencyController()
+
+
+def get_controller() -> ConcurrencyController:
+    return _controller
+
+
+class CacheAwareRateLimiter(BaseRateLimiter):
+    """BaseChatModel.rate_limiter 훅으로 EndpointLimiter 허가를 받습니다.
+
+    ChatModel은 LLM 캐시를 조회한 뒤(캐시 미스)에만 rate_limiter를 호출하므로, 캐시 적중은 허가를 받지 않고
+    지연 시간 표본도 남기지 않습니다. 허가 반환은 호출이 끝난 뒤 EndpointLimiter.call_deferred가 수행합니다.
+    """
+
+    def __init__(self, limiter: EndpointLimiter):
+        self.limiter = limiter
+
+    def _track(self):
+        permits = _deferred_permits.get()
+        if permits is None:
+            # call_deferred 밖에서 모델을 직접 호출한 경우: 동시 요청 수만 지키고 바로 반환
+            self.limiter.release()
+        else:
+            permits.append(time.monotonic())
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        self.limiter.acquire()
+        self._track()
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        await self.limiter.aacquire()
+        self._track()
+        return True
+
+
+def _chat_model(runnable) -> Optional[BaseChatModel]:
+    # bind_tools/bind 등으로 감싼 RunnableBinding 안쪽의 ChatModel
+    while isinstance(runnable, RunnableBinding):
+        runnable = runnable.bound
+    return runnable if isinstance(runnable, BaseChatModel) else None
+
+
+class RateLimitedRunnable(Runnable):
+    """Runnable(LLM 등)의 invoke/ainvoke를 엔드포인트 허가 안에서 실행합니다.
+
+    batch/abatch는 Runnable 기본 구현이 invoke/ainvoke를 호출하므로 같은 허가를 거칩니다.
+    ChatModel이면 rate_limiter 훅(CacheAwareRateLimiter)을 설정해 캐시 미스일 때만 허가를 받습니다.
+    그 밖의 속성(model_name 등)은 감싼 객체로 위임합니다.
+    """
+
+    def __init__(self, bound: Runnable, limiter: EndpointLimiter):
+        self.bound = bound
+        self.limiter = limiter
+        chat_model = _chat_model(bound)
+        self.deferred = chat_model is not None
+        if self.deferred:
+            chat_model.rate_limiter = CacheAwareRateLimiter(limiter)
+
+    @property
+    def InputType(self) -> Any:
+        return self.bound.InputType
+
+    @property
+    def OutputType(self) -> Any:
+        return self.bound.OutputType
+
+    def invoke(self, input, config=None, **kwargs):
+        call = self.limiter.call_deferred if self.deferred else self.limiter.call
+        return call(self.bound.invoke, input, config, **kwargs)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        call = self.limiter.acall_deferred if self.deferred else self.limiter.acall
+        return await call(self.bound.ainvoke, input, config, **kwargs)
+
+    def __getattr__(self, name):
+        # __init__ 이전(복사/역직렬화 등)에 bound가 없으면 무한 재귀가 되지 않도록
+        if name in ("bound", "deferred"):
+            raise AttributeError(name)
+        return getattr(self.bound, name)
+
+
+def llm_endpoint(llm) -> str:
+    return f"llm:{getattr(llm, 'model_name', None) or getattr(llm, 'model', None) or type(llm).__name__}"
+
+
+def rate_limited(runnable: Runnable, endpoint: Optional[str] = None, controller: Optional[ConcurrencyController] = None) -> RateLimitedRunnable:
+    """runnable을 엔드포인트 허가 안에서 실행합니다.
+
+    ChatOpenAI는 max_retries=0으로 만들어야 429/Retry-After가 SDK 내부 재시도 대신 limiter에 전달됩니다.
+    """
+    controller = controller or get_controller()
+    return RateLimitedRunnable(runnable, controller.limiter(endpoint or llm_endpoint(runnable)))
@@ -1,64 +1,460 @@
 from tqdm.auto import tqdm
+import re
 import json
-from uuid import uuid4
-from neo4j import GraphDatabase
+import asyncio
+from uuid import UUID, uuid4, uuid5
+from concurrent.futures import ThreadPoolExecutor
+from neo4j import GraphDatabase, AsyncGraphDatabase
+from .stage_cache import fingerprint
 
 
 NODE_TYPES = ["Corpus", "Article", "Section", "Chunk"]
 RELATIONSHIP_TYPES = ["CHILD", "NEXT", "PREV"]
 
+# 노드 ID는 내용에서 결정적으로 생성 (같은 입력이면 항상 같은 ID)
+ID_NAMESPACE = UUID("6f1c1b2e-5d0a-4c53-9b8e-1f4a2d7c9e30")
+
+
+def corpus_id(file_path: str) -> str:
+    return str(uuid5(ID_NAMESPACE, f"corpus:{file_path}"))
+
+
+def chunk_id(parent_id: str, order_idx: int, chunk_obj) -> str:
+    key = f"{parent_id}/{order_idx}:{getattr(chunk_obj, 'name', '')}:{fingerprint(getattr(chunk_obj, 'content', ''))}"
+    return str(uuid5(ID_NAMESPACE, key))
+
+
+def document_hash(document) -> str:
+    # 본문/목차/트리/요약 중 하나라도 바뀌면 문서 전체를 다시 적재
+    return fingerprint(document)
+
+CORPUS_WRITE_QUERY = """
+UNWIND $rows AS row
+MERGE (co:Corpus {id: row.id})
+SET co.name = row.name,
+    co.file_path = row.file_path,
+    co.table_of_contents = row.table_of_contents,
+    co.summary = row.summary,
+    co.content = row.content,
+    co.content_hash = null
+"""
+
+# 서브트리와 벡터까지 모두 적재된 뒤에 기록 (중간에 실패하면 다음 실행에서 다시 적재)
+CORPUS_HASH_QUERY = """
+UNWIND $rows AS row
+MATCH (co:Corpus {id: row.id})
+SET co.content_hash = row.content_hash
+"""
+
+CORPUS_HASHES_QUERY = """
+MATCH (co:Corpus)
+RETURN co.id AS id, co.file_path AS file_path, co.content_hash AS content_hash
+"""
+
+SUBTREE_IDS_QUERY = """
+UNWIND $ids AS corpus_id
+MATCH (:Corpus {id: corpus_id})-[:CHILD*]->(c:Chunk)
+RETURN DISTINCT c.id AS id
+"""
+
+CHUNK_DELETE_QUERY = """
+UNWIND $rows AS row
+MATCH (c:Chunk {id: row.id})
+DETACH DELETE c
+"""
+
+CORPUS_DELETE_QUERY = """
+UNWIND $rows AS row
+MATCH (co:Corpus {id: row.id})
+DETACH DELETE co
+"""
+
+CHUNK_WRITE_QUERY = """
+UNWIND $rows AS row
+MERGE (c:Chunk {id: row.id})
+SET c.span = row.span,
+    c.content = row.content,
+    c.summary = row.summary,
+    c.order = row.order,
+    c.name = row.name,
+    c.file_path = row.file_path
+"""
+
+CHILD_WRITE_QUERY = """
+UNWIND $rows AS row
+MATCH (p:{parent_label} {{id: row.parent_id}})
+MATCH (c:Chunk {{id: row.id}})
+MERGE (p)-[:CHILD]->(c)
+"""
+
+NEXT_WRITE_QUERY = """
+UNWIND $rows AS row
+MATCH (p:Chunk {id: row.prev})
+MATCH (c:Chunk {id: row.cur})
+MERGE (p)-[:NEXT]->(c)
+MERGE (c)-[:PREV]->(p)
+"""
+
+VECTOR_WRITE_QUERY = """
+UNWIND $rows AS row
+MATCH (n:{label} {{id: row.id}})
+SET n.`{property}` = row.vector
+"""
+
+# 임베딩 모델별 벡터 속성. 검색 도구는 (:Meta {id: 'embedding'}).property가 가리키는 속성만 사용
+LEGACY_VECTOR_PROPERTY = "vector"
+
+ACTIVE_EMBEDDING_QUERY = """
+OPTIONAL MATCH (e:Meta {id: 'embedding'})
+RETURN e.property AS property, e.model AS model, e.dimensions AS dimensions,
+       e.previous_property AS previous_property, e.previous_model AS previous_model
+"""
+
+# 이전 활성 속성은 previous_*로 남겨 두어 전환 전 모델로 쓰는 writer도 기존 속성을 계속 사용
+SWITCH_EMBEDDING_QUERY = """
+OPTIONAL MATCH (old:Meta {id: 'embedding'})
+WITH coalesce(old.property, $legacy_property) AS previous_property, coalesce(old.model, $legacy_model) AS previous_model
+MERGE (e:Meta {id: 'embedding'})
+SET e.previous_property = CASE WHEN previous_property = $property THEN e.previous_property ELSE previous_property END,
+    e.previous_model = CASE WHEN previous_property = $property THEN e.previous_model ELSE previous_model END,
+    e.property = $property,
+    e.model = $model,
+    e.dimensions = $dimensions,
+    e.switched_at = datetime()
+WITH e
+MERGE (m:Meta {id: 'graph'})
+SET m.version = $version
+"""
+
+# 라벨별 id 제약 조건 인덱스로 keyset 페이지 조회
+VECTOR_TARGETS_QUERY = """
+MATCH (n:{label})
+WHERE n.id > $after AND n.`{property}` IS NULL
+  AND (trim(coalesce(n.summary, '')) <> '' OR trim(coalesce(n.content, '')) <> '')
+RETURN n.id AS id, n.summary AS summary, n.content AS content
+ORDER BY n.id
+LIMIT $limit
+"""
+
+VECTOR_COVERAGE_QUERY = """
+MATCH (n)
+WHERE (n:Corpus OR n:Chunk)
+  AND (trim(coalesce(n.summary, '')) <> '' OR trim(coalesce(n.content, '')) <> '')
+RETURN count(n) AS total, count(n.`{property}`) AS embedded
+"""
+
+
+# 요약만 다시 만든 경우: 노드 ID(내용 기반)는 그대로이므로 summary/vector만 제자리에서 갱신
+SUMMARY_LOOKUP_QUERY = """
+UNWIND $rows AS row
+OPTIONAL MATCH (n:{label} {{id: row.id}})
+RETURN row.id AS id, n IS NOT NULL AS found, n.summary AS summary
+"""
+
+SUMMARY_WRITE_QUERY = """
+UNWIND $rows AS row
+MATCH (n:{label} {{id: row.id}})
+SET n.summary = row.summary
+"""
+
+
+def vector_property_name(model_name: str) -> str:
+    """임베딩 모델 이름으로 벡터 속성 이름을 만듭니다. (예: text-embedding-3-large -> vector_text_embedding_3_large)"""
+    slug = re.sub(r"[^0-9a-zA-Z]+", "_", str(model_name or "")).strip("_").lower()
+    return f"{LEGACY_VECTOR_PROPERTY}_{slug}" if slug else LEGACY_VECTOR_PROPERTY
+
+
+def vector_text(summary, content) -> str:
+    # 임베딩 대상 텍스트 선택: summary가 비었으면 content 사용
+    return summary.strip() if summary and summary.strip() else (content or "")
+
+
+def resolve_vector_property(active: dict, model_name: str) -> str:
+    """writer가 model_name으로 만든 벡터를 쓸 속성
+
+    - Meta가 없으면(전환 이력 없음) 기존 단일 속성(vector)
+    - 활성/직전 활성 모델이면 그 속성, 그 외 모델은 모델 이름 기반 속성
+    """
+    if not active or not active.get("property"):
+        return LEGACY_VECTOR_PROPERTY
+    if active.get("model") == model_name:
+        return active["property"]
+    if active.get("previous_model") == model_name:
+        return active.get("previous_property") or LEGACY_VECTOR_PROPERTY
+    return vector_property_name(model_name)
+
 
 class Neo4jConnection:
-    def __init__(self, uri, user, password, embedding_model):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+    def __init__(self, uri, user, password, embedding_model, **driver_kwargs):
+        # driver_kwargs 예: max_transaction_retry_time (일시적 오류 재시도 시간), max_connection_pool_size
+        self.driver = GraphDatabase.driver(uri, auth=(user, password), **driver_kwargs)
         self.embedding_model = embedding_model
+        # 비동기 드라이버는 이벤트 루프 안에서 처음 쓸 때 생성 (async_graph의 GraphDBWriter용)
+        self._async_driver_args = (uri, (user, password), driver_kwargs)
+        self._async_driver = None
+        # 이 연결의 임베딩 모델이 벡터를 쓸 속성 (처음 쓸 때 Meta에서 결정)
+        self._vector_property = None
        
     def close(self):
         self.driver.close()
+
+    @property
+    def async_driver(self):
+        if self._async_driver is None:
+            uri, auth, driver_kwargs = self._async_driver_args
+            self._async_driver = AsyncGraphDatabase.driver(uri, auth=auth, **driver_kwargs)
+        return self._async_driver
+
+    async def aclose(self):
+        if self._async_driver is not None:
+            await self._async_driver.close()
+            self._async_driver = None
     
-    def clear_database(self):
+    def clear_database(self, batch_size: int = 10000):
+        """노드/관계만 삭제합니다. 제약 조건과 벡터 인덱스는 유지합니다."""
         with self.driver.session() as session:
-            session.run("MATCH (n) DETACH DELETE n")
-            
-            # 문서 노드 제약조건 삭제
-            for node_type in NODE_TYPES:
-                session.run(f"DROP CONSTRAINT {node_type.lower()}_id_unique IF EXISTS")
-            
-            for node_type in NODE_TYPES:
-                if node_type == "Corpus":
-                    continue
-                session.run(f"DROP INDEX {node_type.lower()}_vector_index IF EXISTS")
+            while True:
+                deleted = session.execute_write(
+                    lambda tx: tx.run(
+                        "MATCH (n) WITH n LIMIT $limit DETACH DELETE n RETURN count(*) AS deleted",
+                        {"limit": batch_size},
+                    ).single()["deleted"]
+                )
+                if deleted == 0:
+                    break
+
+    def get_corpus_hashes(self):
+        """{file_path: (corpus_id, content_hash)}"""
+        with self.driver.session() as session:
+            return {
+                record["file_path"]: (record["id"], record["content_hash"])
+                for record in session.run(CORPUS_HASHES_QUERY)
+            }
+
+    def delete_subtrees(self, corpus_ids, batch_size: int = 1000, delete_corpus: bool = False):
+        """Corpus 아래 Chunk 서브트리를 삭제합니다. delete_corpus=True면 Corpus 노드도 삭제합니다."""
+        corpus_ids = list(corpus_ids)
+        if not corpus_ids:
+            return
+        with self.driver.session() as session:
+            chunk_ids = [record["id"] for record in session.run(SUBTREE_IDS_QUERY, {"ids": corpus_ids})]
+        plan = [(CHUNK_DELETE_QUERY, [{"id": i} for i in chunk_ids])]
+        if delete_corpus:
+            plan.append((CORPUS_DELETE_QUERY, [{"id": i} for i in corpus_ids]))
+        self._write_plan(plan, batch_size)
+
+    def delete_missing_documents(self, file_paths, batch_size: int = 1000, existing=None):
+        """file_paths에 없는 Corpus와 그 서브트리를 삭제하고 삭제한 문서 수를 반환합니다."""
+        existing = self.get_corpus_hashes() if existing is None else existing
+        keep = set(file_paths)
+        removed = [node_id for file_path, (node_id, _) in existing.items() if file_path not in keep]
+        self.delete_subtrees(removed, batch_size=batch_size, delete_corpus=True)
+        return len(removed)
+
+    def sync_documents(self, documents, batch_size=1000, max_workers=1, delete_missing=True):
+        """내용 해시를 비교해 바뀐 문서만 서브트리 단위로 교체합니다.
+
+        - 해시가 같은 문서는 건너뜀
+        - 바뀐 문서는 기존 Chunk 서브트리를 지우고 다시 적재 (Corpus 노드/ID는 유지)
+        - delete_missing=True면 입력에 없는 문서를 삭제
+        """
+        documents = list(documents)
+        existing = self.get_corpus_hashes()
+        changed, changed_hashes, replaced_ids, legacy_ids = self._classify_changes(documents, existing)
+
+        deleted = 0
+        if delete_missing:
+            deleted = self.delete_missing_documents(
+                [doc.file_path for doc in documents], batch_size=batch_size, existing=existing
+            )
+        self.delete_subtrees(replaced_ids, batch_size=batch_size)
+        self.delete_subtrees(legacy_ids, batch_size=batch_size, delete_corpus=True)
+        self.create_nodes_and_relationships(changed, batch_size=batch_size, max_workers=max_workers)
+        self._write_plan(
+            [(CORPUS_HASH_QUERY, [
+                {"id": corpus_id(doc.file_path), "content_hash": content_hash}
+                for doc, content_hash in zip(changed, changed_hashes)
+            ])],
+            batch_size,
+        )
+        return {
+            "created": len(changed) - len(replaced_ids) - len(legacy_ids),
+            "updated": len(replaced_ids) + len(legacy_ids),
+            "unchanged": len(documents) - len(changed),
+            "deleted": deleted,
+        }
     
-    def batch_embed(self, texts, batch_size=4):
-        embedding_vectors = []
-        for i in tqdm(range(0, len(texts), batch_size), desc=f"임베딩 벡터 생성 중..."):
-            batch = texts[i:i + batch_size]
-            embedding_vectors += self.embedding_model.embed_documents(batch)
-        
-        return embedding_vectors
+    def _classify_changes(self, documents, existing):
+        """(바뀐 문서, 그 해시, 서브트리를 교체할 Corpus ID, 이전 방식 Corpus ID)"""
+        changed, changed_hashes, replaced_ids, legacy_ids = [], [], [], []
+        for doc in documents:
+            content_hash = document_hash(doc)
+            stored = existing.get(doc.file_path)
+            if stored is not None and stored[1] == content_hash:
+                continue
+            changed.append(doc)
+            changed_hashes.append(content_hash)
+            if stored is None:
+                continue
+            if stored[0] == corpus_id(doc.file_path):
+                replaced_ids.append(stored[0])
+            else:
+                # 이전 방식(uuid4)으로 적재된 문서는 Corpus까지 지우고 결정적 ID로 다시 적재
+                legacy_ids.append(stored[0])
+        return changed, changed_hashes, replaced_ids, legacy_ids
+
+    def refresh_summaries(self, documents, batch_size=1000, vector_batch_size=100):
+        """구조(본문/트리)는 그대로이고 요약만 바뀐 문서의 summary/vector 속성을 제자리에서 갱신합니다.
+
+        그래프에 같은 ID의 노드가 모두 있는 문서만 갱신하고, 구조가 다른 문서는 sync_documents로 다시 적재합니다.
+        """
+        documents = list(documents)
+        refreshable, fallback, updates, targets, hashes = [], [], [], [], []
+        with self.driver.session() as session:
+            for doc in documents:
+                plan, embedding_targets = self._flatten_documents([doc])
+                rows = {"Corpus": plan[0][1], "Chunk": plan[1][1]}
+                stored = {}
+                for label, label_rows in rows.items():
+                    result = session.run(
+                        SUMMARY_LOOKUP_QUERY.format(label=label), {"rows": [{"id": row["id"]} for row in label_rows]}
+                    )
+                    stored.update({record["id"]: (record["found"], record["summary"]) for record in result})
+                if not all(found for found, _ in stored.values()):
+                    fallback.append(doc)
+                    continue
+                refreshable.append(doc)
+                hashes.append({"id": corpus_id(doc.file_path), "content_hash": document_hash(doc)})
+                changed = {
+                    row["id"] for label_rows in rows.values() for row in label_rows
+                    if (row["summary"] or "") != (stored[row["id"]][1] or "")
+                }
+                updates.extend(
+                    (label, {"id": row["id"], "summary": row["summary"]})
+                    for label, label_rows in rows.items() for row in label_rows if row["id"] in changed
+                )
+                targets.extend(target for target in embedding_targets if target[1] in changed)
+
+        plan = [
+            (SUMMARY_WRITE_QUERY.format(label=label), [row for row_label, row in updates if row_label == label])
+            for label in ("Corpus", "Chunk")
+        ]
+        self._write_plan(plan, batch_size)
+        if targets:
+            vectors = self.batch_embed([text for _, _, text in targets])
+            self._write_plan(self._vector_plan(targets, vectors), vector_batch_size)
+        self._write_plan([(CORPUS_HASH_QUERY, hashes)], batch_size)
+
+        stats = {"refreshed": len(refreshable), "summaries": len(updates), "created": 0, "updated": 0, "unchanged": 0}
+        if fallback:
+            stats.update(self.sync_documents(fallback, batch_size=batch_size, delete_missing=False))
+        stats["fallback"] = len(fallback)
+        return stats
+
+    def bump_graph_version(self):
+        """그래프가 바뀌었음을 검색 측 캐시(ChildVectorCache)에 알리기 위해 버전을 갱신합니다."""
+        with self.driver.session() as session:
+            session.run(
+                "MERGE (m:Meta {id: 'graph'}) SET m.version = $version",
+                {"version": str(uuid4())},
+            )
+
+    def batch_embed(self, texts):
+        # 배치 분할/동시 요청/캐시는 embedding_model(CachedEmbeddings)이 담당
+        return self.embedding_model.embed_documents(list(texts))
     
-    def setup_vector_indexes(self):
-        """벡터 인덱스를 생성합니다."""
+    @property
+    def embedding_model_name(self) -> str:
+        return getattr(self.embedding_model, "model_name", None) or getattr(self.embedding_model, "model", None) or ""
+
+    def get_active_embedding(self) -> dict:
+        with self.driver.session() as session:
+            record = session.run(ACTIVE_EMBEDDING_QUERY).single()
+        return dict(record) if record and record["property"] else {}
+
+    @property
+    def vector_property(self) -> str:
+        if self._vector_property is None:
+            self._vector_property = resolve_vector_property(self.get_active_embedding(), self.embedding_model_name)
+        return self._vector_property
+
+    def embedding_dimensions(self, property_name: str = None, embedding_model=None) -> int:
+        """활성 속성이면 Meta에 기록된 차원, 아니면 임베딩 모델로 한 번 임베딩해 차원을 구합니다. (결과는 임베딩 캐시에 남음)"""
+        active = self.get_active_embedding() if embedding_model is None else {}
+        if active and active.get("property") == (property_name or self.vector_property) and active.get("dimensions"):
+            return int(active["dimensions"])
+        return len((embedding_model or self.embedding_model).embed_query("embedding dimension probe"))
+
+    @staticmethod
+    def _vector_index_query(node_type: str, property_name: str, dimensions: int) -> str:
+        # 기존 단일 속성은 기존 인덱스 이름을 유지하고, 모델별 속성은 속성 이름을 인덱스 이름에 포함
+        if property_name == LEGACY_VECTOR_PROPERTY:
+            index_name = f"{node_type.lower()}_vector_index"
+        else:
+            index_name = f"{node_type.lower()}_{property_name}_index"
+        return f"""
+        CREATE VECTOR INDEX {index_name} IF NOT EXISTS
+        FOR (n:{node_type})
+        ON (n.`{property_name}`)
+        OPTIONS {{
+            indexConfig: {{
+                `vector.dimensions`: {int(dimensions)},
+                `vector.similarity_function`: "cosine"
+            }}
+        }}
+        """
+
+    def setup_vector_indexes(self, property_name: str = None, dimensions: int = None):
+        """벡터 인덱스를 생성합니다. 기본은 이 연결의 임베딩 모델이 쓰는 속성과 그 모델의 차원"""
         print("🔧 문서 벡터 인덱스 설정 중...")
+        property_name = property_name or self.vector_property
+        dimensions = dimensions or self.embedding_dimensions(property_name)
         with self.driver.session() as session:
             # 문서 노드 타입에 대한 벡터 인덱스
-            node_types = NODE_TYPES
-            
             for node_type in NODE_TYPES:
                 if node_type == "Corpus":
                     continue
-                session.run(f"""
-                CREATE VECTOR INDEX {node_type.lower()}_vector_index IF NOT EXISTS
-                FOR (n:{node_type})
-                ON (n.vector)
-                OPTIONS {{
-                    indexConfig: {{
-                        `vector.dimensions`: 3072,
-                        `vector.similarity_function`: "cosine"
-                    }}
-                }}
-                """)
-                print(f"✅ {node_type} 노드 벡터 인덱스 생성 완료")
+                session.run(self._vector_index_query(node_type, property_name, dimensions))
+                print(f"✅ {node_type} 노드 벡터 인덱스 생성 완료 ({property_name}, {dimensions}차원)")
+
+    def switch_active_embedding(self, property_name: str, model_name: str, dimensions: int, legacy_model: str = None):
+        """검색 도구가 읽을 벡터 속성/모델을 한 트랜잭션에서 전환하고, 그래프 버전을 갱신해 검색 측 캐시를 무효화합니다.
+
+        legacy_model: 첫 전환일 때 기존 단일 속성(vector)을 만든 모델 이름 (그 모델로 쓰는 writer는 계속 vector에 기록)
+        """
+        with self.driver.session() as session:
+            session.execute_write(
+                lambda tx: tx.run(SWITCH_EMBEDDING_QUERY, {
+                    "property": property_name,
+                    "model": model_name,
+                    "dimensions": int(dimensions),
+                    "legacy_property": LEGACY_VECTOR_PROPERTY,
+                    "legacy_model": legacy_model,
+                    "version": str(uuid4()),
+                }).consume()
+            )
+        self._vector_property = None
+
+    def vector_coverage(self, property_name: str) -> dict:
+        with self.driver.session() as session:
+            record = session.run(VECTOR_COVERAGE_QUERY.format(property=property_name)).single()
+        return {"total": record["total"], "embedded": record["embedded"], "missing": record["total"] - record["embedded"]}
+
+    def iter_vector_targets(self, property_name: str, page_size: int = 1000):
+        """property_name 벡터가 없는 노드를 id 순서로 page_size개씩 읽어 [(label, id, text)]로 반환합니다."""
+        for label in ("Corpus", "Chunk"):
+            query = VECTOR_TARGETS_QUERY.format(label=label, property=property_name)
+            after = ""
+            while True:
+                with self.driver.session() as session:
+                    records = list(session.run(query, {"after": after, "limit": page_size}))
+                if not records:
+                    break
+                after = records[-1]["id"]
+                yield [(label, r["id"], vector_text(r["summary"], r["content"])) for r in records]
+
+    def write_vectors(self, targets, vectors, property_name: str, batch_size: int = 100):
+        self._write_plan(self._vector_plan(targets, vectors, property_name), batch_size)
             
         # print("✅ 문서, 엔티티 및 관계 벡터 인덱스 설정 완료")
     
@@ -75,134 +471,260 @@ class Neo4jConnection:
                 """)
                 print(f"✅ {node_type} ID 제약조건 생성 완료")
 
-    def create_nodes_and_relationships(self, documents):
+    def _flatten_documents(self, documents):
+        """문서 트리를 노드/엣지 행(row) 배치로 평탄화합니다."""
+        corpus_rows = []
+        chunk_rows = []
+        child_rows = {"Corpus": [], "Chunk": []}
+        next_rows = []
+        # 임베딩 대상 수집용 버퍼
+        embedding_targets = []
+
+        def add_next_rows(ids):
+            for prev_id, cur_id in zip(ids, ids[1:]):
+                next_rows.append({"prev": prev_id, "cur": cur_id})
+
+        def flatten_chunk(parent_label: str, parent_id: str, chunk_obj, order_idx: int, file_path: str):
+            node_id = chunk_id(parent_id, order_idx, chunk_obj)
+            content_value = getattr(chunk_obj, "content", "")
+            summary_value = getattr(chunk_obj, "summary", "")
+            chunk_rows.append({
+                "id": node_id,
+                "span": list(getattr(chunk_obj, "span", (0, 0))),
+                "content": content_value,
+                "summary": summary_value,
+                "order": order_idx,
+                "name": getattr(chunk_obj, "name", ""),
+                "file_path": file_path,
+            })
+            child_rows[parent_label].append({"parent_id": parent_id, "id": node_id})
+
+            child_ids = [
+                flatten_chunk("Chunk", node_id, child, child_idx, file_path)
+                for child_idx, child in enumerate(getattr(chunk_obj, "children", []) or [])
+            ]
+            add_next_rows(child_ids)
+
+            # 임베딩 대상 텍스트 선택: summary가 비었으면 content 사용
+            text_for_vec = vector_text(summary_value, content_value)
+            if text_for_vec.strip():
+                embedding_targets.append(("Chunk", node_id, text_for_vec))
+            return node_id
+
+        for doc in documents:
+            file_path = getattr(doc, "file_path", "")
+            doc_id = corpus_id(file_path)
+            doc_summary = getattr(doc, "summary", "")
+            doc_content = getattr(doc, "content", "")
+            corpus_rows.append({
+                "id": doc_id,
+                "name": file_path.split("/")[-1] if file_path else "",
+                "file_path": file_path,
+                "table_of_contents": json.dumps(getattr(doc, "table_of_contents", {}) or {}, ensure_ascii=False),
+                "summary": doc_summary,
+                "content": doc_content,
+            })
+            # 문서 루트는 Article로 간주하지 않고, Corpus -> Chunk 트리로 적재
+            top_children = getattr(doc, "children", {}) or {}
+            top_ids = [
+                flatten_chunk("Corpus", doc_id, top_chunk, idx, file_path)
+                for idx, top_chunk in enumerate(list(top_children.values()))
+            ]
+            add_next_rows(top_ids)
+
+            # 문서 요약도 벡터화 대상
+            text_for_vec = vector_text(doc_summary, doc_content)
+            if text_for_vec.strip():
+                embedding_targets.append(("Corpus", doc_id, text_for_vec))
+
+        # 노드를 먼저 만들고 엣지를 연결해야 하므로 순서가 중요
+        plan = [
+            (CORPUS_WRITE_QUERY, corpus_rows),
+            (CHUNK_WRITE_QUERY, chunk_rows),
+            (CHILD_WRITE_QUERY.format(parent_label="Corpus"), child_rows["Corpus"]),
+            (CHILD_WRITE_QUERY.format(parent_label="Chunk"), child_rows["Chunk"]),
+            (NEXT_WRITE_QUERY, next_rows),
+        ]
+        return plan, embedding_targets
+
+    def _write_plan(self, plan, batch_size: int):
+        """각 배치를 명시적 트랜잭션으로 실행합니다. 일시적 오류는 드라이버가 재시도합니다."""
+        def write_batch(tx, query, rows):
+            tx.run(query, {"rows": rows}).consume()
+
         with self.driver.session() as session:
-            # 임베딩 대상 수집용 버퍼
-            node_ids_for_embedding = []
-            texts_for_embedding = []
-
-            def ensure_corpus(file_path: str, table_of_contents: dict | None = None):
-                corpus_id = str(uuid4())
-                corpus_name = file_path.split("/")[-1] if file_path else ""
-                toc_str = json.dumps(table_of_contents or {}, ensure_ascii=False)
-                session.run(
-                    """
-                    MERGE (co:Corpus {id: $corpus_id})
-                    SET co.name = $corpus_name,
-                        co.file_path = $file_path,
-                        co.table_of_contents = $table_of_contents
-                    """,
-                    {
-                        "corpus_id": corpus_id,
-                        "corpus_name": corpus_name,
-                        "file_path": file_path,
-                        "table_of_contents": toc_str,
-                    },
-                )
-                return corpus_id
-
-            def create_chunks_recursive(parent_label: str, parent_id: str, chunk_obj, order_idx: int = 0, file_path: str = ""):
-                chunk_id = str(uuid4())
-                # Chunk 객체 처리 (dict는 들어오지 않음)
-                span_value = list(getattr(chunk_obj, "span", (0, 0)))
-                content_value = getattr(chunk_obj, "content", "")
-                summary_value = getattr(chunk_obj, "summary", "")
-                name_value = getattr(chunk_obj, "name", "")
-                session.run(
-                    """
-                    MERGE (c:Chunk {id: $chunk_id})
-                    ON CREATE SET c.span = $span,
-                                  c.content = $content,
-                                  c.summary = $summary,
-                                  c.order = $order,
-                                  c.name = $name,
-                                  c.file_path = $file_path
-                    """,
-                    {
-                        "chunk_id": chunk_id,
-                        "span": span_value,
-                        "content": content_value,
-                        "summary": summary_value,
-                        "order": order_idx,
-                        "name": name_value,
-                        "file_path": file_path,
-                    },
-                )
-                session.run(
-                    f"""
-                    MATCH (p:{parent_label} {{id: $parent_id}}), (c:Chunk {{id: $chunk_id}})
-                    MERGE (p)-[:CHILD]->(c)
-                    """,
-                    {"parent_id": parent_id, "chunk_id": chunk_id},
-                )
-                # 자식 재귀 및 NEXT/PREV 연결
-                prev_child_id = None
-                for child_idx, child in enumerate(getattr(chunk_obj, "children", []) or []):
-                    child_chunk_id = create_chunks_recursive("Chunk", chunk_id, child, child_idx, file_path)
-                    if prev_child_id is not None:
-                        session.run(
-                            """
-                            MATCH (p:Chunk {id: $prev}), (c:Chunk {id: $cur})
-                            MERGE (p)-[:NEXT]->(c)
-                            MERGE (c)-[:PREV]->(p)
-                            """,
-                            {"prev": prev_child_id, "cur": child_chunk_id},
-                        )
-                    prev_child_id = child_chunk_id
-
-                # 임베딩 대상 텍스트 선택: summary가 비었으면 content 사용
-                text_for_vec = summary_value.strip() if summary_value and summary_value.strip() else content_value
-                if text_for_vec.strip():
-                    node_ids_for_embedding.append(("Chunk", chunk_id))
-                    texts_for_embedding.append(text_for_vec)
-                return chunk_id
+            for query, rows in plan:
+                for i in range(0, len(rows), batch_size):
+                    session.execute_write(write_batch, query, rows[i:i + batch_size])
 
-            for doc in documents:
-                file_path = getattr(doc, "file_path", "")
-                toc = getattr(doc, "table_of_contents", {}) or {}
-                corpus_id = ensure_corpus(file_path, toc)
-                # 문서 루트는 Article로 간주하지 않고, Corpus -> Chunk 트리로 적재
-                prev_top_id = None
-                # dict 트리를 순회
-                top_children = getattr(doc, "children", {}) or {}
-                prev_top_id = None
-                for idx, top_chunk in enumerate(list(top_children.values())):
-                    top_id = create_chunks_recursive("Corpus", corpus_id, top_chunk, idx, file_path)
-                    if prev_top_id is not None:
-                        session.run(
-                            """
-                            MATCH (p:Chunk {id: $prev}), (c:Chunk {id: $cur})
-                            MERGE (p)-[:NEXT]->(c)
-                            MERGE (c)-[:PREV]->(p)
-                            """,
-                            {"prev": prev_top_id, "cur": top_id},
-                        )
-                    prev_top_id = top_id
-
-                # 문서 요약도 저장 및 벡터화 대상
-                doc_summary = getattr(doc, "summary", "")
-                doc_content = getattr(doc, "content", "")
-                text_for_vec = doc_summary.strip() if doc_summary and doc_summary.strip() else doc_content
-                session.run(
-                    """
-                    MERGE (doc:Corpus {id: $corpus_id})
-                    SET doc.summary = $summary,
-                        doc.content = $content
-                    """,
-                    {"corpus_id": corpus_id, "summary": doc_summary, "content": doc_content},
-                )
-                if text_for_vec.strip():
-                    node_ids_for_embedding.append(("Corpus", corpus_id))
-                    texts_for_embedding.append(text_for_vec)
-
-            # 임베딩 생성 후 각 노드에 저장
-            if texts_for_embedding:
-                vectors = self.batch_embed(texts_for_embedding)
-                for (label, node_id), vec in zip(node_ids_for_embedding, vectors):
-                    session.run(
-                        f"""
-                        MATCH (n:{label} {{id: $id}})
-                        SET n.vector = $vector
-                        """,
-                        {"id": node_id, "vector": vec},
-                    )
+    def create_nodes_and_relationships(self, documents, batch_size=1000, vector_batch_size=100, max_workers=1):
+        documents = list(documents)
+        if not documents:
+            return
+
+        # 문서 단위로 shard를 나눠 writer 세션마다 독립적으로 적재
+        num_shards = max(1, min(max_workers, len(documents)))
+        shards = [documents[i::num_shards] for i in range(num_shards)]
+        flattened = [self._flatten_documents(shard) for shard in shards]
+
+        if num_shards == 1:
+            self._write_plan(flattened[0][0], batch_size)
+        else:
+            with ThreadPoolExecutor(max_workers=num_shards) as executor:
+                list(executor.map(lambda item: self._write_plan(item[0], batch_size), flattened))
+
+        # 임베딩 생성 후 각 노드에 저장
+        embedding_targets = [target for _, targets in flattened for target in targets]
+        if not embedding_targets:
+            return
+        vectors = self.batch_embed([text for _, _, text in embedding_targets])
+        self._write_plan(self._vector_plan(embedding_targets, vectors), vector_batch_size)
+
+    def _vector_plan(self, embedding_targets, vectors, property_name: str = None):
+        property_name = property_name or self.vector_property
+        vector_rows = {"Corpus": [], "Chunk": []}
+        for (label, node_id, _), vec in zip(embedding_targets, vectors):
+            vector_rows[label].append({"id": node_id, "vector": vec})
+        return [
+            (VECTOR_WRITE_QUERY.format(label=label, property=property_name), rows)
+            for label, rows in vector_rows.items()
+        ]
+
+    # --- 비동기 버전: 같은 쓰기 계획(_flatten_documents)을 AsyncGraphDatabase 세션으로 실행 ---
+    async def asetup_constraints(self):
+        async with self.async_driver.session() as session:
+            for node_type in NODE_TYPES:
+                await session.run(f"""
+                    CREATE CONSTRAINT {node_type.lower()}_id_unique IF NOT EXISTS
+                    FOR (n:{node_type})
+                    REQUIRE n.id IS UNIQUE
+                """)
+
+    async def aget_active_embedding(self) -> dict:
+        async with self.async_driver.session() as session:
+            result = await session.run(ACTIVE_EMBEDDING_QUERY)
+            record = await result.single()
+        return dict(record) if record and record["property"] else {}
+
+    async def asetup_vector_indexes(self):
+        # 쓰기 전에 벡터 속성을 결정해 두어 이후 _vector_plan이 동기 드라이버를 쓰지 않게 함
+        active = await self.aget_active_embedding()
+        self._vector_property = resolve_vector_property(active, self.embedding_model_name)
+        if active.get("property") == self._vector_property and active.get("dimensions"):
+            dimensions = int(active["dimensions"])
+        else:
+            dimensions = len(await self.embedding_model.aembed_query("embedding dimension probe"))
+        async with self.async_driver.session() as session:
+            for node_type in NODE_TYPES:
+                if node_type == "Corpus":
+                    continue
+                await session.run(self._vector_index_query(node_type, self._vector_property, dimensions))
+
+    async def aclear_database(self, batch_size: int = 10000):
+        async def delete_batch(tx):
+            result = await tx.run(
+                "MATCH (n) WITH n LIMIT $limit DETACH DELETE n RETURN count(*) AS deleted",
+                {"limit": batch_size},
+            )
+            return (await result.single())["deleted"]
+
+        async with self.async_driver.session() as session:
+            while await session.execute_write(delete_batch):
+                pass
+
+    async def aget_corpus_hashes(self):
+        async with self.async_driver.session() as session:
+            result = await session.run(CORPUS_HASHES_QUERY)
+            return {
+                record["file_path"]: (record["id"], record["content_hash"])
+                async for record in result
+            }
+
+    async def _awrite_plan(self, plan, batch_size: int):
+        async def write_batch(tx, query, rows):
+            result = await tx.run(query, {"rows": rows})
+            await result.consume()
+
+        async with self.async_driver.session() as session:
+            for query, rows in plan:
+                for i in range(0, len(rows), batch_size):
+                    await session.execute_write(write_batch, query, rows[i:i + batch_size])
+
+    async def adelete_subtrees(self, corpus_ids, batch_size: int = 1000, delete_corpus: bool = False):
+        corpus_ids = list(corpus_ids)
+        if not corpus_ids:
+            return
+        async with self.async_driver.session() as session:
+            result = await session.run(SUBTREE_IDS_QUERY, {"ids": corpus_ids})
+            chunk_ids = [record["id"] async for record in result]
+        plan = [(CHUNK_DELETE_QUERY, [{"id": i} for i in chunk_ids])]
+        if delete_corpus:
+            plan.append((CORPUS_DELETE_QUERY, [{"id": i} for i in corpus_ids]))
+        await self._awrite_plan(plan, batch_size)
+
+    async def adelete_missing_documents(self, file_paths, batch_size: int = 1000, existing=None):
+        existing = await self.aget_corpus_hashes() if existing is None else existing
+        keep = set(file_paths)
+        removed = [node_id for file_path, (node_id, _) in existing.items() if file_path not in keep]
+        await self.adelete_subtrees(removed, batch_size=batch_size, delete_corpus=True)
+        return len(removed)
+
+    async def acreate_nodes_and_relationships(self, documents, batch_size=1000, vector_batch_size=100, max_workers=1):
+        documents = list(documents)
+        if not documents:
+            return
+        num_shards = max(1, min(max_workers, len(documents)))
+        shards = [documents[i::num_shards] for i in range(num_shards)]
+        # 평탄화는 CPU 작업이므로 executor에서 실행
+        flattened = await asyncio.to_thread(lambda: [self._flatten_documents(shard) for shard in shards])
+        embedding_targets = [target for _, targets in flattened for target in targets]
+
+        async def embed():
+            if not embedding_targets:
+                return []
+            return await self.embedding_model.aembed_documents([text for _, _, text in embedding_targets])
+
+        # shard별 구조 쓰기와 임베딩 요청을 동시에 진행하고, 노드가 모두 생긴 뒤 벡터를 기록
+        *_, vectors = await asyncio.gather(
+            *[self._awrite_plan(plan, batch_size) for plan, _ in flattened],
+            embed(),
+        )
+        if embedding_targets:
+            await self._awrite_plan(self._vector_plan(embedding_targets, vectors), vector_batch_size)
+
+    async def async_sync_documents(self, documents, batch_size=1000, max_workers=1, delete_missing=True):
+        """sync_documents의 비동기 버전"""
+        documents = list(documents)
+        existing = await self.aget_corpus_hashes()
+        changed, changed_hashes, replaced_ids, legacy_ids = await asyncio.to_thread(
+            self._classify_changes, documents, existing
+        )
+
+        deleted = 0
+        if delete_missing:
+            deleted = await self.adelete_missing_documents(
+                [doc.file_path for doc in documents], batch_size=batch_size, existing=existing
+            )
+        await self.adelete_subtrees(replaced_ids, batch_size=batch_size)
+        await self.adelete_subtrees(legacy_ids, batch_size=batch_size, delete_corpus=True)
+        await self.acreate_nodes_and_relationships(changed, batch_size=batch_size, max_workers=max_workers)
+        await self._awrite_plan(
+            [(CORPUS_HASH_QUERY, [
+                {"id": corpus_id(doc.file_path), "content_hash": content_hash}
+                for doc, content_hash in zip(changed, changed_hashes)
+            ])],
+            batch_size,
+        )
+        return {
+            "created": len(changed) - len(replaced_ids) - len(legacy_ids),
+            "updated": len(replaced_ids) + len(legacy_ids),
+            "unchanged": len(documents) - len(changed),
+            "deleted": deleted,
+        }
+
+    async def abump_graph_version(self):
+        async with self.async_driver.session() as session:
+            await session.run(
+                "MERGE (m:Meta {id: 'graph'}) SET m.version = $version",
+                {"version": str(uuid4())},
+            )
@@ -0,0 +1,132 @@
+import os
+import json
+import zlib
+import sqlite3
+import threading
+from typing import Iterator, Optional
+from .model import Document, SpanChunk
+
+
+DEFAULT_DOCUMENT_STORE_PATH = "./data/cache/document_store.sqlite"
+DEFAULT_SNAPSHOT_DIR = "./data/cache/snapshots"
+
+
+def encode_document(document: Document) -> bytes:
+    # Chunk 트리는 content 없이(span만) 저장하고, 읽을 때 본문을 참조하는 SpanChunk로 복원
+    data = document.model_dump(exclude={"children"})
+    data["children"] = {
+        key: chunk.compact_dump() if hasattr(chunk, "compact_dump") else chunk.model_dump()
+        for key, chunk in document.children.items()
+    }
+    return zlib.compress(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+
+def decode_document(blob: bytes) -> Document:
+    data = json.loads(zlib.decompress(blob).decode("utf-8"))
+    children = data.pop("children", {}) or {}
+    document = Document(**data)
+    document.children = {
+        key: SpanChunk.from_dump(chunk, document.content, document.span[0])
+        for key, chunk in children.items()
+    }
+    return document
+
+
+class DocumentStore:
+    """생성 파이프라인의 문서를 디스크(SQLite)에 보관하는 저장소입니다.
+
+    State에는 저장소 경로(handle)만 두고, 각 노드는 window 크기만큼 문서를 읽어 처리한 뒤 다시 씁니다.
+    메모리 사용량은 corpus 크기가 아니라 window 크기에 비례합니다.
+    문서는 position(적재 순서) 순서로 읽으며, 한 행에 압축된 문서 전체(본문/목차/트리/요약)를 저장합니다.
+    """
+
+    def __init__(self, path: str = DEFAULT_DOCUMENT_STORE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                file_path TEXT PRIMARY KEY,
+                position INTEGER NOT NULL,
+                failed_stage TEXT NOT NULL DEFAULT '',
+                data BLOB NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS documents_position ON documents (position)")
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def clear(self):
+        conn = self._connection()
+        conn.execute("DELETE FROM documents")
+        conn.commit()
+
+    def put_many(self, documents):
+        """문서를 저장합니다. 이미 있는 문서는 순서(position)를 유지한 채 내용만 교체합니다."""
+        conn = self._connection()
+        next_position = conn.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM documents").fetchone()[0]
+        rows = []
+        for offset, document in enumerate(documents):
+            rows.append((document.file_path, next_position + offset, document.failed_stage, encode_document(document)))
+        conn.executemany(
+            """
+            INSERT INTO documents (file_path, position, failed_stage, data) VALUES (?, ?, ?, ?)
+            ON CONFLICT(file_path) DO UPDATE SET failed_stage = excluded.failed_stage, data = excluded.data
+            """,
+            rows,
+        )
+        conn.commit()
+
+    def get(self, file_path: str) -> Optional[Document]:
+        row = self._connection().execute("SELECT data FROM documents WHERE file_path = ?", (file_path,)).fetchone()
+        return decode_document(row[0]) if row else None
+
+    def read_window(self, after_position: int, window_size: int):
+        """position이 after_position보다 큰 문서를 최대 window_size개 읽어 (문서 목록, 마지막 position)을 반환"""
+        rows = self._connection().execute(
+            "SELECT position, data FROM documents WHERE position > ? ORDER BY position LIMIT ?",
+            (after_position, max(1, window_size)),
+        ).fetchall()
+        if not rows:
+            return [], after_position
+        return [decode_document(data) for _, data in rows], rows[-1][0]
+
+    def iter_windows(self, window_size: int) -> Iterator[list]:
+        """position 순서로 window_size개씩 문서를 읽습니다. (한 번에 한 window만 메모리에 올림)"""
+        position = -1
+        while True:
+            documents, position = self.read_window(position, window_size)
+            if not documents:
+                return
+            yield documents
+
+    def file_paths(self) -> list:
+        return [row[0] for row in self._connection().execute("SELECT file_path FROM documents ORDER BY position")]
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def failed_count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM documents WHERE failed_stage != ''").fetchone()[0]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def stage_snapshot(snapshot_dir: str, stage: str) -> DocumentStore:
+    """단계 출력 snapshot 저장소 (<snapshot_dir>/<단계 이름>.sqlite). 다음 실행에서 이 단계 이후부터 다시 시작할 때 입력으로 사용"""
+    return DocumentStore(os.path.join(snapshot_dir or DEFAULT_SNAPSHOT_DIR, f"{stage}.sqlite"))
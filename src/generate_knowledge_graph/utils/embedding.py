@@ -0,0 +1,188 @@
+import os
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from tqdm.auto import tqdm
+from langchain_core.embeddings import Embeddings
+from .concurrency import EndpointLimiter, get_controller
+
+
+DEFAULT_EMBEDDING_STORE_PATH = "./data/cache/embeddings.sqlite"
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    # 토크나이저 없이 대략적인 토큰 수 추정 (영문 기준 약 4글자/토큰)
+    return len(text) // 4 + 1
+
+
+def embedding_store_key(embedding_model, model_name: str) -> str:
+    """영구 캐시 키: 모델 이름 + (설정된 경우) 출력 차원과 엔드포인트.
+
+    같은 모델 이름이라도 dimensions나 배포(base_url)가 다르면 다른 벡터이므로 캐시를 공유하지 않습니다.
+    """
+    parts = [model_name]
+    dimensions = getattr(embedding_model, "dimensions", None)
+    if dimensions:
+        parts.append(f"dimensions={dimensions}")
+    base_url = getattr(embedding_model, "openai_api_base", None) or getattr(embedding_model, "base_url", None)
+    if isinstance(base_url, str) and base_url:
+        parts.append(f"base_url={base_url.rstrip('/')}")
+    return "|".join(parts)
+
+
+class EmbeddingStore:
+    """(모델 키, 텍스트 해시)를 키로 float32 벡터를 보관하는 SQLite 저장소입니다."""
+
+    def __init__(self, path: str = DEFAULT_EMBEDDING_STORE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get_many(self, model: str, hashes: list, dim: int | None = None) -> dict:
+        """dim을 주면 차원이 다른 행은 캐시 미스로 처리"""
+        found = {}
+        # SQLite 파라미터 개수 제한을 피하기 위해 나눠서 조회
+        for i in range(0, len(hashes), 500):
+            part = hashes[i:i + 500]
+            placeholders = ",".join("?" * len(part))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *part],
+                ).fetchall()
+            for h, blob in rows:
+                if dim is not None and len(blob) != dim * 4:
+                    continue
+                vec = array("f")
+                vec.frombytes(blob)
+                found[h] = vec.tolist()
+        return found
+
+    def put_many(self, model: str, items: list):
+        rows = [(model, h, len(vec), array("f", vec).tobytes()) for h, vec in items]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, dim, vector) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """임베딩 모델을 감싸 중복 제거, 토큰 예산 기반 배치, 동시 요청, 영구 캐시를 제공합니다.
+
+    생성 파이프라인(Neo4jConnection.batch_embed)과 검색 도구(embed_query)가 같은 저장소를 공유합니다.
+    """
+
+    def __init__(
+        self,
+        embedding_model: Embeddings,
+        store: EmbeddingStore | str | None = DEFAULT_EMBEDDING_STORE_PATH,
+        model_name: str | None = None,
+        max_batch_tokens: int = 32000,
+        max_batch_size: int = 16,
+        max_concurrency: int = 16,
+        limiter: EndpointLimiter | None = None,
+    ):
+        self.embedding_model = embedding_model
+        self.store = EmbeddingStore(store) if isinstance(store, str) else store
+        self.model_name = model_name or getattr(embedding_model, "model", None) or type(embedding_model).__name__
+        # 저장소 키는 차원/엔드포인트까지 포함 (model_name은 벡터 속성 이름 등에 그대로 사용)
+        self.store_key = embedding_store_key(embedding_model, self.model_name)
+        self.dimensions = getattr(embedding_model, "dimensions", None) or None
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        # max_concurrency는 스레드 상한, 실제 동시 요청 수는 엔드포인트 limiter가 조절
+        self.max_concurrency = max_concurrency
+        self.limiter = limiter or get_controller().limiter(f"embedding:{self.model_name}")
+
+    def _pack_batches(self, texts: list) -> list:
+        batches, batch, batch_tokens = [], [], 0
+        for text in texts:
+            tokens = estimate_tokens(text)
+            if batch and (len(batch) >= self.max_batch_size or batch_tokens + tokens > self.max_batch_tokens):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            batch.append(text)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _lookup(self, texts: list):
+        # 동일 텍스트는 한 번만 임베딩
+        unique = {}
+        for text in texts:
+            unique.setdefault(text_hash(text), text)
+        cached = self.store.get_many(self.store_key, list(unique), dim=self.dimensions) if self.store else {}
+        missing = [text for h, text in unique.items() if h not in cached]
+        return cached, missing
+
+    def _save(self, cached: dict, batch: list, vectors: list):
+        items = [(text_hash(text), vec) for text, vec in zip(batch, vectors)]
+        if self.store:
+            self.store.put_many(self.store_key, items)
+        cached.update(items)
+
+    def embed_documents(self, texts: list) -> list:
+        cached, missing = self._lookup(texts)
+        if missing:
+            batches = self._pack_batches(missing)
+            with tqdm(total=len(batches), desc="임베딩 벡터 생성 중...") as progress_bar:
+                def embed_batch(batch):
+                    vectors = self.limiter.call(self.embedding_model.embed_documents, batch)
+                    self._save(cached, batch, vectors)
+                    progress_bar.update(1)
+
+                with ThreadPoolExecutor(max_workers=max(1, self.max_concurrency)) as executor:
+                    list(executor.map(embed_batch, batches))
+        return [cached[text_hash(text)] for text in texts]
+
+    async def aembed_documents(self, texts: list) -> list:
+        # SQLite 조회/기록은 이벤트 루프를 막지 않도록 스레드에서 실행
+        cached, missing = await asyncio.to_thread(self._lookup, texts)
+        if missing:
+            async def embed_batch(batch):
+                vectors = await self.limiter.acall(self.embedding_model.aembed_documents, batch)
+                await asyncio.to_thread(self._save, cached, batch, vectors)
+
+            await asyncio.gather(*[embed_batch(batch) for batch in self._pack_batches(missing)])
+        return [cached[text_hash(text)] for text in texts]
+
+    def embed_query(self, text: str) -> list:
+        cached, missing = self._lookup([text])
+        if missing:
+            self._save(cached, missing, [self.limiter.call(self.embedding_model.embed_query, text)])
+        return cached[text_hash(text)]
+
+    async def aembed_query(self, text: str) -> list:
+        cached, missing = await asyncio.to_thread(self._lookup, [text])
+        if missing:
+            vector = await self.limiter.acall(self.embedding_model.aembed_query, text)
+            await asyncio.to_thread(self._save, cached, missing, [vector])
+        return cached[text_hash(text)]
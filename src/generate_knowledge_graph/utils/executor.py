@@ -0,0 +1,68 @@
+import asyncio
+import atexit
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+
+class StageExecutor:
+    """CPU 작업(정렬, 트리 변환, 규칙 기반 파싱 등)을 문서 단위 task로 프로세스 풀에 나눠 실행합니다.
+
+    - workers <= 1이면 풀 없이 호출한 프로세스에서 바로 실행 (기존 동작)
+    - fn은 모듈 최상위 함수여야 하고, 인자/결과는 pickle 가능한 작은 형태(str, tuple, dict)로 주고받음
+    - 풀은 처음 사용할 때 만들고 같은 워커 수의 executor끼리 공유
+    """
+
+    def __init__(self, workers: int = 1):
+        self.workers = max(1, int(workers or 1))
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def map(self, fn, tasks, chunksize: int = 1) -> list:
+        """tasks의 각 인자 tuple로 fn(*task)를 실행해 순서대로 반환합니다."""
+        tasks = list(tasks)
+        if self.workers <= 1 or len(tasks) <= 1:
+            return [fn(*task) for task in tasks]
+        return list(self.pool.map(_apply, [fn] * len(tasks), tasks, chunksize=chunksize))
+
+    async def run(self, fn, *args):
+        """이벤트 루프를 막지 않고 fn(*args)를 실행합니다. (풀이 없으면 스레드에서 실행)"""
+        if self.workers <= 1:
+            return await asyncio.to_thread(fn, *args)
+        return await asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+
+def _apply(fn, args):
+    return fn(*args)
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_stage_executor(workers: int = 1) -> StageExecutor:
+    workers = max(1, int(workers or 1))
+    with _executors_lock:
+        if workers not in _executors:
+            _executors[workers] = StageExecutor(workers)
+        return _executors[workers]
+
+
+@atexit.register
+def shutdown_stage_executors():
+    with _executors_lock:
+        executors = list(_executors.values())
+    for executor in executors:
+        executor.shutdown()
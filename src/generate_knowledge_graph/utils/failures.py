@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from datetime import datetime
+from .llm_cache import bypass_llm_cache
+
+
+DEFAULT_DEAD_LETTER_PATH = "./data/dead_letter.jsonl"
+
+
+def _check(output, validate):
+    """출력이 정상이면 None, 아니면 오류 메시지"""
+    if isinstance(output, Exception):
+        return f"{type(output).__name__}: {output}"
+    if validate is not None:
+        try:
+            return validate(output)
+        except Exception as e:
+            return f"{type(e).__name__}: {e}"
+    return None
+
+
+def _backoff_seconds(attempt: int, backoff: float, max_backoff: float) -> float:
+    return min(max_backoff, backoff * (2 ** (attempt - 1)))
+
+
+def batch_with_retry(chain, queries, config=None, validate=None, max_attempts: int = 3, backoff: float = 2.0, max_backoff: float = 30.0):
+    """chain.batch를 항목 단위로 격리해 실행합니다.
+
+    예외와 스키마 검증 실패(validate가 오류 메시지를 반환)는 해당 항목만 실패로 표시하고,
+    실패한 항목만 모아 지수 backoff 후 최대 max_attempts번까지 다시 요청합니다.
+    (results, errors)를 반환하며 최종 실패 항목은 results가 None, errors에 마지막 오류가 남습니다.
+    """
+    results = [None] * len(queries)
+    errors = [None] * len(queries)
+    pending = list(range(len(queries)))
+    for attempt in range(max(1, max_attempts)):
+        if not pending:
+            break
+        if attempt:
+            time.sleep(_backoff_seconds(attempt, backoff, max_backoff))
+            with bypass_llm_cache():
+                outputs = chain.batch([queries[i] for i in pending], config=config, return_exceptions=True)
+        else:
+            outputs = chain.batch([queries[i] for i in pending], config=config, return_exceptions=True)
+        failed = []
+        for i, output in zip(pending, outputs):
+            errors[i] = _check(output, validate)
+            if errors[i] is None:
+                results[i] = output
+            else:
+                failed.append(i)
+        pending = failed
+    return results, errors
+
+
+async def abatch_with_retry(chain, queries, config=None, validate=None, max_attempts: int = 3, backoff: float = 2.0, max_backoff: float = 30.0):
+    """batch_with_retry의 비동기 버전 (chain.abatch, 스레드 없이 이벤트 루프에서 실행)"""
+    results = [None] * len(queries)
+    errors = [None] * len(queries)
+    pending = list(range(len(queries)))
+    for attempt in range(max(1, max_attempts)):
+        if not pending:
+            break
+        if attempt:
+            await asyncio.sleep(_backoff_seconds(attempt, backoff, max_backoff))
+            with bypass_llm_cache():
+                outputs = await chain.abatch([queries[i] for i in pending], config=config, return_exceptions=True)
+        else:
+            outputs = await chain.abatch([queries[i] for i in pending], config=config, return_exceptions=True)
+        failed = []
+        for i, output in zip(pending, outputs):
+            errors[i] = _check(output, validate)
+            if errors[i] is None:
+                results[i] = output
+            else:
+                failed.append(i)
+        pending = failed
+    return results, errors
+
+
+async def ainvoke_with_retry(chain, query, config=None, validate=None, max_attempts: int = 3, backoff: float = 2.0, max_backoff: float = 30.0):
+    """ainvoke 한 건을 검증/재시도합니다. (result, error)를 반환합니다."""
+    error = None
+    for attempt in range(max(1, max_attempts)):
+        if attempt:
+            await asyncio.sleep(_backoff_seconds(attempt, backoff, max_backoff))
+        try:
+            if attempt:
+                with bypass_llm_cache():
+                    output = await chain.ainvoke(query, config=config)
+            else:
+                output = await chain.ainvoke(query, config=config)
+        except Exception as e:
+            output = e
+        error = _check(output, validate)
+        if error is None:
+            return output, None
+    return None, error
+
+
+class DeadLetterQueue:
+    """재시도 후에도 실패한 문서를 jsonl 파일에 기록합니다. 문서별로 마지막 기록이 유효합니다."""
+
+    def __init__(self, path: str = DEFAULT_DEAD_LETTER_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, file_path: str, stage: str, error: str):
+        entry = {
+            "file_path": file_path,
+            "stage": stage,
+            "error": str(error)[:2000],
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+        }
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def _read(self) -> dict:
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entry = json.loads(line)
+                    entries[entry["file_path"]] = entry
+        return entries
+
+    def load(self) -> dict:
+        """{file_path: 마지막 기록}"""
+        with self._lock:
+            return self._read()
+
+    def resolve(self, file_paths):
+        """다시 처리되어 성공한 문서의 기록을 지웁니다."""
+        file_paths = set(file_paths)
+        with self._lock:
+            entries = self._read()
+            if not file_paths & entries.keys():
+                return
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for path, entry in entries.items():
+                    if path not in file_paths:
+                        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_dead_letter_queue(path: str = DEFAULT_DEAD_LETTER_PATH) -> DeadLetterQueue:
+    # 같은 파일을 쓰는 노드/스레드가 하나의 lock을 공유
+    with _queues_lock:
+        if path not in _queues:
+            _queues[path] = DeadLetterQueue(path)
+        return _queues[path]
+
+
+def mark_failed(document, stage: str, error: str, dead_letter: DeadLetterQueue):
+    document.failed_stage = stage
+    dead_letter.record(document.file_path, stage, error)
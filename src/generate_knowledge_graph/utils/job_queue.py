@@ -0,0 +1,198 @@
+import os
+import time
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+
+DEFAULT_JOB_QUEUE_PATH = "./data/cache/ingest_queue.sqlite"
+
+
+@dataclass
+class Job:
+    id: int
+    file_path: str
+    benchmark_name: str
+    attempts: int
+
+
+class JobQueue:
+    """문서 단위 적재 작업을 SQLite에 보관하는 작업 큐입니다. (coordinator가 넣고 여러 worker가 가져감)
+
+    - lease: 대기(pending) 작업을 lease_seconds 동안 한 worker에게 배정. 만료된 lease는 다음 lease 때 회수되어 다시 대기 상태가 됨
+    - heartbeat: 처리 중인 worker가 lease를 연장. 이미 회수된 작업은 연장되지 않으므로 worker가 lease를 잃었음을 알 수 있음
+    - complete/fail: 현재 lease를 가진 worker만 상태를 바꿀 수 있음 (회수된 뒤 늦게 끝난 worker의 결과는 무시)
+    그래프 적재는 결정적 ID + 내용 해시 기반 증분 적재라서, 회수된 작업이 다시 실행되어도 결과는 한 번 적재한 것과 같습니다.
+    여러 머신에서 쓸 때는 잠금을 지원하는 공유 파일 시스템에 큐 파일을 두어야 합니다.
+    """
+
+    def __init__(self, path: str = DEFAULT_JOB_QUEUE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                file_path TEXT NOT NULL UNIQUE,
+                benchmark_name TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker_id TEXT,
+                lease_expires_at REAL,
+                error TEXT,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: BEGIN IMMEDIATE로 lease 배정을 직접 직렬화
+            conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    def enqueue(self, file_paths, benchmark_name: str, reset: bool = False) -> int:
+        """작업을 추가하고 새로 추가된 수를 반환합니다. reset=True면 이미 있는 작업도 다시 대기 상태로 돌림"""
+        now = time.time()
+        conn = self._transaction()
+        try:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (file_path, benchmark_name, updated_at) VALUES (?, ?, ?)",
+                [(file_path, benchmark_name, now) for file_path in file_paths],
+            )
+            added = conn.total_changes - before
+            if reset:
+                conn.executemany(
+                    """
+                    UPDATE jobs SET status = 'pending', attempts = 0, worker_id = NULL, lease_expires_at = NULL,
+                                    error = NULL, benchmark_name = ?, updated_at = ?
+                    WHERE file_path = ?
+                    """,
+                    [(benchmark_name, now, file_path) for file_path in file_paths],
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def _reclaim_expired(self, conn, now: float, max_attempts: int):
+        # 만료된 lease: 시도 횟수가 남았으면 다시 대기, 아니면 실패로 확정
+        conn.execute(
+            """
+            UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                            error = COALESCE(error, 'lease expired'), worker_id = NULL, lease_expires_at = NULL, updated_at = ?
+            WHERE status = 'leased' AND lease_expires_at < ?
+            """,
+            (max_attempts, now, now),
+        )
+
+    def lease(self, worker_id: str, limit: int = 1, lease_seconds: float = 300, max_attempts: int = 3) -> list:
+        now = time.time()
+        conn = self._transaction()
+        try:
+            self._reclaim_expired(conn, now, max_attempts)
+            rows = conn.execute(
+                "SELECT id, file_path, benchmark_name, attempts FROM jobs WHERE status = 'pending' ORDER BY id LIMIT ?",
+                (max(1, limit),),
+            ).fetchall()
+            conn.executemany(
+                """
+                UPDATE jobs SET status = 'leased', worker_id = ?, lease_expires_at = ?, attempts = attempts + 1, updated_at = ?
+                WHERE id = ?
+                """,
+                [(worker_id, now + lease_seconds, now, row[0]) for row in rows],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [Job(id=row[0], file_path=row[1], benchmark_name=row[2], attempts=row[3] + 1) for row in rows]
+
+    def heartbeat(self, job_ids, worker_id: str, lease_seconds: float = 300) -> set:
+        """lease를 연장하고, 아직 이 worker가 가지고 있는 작업 ID 집합을 반환합니다."""
+        job_ids = list(job_ids)
+        if not job_ids:
+            return set()
+        now = time.time()
+        conn = self._transaction()
+        try:
+            placeholders = ",".join("?" * len(job_ids))
+            conn.execute(
+                f"""
+                UPDATE jobs SET lease_expires_at = ?, updated_at = ?
+                WHERE id IN ({placeholders}) AND status = 'leased' AND worker_id = ?
+                """,
+                (now + lease_seconds, now, *job_ids, worker_id),
+            )
+            owned = {
+                row[0] for row in conn.execute(
+                    f"SELECT id FROM jobs WHERE id IN ({placeholders}) AND status = 'leased' AND worker_id = ?",
+                    (*job_ids, worker_id),
+                )
+            }
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return owned
+
+    def _finish(self, job_id: int, worker_id: str, status_sql: str, params: tuple) -> bool:
+        conn = self._connection()
+        cursor = conn.execute(
+            f"""
+            UPDATE jobs SET {status_sql}, worker_id = NULL, lease_expires_at = NULL, updated_at = ?
+            WHERE id = ? AND status = 'leased' AND worker_id = ?
+            """,
+            (*params, time.time(), job_id, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str) -> bool:
+        """lease를 가진 worker만 완료 처리할 수 있습니다. 이미 회수된 작업이면 False"""
+        return self._finish(job_id, worker_id, "status = 'done', error = NULL", ())
+
+    def fail(self, job_id: int, worker_id: str, error: str, max_attempts: int = 3) -> bool:
+        """시도 횟수가 남았으면 다시 대기 상태로, 아니면 실패로 확정합니다."""
+        return self._finish(
+            job_id,
+            worker_id,
+            "status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, error = ?",
+            (max_attempts, str(error)[:2000]),
+        )
+
+    def stats(self) -> dict:
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        for status, count in self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+            counts[status] = count
+        return counts
+
+    def file_paths(self, status: Optional[str] = None) -> list:
+        if status is None:
+            rows = self._connection().execute("SELECT file_path FROM jobs ORDER BY id")
+        else:
+            rows = self._connection().execute("SELECT file_path FROM jobs WHERE status = ? ORDER BY id", (status,))
+        return [row[0] for row in rows]
+
+    def failures(self) -> list:
+        return [
+            {"file_path": row[0], "attempts": row[1], "error": row[2]}
+            for row in self._connection().execute(
+                "SELECT file_path, attempts, error FROM jobs WHERE status = 'failed' ORDER BY id"
+            )
+        ]
@@ -0,0 +1,136 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Optional, Sequence
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+
+DEFAULT_LLM_CACHE_PATH = "./data/cache/llm_cache.sqlite"
+
+# 재시도 중에는 캐시된(검증에 실패한) 응답을 다시 받지 않도록 조회를 건너뜀
+_bypass_lookup = ContextVar("bypass_llm_cache_lookup", default=False)
+
+
+@contextmanager
+def bypass_llm_cache():
+    """이 블록(및 여기서 복사된 context의 스레드) 안의 LLM 호출은 캐시를 조회하지 않고, 새 응답으로 덮어씁니다."""
+    token = _bypass_lookup.set(True)
+    try:
+        yield
+    finally:
+        _bypass_lookup.reset(token)
+
+
+class SQLiteLLMCache(BaseCache):
+    """LLM 응답을 SQLite에 영구 저장하는 캐시입니다.
+
+    키는 렌더링된 메시지(prompt)와 llm_string(모델 이름 + 샘플링 파라미터)의 해시입니다.
+    스레드마다 별도 연결(WAL)을 사용하므로 여러 reader/writer가 동시에 접근할 수 있고,
+    전체 크기가 max_bytes를 넘으면 가장 오래 사용하지 않은 항목부터 지웁니다.
+    """
+
+    def __init__(self, path: str = DEFAULT_LLM_CACHE_PATH, max_bytes: int = 2 * 1024 ** 3, evict_every: int = 100):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.evict_every = evict_every
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        conn = self._connection()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed_at ON llm_cache (accessed_at)")
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self._counters[name] += n
+            return self._counters[name]
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        if _bypass_lookup.get():
+            self._count("misses")
+            return None
+        key = self._key(prompt, llm_string)
+        conn = self._connection()
+        row = conn.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+        try:
+            generations = [loads(item) for item in json.loads(row[0])]
+        except Exception:
+            self._count("misses")
+            return None
+        conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        conn.commit()
+        self._count("hits")
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        value = json.dumps([dumps(generation) for generation in return_val])
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, value, size, accessed_at) VALUES (?, ?, ?, ?)",
+            (self._key(prompt, llm_string), value, len(value), time.time()),
+        )
+        conn.commit()
+        if self._count("writes") % self.evict_every == 0:
+            self.evict()
+
+    def evict(self) -> int:
+        conn = self._connection()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        removed = 0
+        while total > self.max_bytes:
+            rows = conn.execute("SELECT key, size FROM llm_cache ORDER BY accessed_at LIMIT 100").fetchall()
+            if not rows:
+                break
+            conn.executemany("DELETE FROM llm_cache WHERE key = ?", [(key,) for key, _ in rows])
+            total -= sum(size for _, size in rows)
+            removed += len(rows)
+        conn.commit()
+        if removed:
+            self._count("evictions", removed)
+        return removed
+
+    def clear(self, **kwargs: Any) -> None:
+        conn = self._connection()
+        conn.execute("DELETE FROM llm_cache")
+        conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_serializer
 from typing import List, Tuple, ForwardRef
 
 
@@ -12,9 +12,18 @@ class Document(BaseModel):
     span: Tuple[int, int] = (0, 0)
     content: str = ""
     summary: str = ""
-    # dict 트리 구조를 보관하고, 리프는 Chunk 인스턴스로 치환하여 저장
+    # 목차/Chunk 트리를 만든 경로: "heading_parser"(규칙 기반) 또는 "llm"
+    structure_source: str = ""
+    # 재시도 후에도 실패한 단계 이름. 값이 있으면 이후 단계와 그래프 적재에서 제외
+    failed_stage: str = ""
+    # dict 트리 구조를 보관하고, 리프는 Chunk(또는 SpanChunk) 인스턴스로 치환하여 저장
     children: dict = Field(default_factory=dict)
 
+    @field_serializer("children")
+    def serialize_children(self, children: dict):
+        # SpanChunk도 Chunk와 같은 형태로 덤프 (내용 해시/캐시 키가 표현 방식과 무관하도록)
+        return {k: v.model_dump() if hasattr(v, "model_dump") else v for k, v in children.items()}
+
 
 class Chunk(BaseModel):
     name: str = ""
@@ -22,3 +31,74 @@ class Chunk(BaseModel):
     content: str = ""
     summary: str = ""
     children: List[ChunkRef] = []
+
+
+class SpanChunk:
+    """content를 따로 저장하지 않고 문서 본문(buffer)의 span만 가리키는 Chunk입니다.
+
+    - 리프 content는 접근할 때 buffer[span - base]를 잘라 만들고, 부모 content는 자식 content를 이어 붙여 만듦
+      (Chunk와 같은 값이지만 트리 레벨마다 본문을 다시 들고 있지 않음)
+    - base: buffer(Document.content, 본문)가 원문에서 시작하는 위치. span은 원문 기준 절대 좌표
+    - __slots__로 노드당 dict를 두지 않고, 모든 노드가 같은 buffer 문자열 하나를 참조
+    """
+
+    __slots__ = ("name", "span", "summary", "children", "_buffer", "_base")
+
+    def __init__(self, name: str = "", span=(0, 0), summary: str = "", children=None, buffer: str = "", base: int = 0):
+        self.name = name
+        self.span = tuple(span)
+        self.summary = summary
+        self.children = children if children is not None else []
+        self._buffer = buffer
+        self._base = base
+
+    @property
+    def content(self) -> str:
+        if self.children:
+            return "".join(child.content for child in self.children)
+        start, end = self.span[0] - self._base, self.span[1] - self._base
+        return self._buffer[start:end] if 0 <= start < end else ""
+
+    def model_dump(self) -> dict:
+        """Chunk.model_dump()와 같은 형태 (content 포함)"""
+        return {
+            "name": self.name,
+            "span": self.span,
+            "content": self.content,
+            "summary": self.summary,
+            "children": [child.model_dump() for child in self.children],
+        }
+
+    def compact_dump(self) -> dict:
+        """캐시 저장용: content 없이 이름/span/요약/자식만"""
+        return {
+            "name": self.name,
+            "span": list(self.span),
+            "summary": self.summary,
+            "children": [child.compact_dump() for child in self.children],
+        }
+
+    @classmethod
+    def from_dump(cls, data: dict, buffer: str, base: int = 0) -> "SpanChunk":
+        """compact_dump/model_dump 결과에서 복원합니다. (저장된 content는 무시하고 buffer를 참조)"""
+        return cls(
+            name=data.get("name", ""),
+            span=tuple(data.get("span", (0, 0))),
+            summary=data.get("summary", ""),
+            children=[cls.from_dump(child, buffer, base) for child in data.get("children", [])],
+            buffer=buffer,
+            base=base,
+        )
+
+    def to_chunk(self) -> Chunk:
+        """content를 실제 문자열로 가진 Chunk로 변환합니다."""
+        return Chunk(
+            name=self.name,
+            span=self.span,
+            content=self.content,
+            summary=self.summary,
+            children=[child.to_chunk() for child in self.children],
+        )
+
+    def __repr__(self) -> str:
+        return f"SpanChunk(name={self.name!r}, span={self.span}, children={len(self.children)})"
@@ -0,0 +1,62 @@
+import asyncio
+
+
+async def run_bottom_up(roots, get_children, process, max_concurrency: int = 16):
+    """여러 트리를 하나의 DAG로 보고, 자식이 모두 끝난 노드부터 비동기 워커 풀에서 처리합니다.
+
+    리프는 처음부터 준비 상태이고, 부모는 마지막 자식이 끝나는 즉시 큐에 들어갑니다.
+    레벨/문서 단위 배리어가 없으므로 전체 시간은 임계 경로에 가까워집니다.
+    """
+    nodes = []
+    parent_of = {}
+    remaining = {}
+    stack = list(roots)
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        children = list(get_children(node) or [])
+        remaining[id(node)] = len(children)
+        for child in children:
+            parent_of[id(child)] = node
+            stack.append(child)
+
+    total = len(nodes)
+    if total == 0:
+        return
+
+    ready = asyncio.Queue()
+    for node in nodes:
+        if remaining[id(node)] == 0:
+            ready.put_nowait(node)
+
+    num_workers = max(1, min(max_concurrency, total))
+    state = {"done": 0, "error": None}
+
+    def stop_workers():
+        for _ in range(num_workers):
+            ready.put_nowait(None)
+
+    async def worker():
+        while True:
+            node = await ready.get()
+            if node is None:
+                return
+            try:
+                await process(node)
+            except Exception as e:
+                if state["error"] is None:
+                    state["error"] = e
+                    stop_workers()
+                return
+            state["done"] += 1
+            parent = parent_of.get(id(node))
+            if parent is not None:
+                remaining[id(parent)] -= 1
+                if remaining[id(parent)] == 0:
+                    ready.put_nowait(parent)
+            if state["done"] == total:
+                stop_workers()
+
+    await asyncio.gather(*[worker() for _ in range(num_workers)])
+    if state["error"] is not None:
+        raise state["error"]
@@ -0,0 +1,51 @@
+import re
+from bisect import bisect_left
+from functools import lru_cache
+
+
+_LINE_PATTERN = re.compile(r"[^\n]*\S[^\n]*")
+
+
+class LineSegmentation:
+    """본문을 비어 있지 않은 줄 단위로 나누고 1부터 번호를 붙입니다.
+
+    줄 번호 → (start, end) 문자 오프셋 표를 보관하므로 LLM이 돌려준 줄 번호를 O(1)로 span으로 바꿀 수 있습니다.
+    """
+
+    def __init__(self, content: str):
+        self.content = content
+        self.starts = []
+        self.ends = []
+        for match in _LINE_PATTERN.finditer(content):
+            text = match.group()
+            self.starts.append(match.start() + len(text) - len(text.lstrip()))
+            self.ends.append(match.end() - (len(text) - len(text.rstrip())))
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def span(self, first_line: int, last_line: int):
+        """1부터 시작하는 줄 번호 구간 [first_line, last_line]의 (start, end) 오프셋"""
+        return self.starts[first_line - 1], self.ends[last_line - 1]
+
+    def line_range(self, start: int, end: int):
+        """시작 오프셋이 [start, end)에 있는 줄들의 (첫 줄 번호, 마지막 줄 번호). 없으면 (0, -1)"""
+        first = bisect_left(self.starts, start)
+        last = bisect_left(self.starts, end) - 1
+        if last < first:
+            return 0, -1
+        return first + 1, last + 1
+
+    def render(self, first_line: int = 1, last_line: int = None) -> str:
+        """"[줄 번호] 내용" 형식의 LLM 입력 텍스트"""
+        last_line = len(self) if last_line is None else last_line
+        return "\n".join(
+            f"[{i}] {self.content[self.starts[i - 1]:self.ends[i - 1]]}"
+            for i in range(max(1, first_line), last_line + 1)
+        )
+
+
+@lru_cache(maxsize=64)
+def segment_lines(content: str) -> LineSegmentation:
+    # 같은 본문은 단계/윈도우/벤치마크 실행 사이에서 한 번만 분할
+    return LineSegmentation(content)
@@ -0,0 +1,81 @@
+import os
+import gzip
+import json
+import hashlib
+from typing import Any, Optional
+
+
+DEFAULT_STAGE_CACHE_ROOT = "./data/cache/stages"
+
+
+def fingerprint(value: Any) -> str:
+    """dict/list/str/pydantic 모델 등을 순서가 고정된 JSON으로 직렬화해 해시합니다."""
+    if hasattr(value, "model_dump"):
+        value = value.model_dump()
+    elif hasattr(value, "pretty_repr"):
+        # ChatPromptTemplate: 메시지 템플릿 전체가 바뀌면 키도 바뀜
+        value = value.pretty_repr()
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def model_fingerprint(llm) -> str:
+    # 같은 프롬프트라도 모델/샘플링 파라미터가 다르면 결과가 달라지므로 키에 포함
+    return fingerprint(
+        {
+            "model": getattr(llm, "model_name", None) or getattr(llm, "model", None),
+            "temperature": getattr(llm, "temperature", None),
+            "max_tokens": getattr(llm, "max_tokens", None),
+        }
+    )
+
+
+class StageCache:
+    """단계(stage)별 출력을 문서 단위로 보관하는 content-addressed 캐시입니다.
+
+    키 = hash(단계 이름, 모델, 프롬프트, 문서 입력). 항목마다 gzip JSON 파일 하나를
+    ./data/cache/stages/<stage>/<key[:2]>/<key>.json.gz 에 두고, 요청된 항목만 읽습니다.
+    문서가 추가/수정되거나 프롬프트/모델이 바뀌면 해당 문서의 키만 달라집니다.
+    """
+
+    def __init__(self, stage: str, llm=None, prompt=None, root: str = DEFAULT_STAGE_CACHE_ROOT, enabled: bool = True):
+        self.stage = stage
+        self.directory = os.path.join(root, stage)
+        self.enabled = enabled
+        self._namespace = fingerprint(
+            {
+                "stage": stage,
+                "model": model_fingerprint(llm) if llm is not None else None,
+                "prompt": fingerprint(prompt) if prompt is not None else None,
+            }
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, *inputs) -> str:
+        return fingerprint([self._namespace, *[fingerprint(i) for i in inputs]])
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json.gz")
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 쓰는 도중 중단되어도 깨진 항목이 남지 않도록 임시 파일에 쓴 뒤 교체
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
@@ -0,0 +1,100 @@
+import re
+from dataclasses import dataclass, field
+from .embedding import estimate_tokens
+
+
+# 줄 맨 앞의 "ARTICLE I", "Article 5" 같은 조항 제목
+_ARTICLE_HEADING = re.compile(r"^[ \t]*ARTICLE[ \t]+(?:[IVXLCDM]+|\d+)\b", re.IGNORECASE | re.MULTILINE)
+# 목차에서 조항이 아닌 최상위 항목 (부속서 등)
+_NON_ARTICLE_KEY = re.compile(r"exhibit|annex|schedule|appendix", re.IGNORECASE)
+
+
+@dataclass
+class Window:
+    """본문의 [start, end) 구간. [own_start, own_end)가 이 윈도우가 소유하는(겹침 제외) 구간입니다."""
+    start: int
+    end: int
+    own_start: int
+    own_end: int
+    table_of_contents: dict = field(default_factory=dict)
+
+    def owns(self, position: int) -> bool:
+        return self.own_start <= position < self.own_end
+
+
+def find_article_boundaries(content: str) -> list:
+    return [match.start() for match in _ARTICLE_HEADING.finditer(content)]
+
+
+def _split_long_segment(content: str, start: int, end: int, max_chars: int) -> list:
+    # 조항 하나가 윈도우보다 길면 문단(빈 줄) → 줄 경계에서 자름
+    cuts = [start]
+    while end - cuts[-1] > max_chars:
+        lo, hi = cuts[-1] + max_chars // 2, cuts[-1] + max_chars
+        cut = content.rfind("\n\n", lo, hi)
+        if cut == -1:
+            cut = content.rfind("\n", lo, hi)
+        cuts.append(cut + 1 if cut != -1 else hi)
+    return cuts
+
+
+def _extend_to_newline(content: str, position: int, backward: bool, limit: int) -> int:
+    # 겹침 경계를 줄 경계로 맞추되, limit 글자 안에 줄바꿈이 없으면 그 위치를 그대로 사용
+    if backward:
+        cut = content.rfind("\n", max(0, position - limit), position)
+        return cut + 1 if cut != -1 else position
+    cut = content.find("\n", position, position + limit)
+    return cut + 1 if cut != -1 else position
+
+
+def plan_windows(content: str, table_of_contents: dict, max_tokens: int, overlap_tokens: int = 0) -> list:
+    """본문을 조항 경계에서 나눠 토큰 예산 안에 들어가는 겹치는 윈도우들로 만듭니다.
+
+    본문 전체가 예산 안이면 윈도우 하나(기존 동작)를 반환합니다. 조항 제목 수가 목차의 조항 수와
+    같으면 각 윈도우에 해당 조항의 목차만 전달하고, 아니면 전체 목차를 전달합니다.
+    """
+    table_of_contents = table_of_contents or {}
+    if estimate_tokens(content) <= max_tokens:
+        return [Window(0, len(content), 0, len(content), table_of_contents)]
+
+    max_chars = max_tokens * 4
+    overlap_chars = overlap_tokens * 4
+    headings = find_article_boundaries(content)
+
+    # 조항 단위 구간 → 너무 긴 조항은 다시 분할
+    boundaries = sorted({0, *headings})
+    cuts = []
+    for seg_start, seg_end in zip(boundaries, boundaries[1:] + [len(content)]):
+        cuts.extend(_split_long_segment(content, seg_start, seg_end, max_chars))
+
+    # 인접 구간을 예산 안에서 탐욕적으로 묶어 소유 구간을 정함
+    owned = []
+    current = cuts[0]
+    for prev, cut in zip(cuts, cuts[1:] + [len(content)]):
+        if cut - current > max_chars and prev > current:
+            owned.append((current, prev))
+            current = prev
+    owned.append((current, len(content)))
+
+    article_keys = [k for k in table_of_contents if not _NON_ARTICLE_KEY.search(str(k))]
+    other_keys = [k for k in table_of_contents if k not in article_keys]
+    use_sub_toc = len(headings) == len(article_keys) and len(owned) > 1
+
+    windows = []
+    for i, (own_start, own_end) in enumerate(owned):
+        start = _extend_to_newline(content, max(0, own_start - overlap_chars), backward=True, limit=overlap_chars)
+        end = _extend_to_newline(content, min(len(content), own_end + overlap_chars), backward=False, limit=overlap_chars)
+        if use_sub_toc:
+            # 소유 구간과 겹치는 조항 (긴 조항이 여러 윈도우로 나뉘면 각 윈도우에 같은 조항 목차 전달)
+            article_ends = headings[1:] + [len(content)]
+            keys = [
+                k for k, pos, article_end in zip(article_keys, headings, article_ends)
+                if pos < own_end and article_end > own_start
+            ]
+            if i == len(owned) - 1:
+                keys += other_keys
+            toc = {k: table_of_contents[k] for k in keys}
+        else:
+            toc = table_of_contents
+        windows.append(Window(start, end, own_start, own_end, toc))
+    return windows
@@ -0,0 +1,141 @@
+import sys
+import json
+import time
+import argparse
+import subprocess
+from langgraph.runtime import Runtime
+from generate_knowledge_graph.builder import document_stages, graph_db_writer, data_loader, neo4j_client, llm_cache
+from generate_knowledge_graph.pipeline import QueueWorker, build_context
+from generate_knowledge_graph.utils.job_queue import JobQueue, DEFAULT_JOB_QUEUE_PATH
+from generate import build_run_context
+from logger import setup_logger
+
+
+logger = setup_logger()
+
+
+def enqueue(args, job_queue: JobQueue) -> int:
+    """입력 문서를 작업 큐에 넣고, 인덱스/제약 조건(및 clear_database)을 한 번만 준비합니다."""
+    context = build_context(build_run_context(args))
+    file_paths = data_loader.select_file_paths(context)
+    added = job_queue.enqueue(file_paths, context.benchmark_name, reset=args.reset)
+    graph_db_writer.prepare(Runtime(context=context))
+    logger.info(f"작업 {added}건 추가 (입력 {len(file_paths)}건): {job_queue.stats()}")
+    return added
+
+
+def finalize(args, job_queue: JobQueue) -> int:
+    """모든 작업이 끝난 뒤 현재 입력 문서 목록(generate.py와 같은 선택)에 없는 문서를 그래프에서 삭제합니다.
+
+    큐가 일부 문서(dead-letter 재처리 등)로 채워졌더라도 큐 밖의 문서는 지우지 않고,
+    큐를 만든 뒤 벤치마크에서 빠진 문서는 삭제됩니다. (dead-letter 재처리 실행이면 삭제하지 않음)
+    """
+    counts = job_queue.stats()
+    if counts["pending"] or counts["leased"]:
+        logger.warning(f"처리 중인 작업이 남아 있어 삭제를 건너뜀: {counts}")
+        return 0
+    context = build_context(build_run_context(args))
+    deleted = graph_db_writer.finalize(data_loader.select_file_paths(context), Runtime(context=context))
+    failures = job_queue.failures()
+    if failures:
+        logger.warning(f"최종 실패 작업 {len(failures)}건: {failures}")
+    logger.info(f"삭제된 문서 {deleted}건, 작업 상태: {counts}")
+    return deleted
+
+
+def run_worker(args, job_queue: JobQueue) -> dict:
+    worker = QueueWorker(document_stages, graph_db_writer, data_loader, job_queue, worker_id=args.worker_id)
+    try:
+        return worker.run(
+            build_run_context(args),
+            jobs_per_lease=args.jobs_per_lease,
+            lease_seconds=args.lease_seconds,
+            max_attempts=args.max_attempts,
+            poll_seconds=args.poll_seconds,
+            wait=args.wait,
+        )
+    finally:
+        logger.info(f"LLM cache stats: {llm_cache.stats()}")
+
+
+def worker_command(args) -> list:
+    # coordinator가 같은 머신에서 띄우는 워커 프로세스 명령
+    return [
+        sys.executable, __file__,
+        "--queue-path", args.queue_path,
+        "--benchmark-name", args.benchmark_name,
+        "worker",
+        "--jobs-per-lease", str(args.jobs_per_lease),
+        "--lease-seconds", str(args.lease_seconds),
+        "--max-attempts", str(args.max_attempts),
+        "--poll-seconds", str(args.poll_seconds),
+        "--cpu-workers", str(args.cpu_workers),
+    ]
+
+
+def coordinate(args, job_queue: JobQueue):
+    """작업을 넣고 로컬 워커 프로세스를 띄운 뒤(다른 머신의 워커도 같은 큐를 사용 가능), 큐가 비면 finalize"""
+    enqueue(args, job_queue)
+    processes = [subprocess.Popen(worker_command(args)) for _ in range(args.workers)]
+    started = time.perf_counter()
+    try:
+        while True:
+            counts = job_queue.stats()
+            if counts["pending"] == 0 and counts["leased"] == 0:
+                break
+            logger.info(f"작업 상태: {counts} ({time.perf_counter() - started:.0f}s)")
+            time.sleep(args.poll_seconds)
+        for process in processes:
+            process.wait()
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+    finalize(args, job_queue)
+    logger.info(f"분산 적재 완료: {job_queue.stats()} ({time.perf_counter() - started:.1f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="작업 큐 기반 분산 적재 (coordinator/worker)")
+    parser.add_argument("--queue-path", default=DEFAULT_JOB_QUEUE_PATH, help="여러 머신에서 쓸 때는 공유 파일 시스템 경로")
+    parser.add_argument("--benchmark-name", default="maud")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    enqueue_parser = subparsers.add_parser("enqueue", help="문서 작업을 큐에 추가")
+    coordinator_parser = subparsers.add_parser("coordinator", help="작업 추가 + 로컬 워커 실행 + 완료 후 finalize")
+    worker_parser = subparsers.add_parser("worker", help="큐에서 작업을 가져와 처리")
+    subparsers.add_parser("status", help="작업 상태 출력")
+    subparsers.add_parser("finalize", help="입력 문서 목록(벤치마크 전체)에 없는 문서를 그래프에서 삭제")
+
+    for sub in (enqueue_parser, coordinator_parser):
+        sub.add_argument("--reset", action="store_true", help="이미 있는 작업(완료/실패 포함)도 다시 대기 상태로")
+        sub.add_argument("--retry-dead-letter", action="store_true", help="dead-letter 파일에 기록된 문서만 추가")
+    coordinator_parser.add_argument("--workers", type=int, default=2, help="이 머신에서 띄울 워커 프로세스 수")
+    for sub in (coordinator_parser, worker_parser):
+        sub.add_argument("--jobs-per-lease", type=int, default=1, help="한 번에 lease 받을 문서 수")
+        sub.add_argument("--lease-seconds", type=float, default=600, help="heartbeat 없이 이 시간이 지나면 작업 회수")
+        sub.add_argument("--max-attempts", type=int, default=3, help="작업별 최대 시도 횟수 (이후 failed)")
+        sub.add_argument("--poll-seconds", type=float, default=5)
+        sub.add_argument("--cpu-workers", type=int, default=1)
+    worker_parser.add_argument("--worker-id", default=None, help="기본은 hostname:pid")
+    worker_parser.add_argument("--wait", action="store_true", help="큐가 비어도 종료하지 않고 새 작업을 기다림")
+    args = parser.parse_args()
+
+    job_queue = JobQueue(args.queue_path)
+    try:
+        if args.command == "enqueue":
+            enqueue(args, job_queue)
+        elif args.command == "coordinator":
+            coordinate(args, job_queue)
+        elif args.command == "worker":
+            run_worker(args, job_queue)
+        elif args.command == "finalize":
+            finalize(args, job_queue)
+        else:
+            print(json.dumps({"stats": job_queue.stats(), "failed": job_queue.failures()}, ensure_ascii=False, indent=4))
+    finally:
+        neo4j_client.close()
+
+
+if __name__ == "__main__":
+    main()
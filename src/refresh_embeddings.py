@@ -0,0 +1,108 @@
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from langchain_openai import OpenAIEmbeddings
+from generate_knowledge_graph.utils.database import Neo4jConnection, vector_property_name
+from generate_knowledge_graph.utils.embedding import CachedEmbeddings
+from logger import setup_logger
+
+
+load_dotenv(override=True)
+
+logger = setup_logger()
+
+
+def backfill(neo4j_client: Neo4jConnection, embedding_model, property_name: str, page_size: int, write_batch_size: int) -> dict:
+    """property_name 벡터가 없는 노드를 페이지 단위로 읽어 임베딩하고 기록합니다. (중단 후 다시 실행하면 남은 노드만 처리)"""
+    stats = {"pages": 0, "nodes": 0}
+    # 페이지 N을 기록하는 동안 페이지 N+1을 읽고 임베딩
+    with ThreadPoolExecutor(max_workers=1) as writer:
+        pending = None
+        for targets in neo4j_client.iter_vector_targets(property_name, page_size=page_size):
+            vectors = embedding_model.embed_documents([text for _, _, text in targets])
+            if pending is not None:
+                pending.result()
+            pending = writer.submit(neo4j_client.write_vectors, targets, vectors, property_name, write_batch_size)
+            stats["pages"] += 1
+            stats["nodes"] += len(targets)
+            logger.info(f"{property_name}: {stats['nodes']}개 노드 임베딩 ({stats['pages']} 페이지)")
+        if pending is not None:
+            pending.result()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="기존 그래프의 summary/content를 새 임베딩 모델로 다시 임베딩하고, 완료되면 검색 도구를 새 벡터 속성으로 전환")
+    parser.add_argument("--model", default=None, help="새 임베딩 모델 이름 (--status만 볼 때는 생략 가능)")
+    parser.add_argument("--base-url", default=os.getenv("EMBEDDING_BASE_URL"))
+    parser.add_argument("--property", default=None, help="벡터 속성 이름 (기본은 모델 이름 기반: vector_<model>)")
+    parser.add_argument("--page-size", type=int, default=2000, help="한 번에 읽어 임베딩할 노드 수")
+    parser.add_argument("--write-batch-size", type=int, default=200, help="벡터 쓰기 트랜잭션 크기")
+    parser.add_argument("--max-passes", type=int, default=3, help="작업 중 새로 적재된 노드를 채우기 위한 최대 반복 횟수")
+    parser.add_argument("--previous-model", default=os.getenv("EMBEDDING_MODEL"), help="첫 전환일 때 기존 vector 속성을 만든 모델 이름")
+    parser.add_argument("--no-switch", action="store_true", help="임베딩만 채우고 검색 도구는 전환하지 않음")
+    parser.add_argument("--switch-only", action="store_true", help="이미 채운 속성으로 전환만 수행")
+    parser.add_argument("--force", action="store_true", help="벡터가 없는 노드가 남아 있어도 전환")
+    parser.add_argument("--status", action="store_true", help="활성 임베딩과 속성별 채움 상태만 출력")
+    args = parser.parse_args()
+
+    embedding_model = None
+    if args.model:
+        embedding_model = CachedEmbeddings(
+            OpenAIEmbeddings(base_url=args.base_url, model=args.model, api_key=os.getenv("EMBEDDING_API_KEY"))
+        )
+    neo4j_client = Neo4jConnection(
+        os.getenv("NEO4J_URI"),
+        os.getenv("NEO4J_USER"),
+        os.getenv("NEO4J_PASSWORD"),
+        embedding_model=embedding_model,
+    )
+    try:
+        active = neo4j_client.get_active_embedding()
+        if args.status or not args.model:
+            status = {"active": active or {"property": "vector", "model": args.previous_model}}
+            status["coverage"] = {status["active"]["property"]: neo4j_client.vector_coverage(status["active"]["property"])}
+            if args.model:
+                property_name = args.property or vector_property_name(args.model)
+                status["coverage"][property_name] = neo4j_client.vector_coverage(property_name)
+            print(json.dumps(status, ensure_ascii=False, indent=4, default=str))
+            return
+
+        property_name = args.property or vector_property_name(args.model)
+        if active.get("property") == property_name and active.get("model") == args.model:
+            logger.info(f"{args.model}({property_name})가 이미 활성 임베딩입니다. 남은 노드만 채웁니다.")
+        dimensions = neo4j_client.embedding_dimensions(property_name, embedding_model=embedding_model)
+        report = {"model": args.model, "property": property_name, "dimensions": dimensions, "nodes": 0, "pages": 0}
+        started = time.perf_counter()
+
+        if not args.switch_only:
+            # 새 속성 전용 인덱스 (기존 속성/인덱스는 전환 전까지 그대로 검색에 사용)
+            neo4j_client.setup_vector_indexes(property_name, dimensions)
+            for _ in range(max(1, args.max_passes)):
+                stats = backfill(neo4j_client, embedding_model, property_name, args.page_size, args.write_batch_size)
+                report["nodes"] += stats["nodes"]
+                report["pages"] += stats["pages"]
+                if neo4j_client.vector_coverage(property_name)["missing"] == 0:
+                    break
+        report["coverage"] = neo4j_client.vector_coverage(property_name)
+        report["embedding_seconds"] = time.perf_counter() - started
+
+        if args.no_switch:
+            logger.info(f"전환하지 않음 (--no-switch): {report}")
+        elif report["coverage"]["missing"] and not args.force:
+            logger.warning(f"벡터가 없는 노드 {report['coverage']['missing']}개가 남아 있어 전환하지 않음 (--force로 강제 전환)")
+        else:
+            neo4j_client.switch_active_embedding(property_name, args.model, dimensions, legacy_model=args.previous_model)
+            report["switched"] = True
+            logger.info(f"검색 도구를 {property_name}({args.model})로 전환. 생성 파이프라인도 EMBEDDING_MODEL={args.model}로 바꿔야 새 문서가 이 속성에 기록됩니다.")
+        report["previous"] = active
+        print(json.dumps(report, ensure_ascii=False, indent=4, default=str))
+    finally:
+        neo4j_client.close()
+
+
+if __name__ == "__main__":
+    main()
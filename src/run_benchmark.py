@@ -1,13 +1,14 @@
 import os
 import random
 import json
+import argparse
 from tqdm.auto import tqdm
 from datetime import datetime
 from dotenv import load_dotenv
 import asyncio
 from langchain_core.messages import HumanMessage
 from langfuse.langchain import CallbackHandler
-from search_knowledge_graph import agent
+from search_knowledge_graph import agent, retriever, reranking_retriever
 from search_knowledge_graph.state import State
 
 from legalbenchrag.legalbenchrag.benchmark_types import (
@@ -61,13 +62,30 @@ async def pred(benchmark):
     responses = await agent.abatch(inputs, context=context, config=configs)
     progress_bar.close()
 
-    qa_results = []
-    for test_data, response in zip(benchmark.tests, responses):
+    response_tool_results = []
+    for response in responses:
         response_tool_result = []
         for message in response['messages']:
             if message.type == "tool" and message.name == "ResponseTool":
                 response_tool_result.extend(json.loads(message.content))
+        response_tool_results.append(response_tool_result)
+    return to_benchmark_result(benchmark, response_tool_results)
+
+
+async def pred_with_retriever(benchmark, search_retriever):
+    progress_bar = tqdm(total=len(benchmark.tests), desc="searching...")
+    response_tool_results = await search_retriever.abatch(
+        [test_data.query for test_data in benchmark.tests],
+        max_concurrency=8,
+        progress_bar=progress_bar,
+    )
+    progress_bar.close()
+    return to_benchmark_result(benchmark, response_tool_results)
+
 
+def to_benchmark_result(benchmark, response_tool_results):
+    qa_results = []
+    for test_data, response_tool_result in zip(benchmark.tests, response_tool_results):
         retrieved_snippets = []
         for i, chunk_info in enumerate(response_tool_result):
             retrieved_snippets.append(
@@ -84,7 +102,7 @@ async def pred(benchmark):
                 retrieved_snippets=retrieved_snippets,
             )
         )
-    return BenchmarkResult(qa_result_list=qa_results, weights=[1.0] * len(responses))
+    return BenchmarkResult(qa_result_list=qa_results, weights=[1.0] * len(response_tool_results))
 
 
 def load_data():
@@ -120,8 +138,22 @@ def load_data():
 
 
 async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--mode",
+        choices=["agent", "vector", "vector-rerank"],
+        default="agent",
+        help="agent: ReAct LLM 탐색, vector: 벡터 트리 빔 탐색, vector-rerank: 빔 탐색 후 LLM 재정렬",
+    )
+    args = parser.parse_args()
+
     benchmark = load_data()
-    benchmark_result = await pred(benchmark)
+    if args.mode == "vector":
+        benchmark_result = await pred_with_retriever(benchmark, retriever)
+    elif args.mode == "vector-rerank":
+        benchmark_result = await pred_with_retriever(benchmark, reranking_retriever)
+    else:
+        benchmark_result = await pred(benchmark)
 
     result_path = f"{BENCHMARK_RESULT_DIR}/{datetime.now().strftime('%Y%m%d_%H%M%S')}"
     os.makedirs(result_path, exist_ok=True)
@@ -130,6 +162,7 @@ async def main():
         f.write(benchmark_result.model_dump_json(indent=4))
     
     summary = {
+        "mode": args.mode,
         "average_precision": benchmark_result.avg_precision,
         "average_recall": benchmark_result.avg_recall,
     }
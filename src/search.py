@@ -1,15 +1,20 @@
 from dotenv import load_dotenv
 import asyncio
 import json
+import argparse
 from langchain_core.messages import HumanMessage
 from langfuse.langchain import CallbackHandler
-from search_knowledge_graph import agent
+from search_knowledge_graph import agent, retriever, reranking_retriever
 from search_knowledge_graph.state import State
 
 load_dotenv(override=True)
 
 
 async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["agent", "vector", "vector-rerank"], default="agent")
+    args = parser.parse_args()
+
     langfuse_handler = CallbackHandler()
     
     input = {
@@ -26,11 +31,15 @@ async def main():
         "max_execute_tool_count": 15
     }
     config = {"callbacks": [langfuse_handler], "metadata": {"langfuse_tags": ["search"]}, "recursion_limit": 100}
-    result = await agent.ainvoke(input, context=context, config=config)
-    response_tool_result = []
-    for message in result['messages']:
-        if message.type == "tool" and message.name == "ResponseTool":
-            response_tool_result.extend(json.loads(message.content))
+    if args.mode == "agent":
+        result = await agent.ainvoke(input, context=context, config=config)
+        response_tool_result = []
+        for message in result['messages']:
+            if message.type == "tool" and message.name == "ResponseTool":
+                response_tool_result.extend(json.loads(message.content))
+    else:
+        search_retriever = retriever if args.mode == "vector" else reranking_retriever
+        response_tool_result = await search_retriever.aretrieve(input["messages"][0].content)
 
     retrieved_snippets = []
     for i, chunk_info in enumerate(response_tool_result):
@@ -1,37 +1,80 @@
 import os
 from dotenv import load_dotenv
 from langchain_openai import OpenAIEmbeddings
-from neo4j import GraphDatabase
+from neo4j import GraphDatabase, AsyncGraphDatabase
+from generate_knowledge_graph.utils.embedding import CachedEmbeddings
 from .agent import ReactAgent
+from .vector_cache import ChildVectorCache, ActiveEmbeddings, CompactSpec
+from .retriever import VectorTreeRetriever, LLMReranker
 from .tools import *
 
 load_dotenv(override=True)
 
 
-embedding_model = OpenAIEmbeddings(
-    base_url=os.getenv("EMBEDDING_BASE_URL"),
-    model=os.getenv("EMBEDDING_MODEL"),
-    api_key=os.getenv("EMBEDDING_API_KEY")
-)
 neo4j_driver = GraphDatabase.driver(
     os.getenv("NEO4J_URI"),
     auth=(os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD"))
 )
+# agent.abatch의 동시 실행이 이벤트 루프를 막지 않도록 도구는 비동기 드라이버를 공유
+async_neo4j_driver = AsyncGraphDatabase.driver(
+    os.getenv("NEO4J_URI"),
+    auth=(os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD")),
+    max_connection_pool_size=int(os.getenv("NEO4J_MAX_CONNECTION_POOL_SIZE", "100")),
+    connection_acquisition_timeout=float(os.getenv("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", "60")),
+)
+# 압축 벡터 1차 점수 (SEARCH_COMPACT_DTYPE=int8|float16일 때만). 운영점은 src/benchmark_compact_vectors.py 결과로 선택
+compact_spec = None
+if os.getenv("SEARCH_COMPACT_DTYPE"):
+    compact_spec = CompactSpec(
+        dims=int(os.getenv("SEARCH_COMPACT_DIMS", "0")) or None,
+        dtype=os.getenv("SEARCH_COMPACT_DTYPE"),
+        rescore_factor=int(os.getenv("SEARCH_COMPACT_RESCORE_FACTOR", "4")),
+        keep_full=os.getenv("SEARCH_COMPACT_KEEP_FULL") == "1",
+    )
+# 자식 벡터 행렬 캐시 (SEARCH_VECTOR_CACHE_WARMUP=1이면 시작 시 미리 적재)
+vector_cache = ChildVectorCache(neo4j_driver, async_neo4j_driver=async_neo4j_driver, compact=compact_spec)
+if os.getenv("SEARCH_VECTOR_CACHE_WARMUP") == "1":
+    vector_cache.warm_up()
+
+
+def build_embedding_model(model_name: str):
+    # 생성 파이프라인과 같은 임베딩 캐시를 공유
+    return CachedEmbeddings(
+        OpenAIEmbeddings(
+            base_url=os.getenv("EMBEDDING_BASE_URL"),
+            model=model_name,
+            api_key=os.getenv("EMBEDDING_API_KEY")
+        )
+    )
+
+
+# 쿼리는 (:Meta {id: 'embedding'})의 활성 모델로 임베딩 (전환 전/Meta가 없으면 EMBEDDING_MODEL)
+embedding_model = ActiveEmbeddings(vector_cache, build_embedding_model, os.getenv("EMBEDDING_MODEL"))
+
+model_kwargs = {
+    "base_url": os.getenv("LLM_BASE_URL"),
+    "model": os.getenv("LLM_MODEL"),
+    # "model": os.getenv("REASONING_LLM_MODEL"),
+    # "temperature": 0.1,
+    "api_key": os.getenv("LLM_API_KEY")
+}
+
+response_tool = ResponseTool(neo4j_driver, async_neo4j_driver=async_neo4j_driver)
 
 agent = ReactAgent(
-    model_kwargs={
-        "base_url": os.getenv("LLM_BASE_URL"),
-        "model": os.getenv("LLM_MODEL"),
-        # "model": os.getenv("REASONING_LLM_MODEL"),
-        # "temperature": 0.1,
-        "api_key": os.getenv("LLM_API_KEY")
-    },
+    model_kwargs=model_kwargs,
     tools=[
-        SearchCorpusTool(neo4j_driver),
-        GetCorpusTOCTool(neo4j_driver),
-        SearchComponentTool(neo4j_driver, embedding_model),
-        SearchSubComponentTool(neo4j_driver, embedding_model),
-        # SearchNeighborChunkTool(neo4j_driver),
-        ResponseTool(neo4j_driver)
+        SearchCorpusTool(neo4j_driver, async_neo4j_driver=async_neo4j_driver),
+        GetCorpusTOCTool(neo4j_driver, async_neo4j_driver=async_neo4j_driver),
+        SearchComponentTool(neo4j_driver, embedding_model, vector_cache=vector_cache, async_neo4j_driver=async_neo4j_driver),
+        SearchSubComponentTool(neo4j_driver, embedding_model, vector_cache=vector_cache, async_neo4j_driver=async_neo4j_driver),
+        # SearchNeighborChunkTool(neo4j_driver, async_neo4j_driver=async_neo4j_driver),
+        response_tool
     ]
 )
+
+# LLM 루프 없이 요약 벡터로 트리를 빔 탐색하는 저지연 검색기 (LLM은 선택적 재정렬에만 사용)
+retriever = VectorTreeRetriever(embedding_model, vector_cache, response_tool)
+reranking_retriever = VectorTreeRetriever(
+    embedding_model, vector_cache, response_tool, reranker=LLMReranker(model_kwargs)
+)
@@ -3,6 +3,7 @@ import asyncio
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import AIMessage, SystemMessage, ToolMessage
 from langchain_openai import ChatOpenAI
+from generate_knowledge_graph.utils.concurrency import rate_limited, llm_endpoint
 from langgraph.types import Command
 from langgraph.runtime import Runtime
 from langgraph.graph import StateGraph, START, END
@@ -17,9 +18,11 @@ class ReactAgent:
         return instance.graph
 
     def __init__(self, model_kwargs, tools):
-        llm = ChatOpenAI(**model_kwargs)
+        # SDK 내부 재시도를 끄고 429/Retry-After를 공용 limiter가 처리
+        llm = ChatOpenAI(**model_kwargs, max_retries=0)
         self.system_prompt = SystemMessage(content=SYSTEM_TEMPLATE)
-        self.llm_with_tools = llm.bind_tools(tools)
+        # 동시 실행되는 agent들이 같은 엔드포인트 허가를 나눠 씀
+        self.llm_with_tools = rate_limited(llm.bind_tools(tools), llm_endpoint(llm))
         self.tools_by_name = {tool.name: tool for tool in tools}
 
         workflow = StateGraph(State, context_schema=ContextSchema)
@@ -0,0 +1,111 @@
+import os
+import re
+import mmap
+import threading
+from bisect import bisect_left
+
+
+# 멀티바이트(UTF-8) 문자와 CRLF는 문자 오프셋과 바이트 오프셋을 어긋나게 만듦
+_SHIFT_PATTERN = re.compile(rb"[\x80-\xff]+|\r\n")
+
+
+class _MappedFile:
+    """파일 하나를 mmap으로 열고, 문자 오프셋(텍스트 모드 기준) <-> 바이트 오프셋 변환 인덱스를 유지합니다."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self.mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.char_positions = []
+        self.byte_positions = []
+        self.cum_extra = []
+        extra = 0
+        for match in _SHIFT_PATTERN.finditer(self.mm):
+            byte_pos = match.start()
+            if match.group() == b"\r\n":
+                # 텍스트 모드에서는 "\r\n"이 "\n" 한 글자로 읽힘
+                self.char_positions.append(byte_pos - extra)
+                self.byte_positions.append(byte_pos)
+                extra += 1
+                self.cum_extra.append(extra)
+                continue
+            for ch in match.group().decode("utf-8", errors="replace"):
+                width = len(ch.encode("utf-8"))
+                self.char_positions.append(byte_pos - extra)
+                self.byte_positions.append(byte_pos)
+                byte_pos += width
+                extra += width - 1
+                self.cum_extra.append(extra)
+
+    def char_to_byte(self, char_pos: int) -> int:
+        idx = bisect_left(self.char_positions, char_pos)
+        return char_pos + (self.cum_extra[idx - 1] if idx else 0)
+
+    def byte_to_char(self, byte_pos: int) -> int:
+        idx = bisect_left(self.byte_positions, byte_pos)
+        return byte_pos - (self.cum_extra[idx - 1] if idx else 0)
+
+    def text(self, start: int, end: int) -> str:
+        raw = self.mm[self.char_to_byte(start):self.char_to_byte(end)]
+        return raw.decode("utf-8", errors="replace").replace("\r\n", "\n").replace("\r", "\n")
+
+    def find(self, content: str):
+        if not content:
+            return None
+        needle = content.encode("utf-8")
+        byte_pos = self.mm.find(needle)
+        if byte_pos == -1 and "\n" in content:
+            needle = content.replace("\n", "\r\n").encode("utf-8")
+            byte_pos = self.mm.find(needle)
+        if byte_pos == -1:
+            return None
+        start = self.byte_to_char(byte_pos)
+        return start, self.byte_to_char(byte_pos + len(needle))
+
+    def close(self):
+        if isinstance(self.mm, mmap.mmap):
+            self.mm.close()
+        self._file.close()
+
+
+class CorpusStore:
+    """./data/corpus 아래 원문 파일을 프로세스당 한 번만 열어 공유하는 메모리 매핑 저장소입니다."""
+
+    def __init__(self, root: str = "./data/corpus"):
+        self.root = root
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def _get(self, file_path: str) -> _MappedFile:
+        mapped = self._files.get(file_path)
+        if mapped is None:
+            with self._lock:
+                mapped = self._files.get(file_path)
+                if mapped is None:
+                    mapped = _MappedFile(os.path.join(self.root, file_path))
+                    self._files[file_path] = mapped
+        return mapped
+
+    def text(self, file_path: str, span) -> str:
+        return self._get(file_path).text(int(span[0]), int(span[1]))
+
+    def find(self, file_path: str, content: str):
+        return self._get(file_path).find(content)
+
+    def close(self):
+        with self._lock:
+            for mapped in self._files.values():
+                mapped.close()
+            self._files.clear()
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_corpus_store(root: str = "./data/corpus") -> CorpusStore:
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None or _default_store.root != root:
+            _default_store = CorpusStore(root)
+        return _default_store
@@ -80,3 +80,21 @@ Your task is to use the available tools to identify exactly two lowest-level Sub
 - In SearchComponentTool and SearchSubComponentTool, actively leverage the TOC descriptions to craft effective search queries.
 - The final output must be grounded in the two spans obtained from ResponseTool.
 """
+
+
+RERANK_TEMPLATE = """You are a legal contract search expert.
+Given the user's question and candidate components retrieved from contracts, select the components that are needed to answer the question and order them from most to least relevant.
+
+<Question>
+{query}
+</Question>
+
+<Candidates>
+{candidates}
+</Candidates>
+
+Answer only in this format:
+```json
+{{"ranking": [candidate_index, ...]}}
+```
+"""
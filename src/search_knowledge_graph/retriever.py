@@ -0,0 +1,139 @@
+import re
+import json
+import asyncio
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from langchain_openai import ChatOpenAI
+from generate_knowledge_graph.utils.concurrency import rate_limited
+from .prompt import RERANK_TEMPLATE
+
+
+class LLMReranker:
+    """트리 하강으로 모은 후보 청크를 LLM 한 번 호출로 재정렬합니다 (선택 단계)."""
+
+    def __init__(self, model_kwargs):
+        prompt = ChatPromptTemplate.from_messages([("user", RERANK_TEMPLATE)])
+        # SDK 내부 재시도를 끄고 429/Retry-After를 공용 limiter가 처리
+        self.chain = prompt | rate_limited(ChatOpenAI(**model_kwargs, max_retries=0)) | StrOutputParser()
+
+    async def arerank(self, query, candidates):
+        lines = [
+            f"[{i}] {c.get('name', '')}: {(c.get('summary') or c.get('content') or '').strip()}"
+            for i, c in enumerate(candidates)
+        ]
+        text = await self.chain.ainvoke({"query": query, "candidates": "\n".join(lines)})
+        match = re.search(r"\{.*\}", text, re.DOTALL)
+        try:
+            ranking = json.loads(match.group(0))["ranking"] if match else []
+        except (json.JSONDecodeError, KeyError, TypeError):
+            ranking = []
+        ordered = []
+        for idx in ranking:
+            if isinstance(idx, int) and 0 <= idx < len(candidates) and candidates[idx] not in ordered:
+                ordered.append(candidates[idx])
+        # LLM 응답을 해석하지 못하면 벡터 점수 순서를 그대로 사용
+        return ordered or candidates
+
+
+class VectorTreeRetriever:
+    """요약 벡터만으로 Corpus → Chunk 계층(CHILD)을 빔 탐색하여 리프 청크의 file_path/span을 반환합니다.
+
+    ReAct agent와 달리 깊이마다 LLM을 호출하지 않으며, 반환 형식은 ResponseTool과 같습니다.
+    beam_widths[d]는 깊이 d(0=Corpus)에서 유지할 노드 수이며, 길이를 넘는 깊이는 마지막 값을 사용합니다.
+    """
+
+    HYDRATE_QUERY = """
+    MATCH (c:Chunk)
+    WHERE c.id IN $ids
+    RETURN c.id AS id,
+           c.name AS name,
+           CASE WHEN c.summary IS NULL OR c.summary = '' THEN c.content ELSE c.summary END AS summary
+    """
+
+    def __init__(
+        self,
+        embedding_model,
+        vector_cache,
+        response_tool,
+        beam_widths=(1, 3, 3, 2),
+        top_n: int = 2,
+        max_depth: int = 8,
+        reranker: LLMReranker = None,
+        rerank_candidates: int = 6,
+    ):
+        self.embedding_model = embedding_model
+        self.vector_cache = vector_cache
+        self.response_tool = response_tool
+        self.beam_widths = list(beam_widths)
+        self.top_n = top_n
+        self.max_depth = max_depth
+        self.reranker = reranker
+        self.rerank_candidates = rerank_candidates
+
+    def _beam_width(self, depth: int) -> int:
+        return self.beam_widths[min(depth, len(self.beam_widths) - 1)]
+
+    async def _descend(self, query_vector):
+        # 깊이 0: 모든 Corpus 중 상위 beam_widths[0]개
+        frontier = await self.vector_cache.atop_k(None, query_vector, self._beam_width(0))
+        leaves = []
+        for depth in range(1, self.max_depth + 1):
+            if not frontier:
+                break
+            width = self._beam_width(depth)
+            children = await asyncio.gather(
+                *[self.vector_cache.atop_k(node_id, query_vector, width) for node_id, _ in frontier]
+            )
+            candidates = []
+            for (node_id, score), node_children in zip(frontier, children):
+                if node_children:
+                    candidates.extend(node_children)
+                elif depth > 1:
+                    # 자식이 없는 Chunk는 리프 (Corpus는 결과가 될 수 없음)
+                    leaves.append((node_id, score))
+            frontier = sorted(candidates, key=lambda item: -item[1])[:width]
+        else:
+            # 최대 깊이에 도달하면 남은 frontier를 결과 후보로 사용
+            leaves.extend(frontier)
+        return sorted(leaves, key=lambda item: -item[1])
+
+    async def aretrieve(self, query: str):
+        query_vector = await self.embedding_model.aembed_query(query)
+        leaves = await self._descend(query_vector)
+        if not leaves:
+            return []
+
+        leaf_ids = [node_id for node_id, _ in leaves]
+        if self.reranker is not None:
+            candidate_ids = leaf_ids[: max(self.rerank_candidates, self.top_n)]
+            records = await self.response_tool.ainvoke({"sub_component_ids": candidate_ids})
+            summaries = await self._summaries(candidate_ids)
+            for record in records:
+                record["summary"] = summaries.get(record["id"], "")
+            records = await self.reranker.arerank(query, records)
+            for record in records:
+                record.pop("summary", None)
+            return records[: self.top_n]
+
+        return await self.response_tool.ainvoke({"sub_component_ids": leaf_ids[: self.top_n]})
+
+    async def _summaries(self, ids):
+        tool = self.response_tool
+        if tool.async_neo4j_driver is not None:
+            async with tool.async_neo4j_driver.session() as session:
+                result = await session.run(self.HYDRATE_QUERY, {"ids": ids})
+                return {record["id"]: record["summary"] async for record in result}
+        with tool.neo4j_driver.session() as session:
+            return {record["id"]: record["summary"] for record in session.run(self.HYDRATE_QUERY, {"ids": ids})}
+
+    async def abatch(self, queries, max_concurrency: int = 8, progress_bar=None):
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(query):
+            async with semaphore:
+                result = await self.aretrieve(query)
+            if progress_bar is not None:
+                progress_bar.update(1)
+            return result
+
+        return await asyncio.gather(*[run(query) for query in queries])
@@ -6,6 +6,7 @@ from langchain_core.callbacks import (
     AsyncCallbackManagerForToolRun,
     CallbackManagerForToolRun,
 )
+from .query import run_query, arun_query
 
 
 class GetCorpusTOCInput(BaseModel):
@@ -25,14 +26,15 @@ class GetCorpusTOCTool(BaseTool):
 
     # Dependencies
     neo4j_driver: Any = None
+    async_neo4j_driver: Any = None
 
     CYPHER_QUERY: ClassVar[str] = """
     MATCH (c:Corpus {id: $corpus_id})
     RETURN c.table_of_contents AS table_of_contents
     """
 
-    def __init__(self, neo4j_driver: Any):
-        super().__init__(neo4j_driver=neo4j_driver)
+    def __init__(self, neo4j_driver: Any, async_neo4j_driver: Any = None):
+        super().__init__(neo4j_driver=neo4j_driver, async_neo4j_driver=async_neo4j_driver)
 
     def _convert_toc_to_components(self, toc: Any) -> List[Dict[str, Any]]:
         # If already in target schema, return as is
@@ -105,26 +107,30 @@ class GetCorpusTOCTool(BaseTool):
         contract_id: str,
         run_manager: Optional[CallbackManagerForToolRun] = None,
     ) -> str:
-        with self.neo4j_driver.session() as session:
-            result = session.run(self.CYPHER_QUERY, {"corpus_id": contract_id})
-            record = result.single()
-            toc_raw = record["table_of_contents"] if record else None
-            toc_parsed = None
-            if isinstance(toc_raw, str):
-                try:
-                    toc_parsed = json.loads(toc_raw)
-                except Exception:
-                    toc_parsed = toc_raw
-            else:
+        records = run_query(self.neo4j_driver, self.CYPHER_QUERY, {"corpus_id": contract_id})
+        return self._build_result(contract_id, records)
+
+    def _build_result(self, contract_id: str, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        toc_raw = records[0]["table_of_contents"] if records else None
+        toc_parsed = None
+        if isinstance(toc_raw, str):
+            try:
+                toc_parsed = json.loads(toc_raw)
+            except Exception:
                 toc_parsed = toc_raw
-            converted_toc = self._convert_toc_to_components(toc_parsed)
-            return {"contract_id": contract_id, "table_of_contents": converted_toc}
+        else:
+            toc_parsed = toc_raw
+        converted_toc = self._convert_toc_to_components(toc_parsed)
+        return {"contract_id": contract_id, "table_of_contents": converted_toc}
 
     async def _arun(
         self,
         contract_id: str,
         run_manager: Optional[AsyncCallbackManagerForToolRun] = None
     ) -> str:
-        return self._run(contract_id)
+        if self.async_neo4j_driver is None:
+            return self._run(contract_id)
+        records = await arun_query(self.async_neo4j_driver, self.CYPHER_QUERY, {"corpus_id": contract_id})
+        return self._build_result(contract_id, records)
 
 
@@ -0,0 +1,14 @@
+from typing import Any, Optional
+
+
+def run_query(neo4j_driver: Any, query: str, params: Optional[dict] = None) -> list:
+    with neo4j_driver.session() as session:
+        results = session.run(query, params or {})
+        return [record.data() for record in results]
+
+
+async def arun_query(async_neo4j_driver: Any, query: str, params: Optional[dict] = None) -> list:
+    # neo4j.AsyncGraphDatabase 드라이버의 세션을 사용하므로 이벤트 루프를 막지 않음
+    async with async_neo4j_driver.session() as session:
+        results = await session.run(query, params or {})
+        return [record.data() async for record in results]
@@ -6,6 +6,8 @@ from langchain_core.callbacks import (
     AsyncCallbackManagerForToolRun,
     CallbackManagerForToolRun,
 )
+from ..corpus_store import get_corpus_store
+from .query import run_query, arun_query
 
 
 class ResponseInput(BaseModel):
@@ -25,17 +27,26 @@ class ResponseTool(BaseTool):
 
     # Dependency injection
     neo4j_driver: Any = None
+    async_neo4j_driver: Any = None
+    corpus_store: Any = None
+    # 저장된 span의 텍스트가 청크 content와 일치하는지 원문에서 확인 (불일치 시에만 원문 검색)
+    verify_spans: bool = True
 
     CYPHER_QUERY: str = (
         """
         MATCH (c:Chunk)
         WHERE c.id IN $sub_component_ids
-        RETURN c.file_path AS file_path, c.span AS span, c.name AS name, c.content AS content
+        RETURN c.id AS id, c.file_path AS file_path, c.span AS span, c.name AS name, c.content AS content
         """
     )
 
-    def __init__(self, neo4j_driver: Any):
-        super().__init__(neo4j_driver=neo4j_driver)
+    def __init__(self, neo4j_driver: Any, corpus_store: Any = None, verify_spans: bool = True, async_neo4j_driver: Any = None):
+        super().__init__(
+            neo4j_driver=neo4j_driver,
+            async_neo4j_driver=async_neo4j_driver,
+            corpus_store=corpus_store if corpus_store is not None else get_corpus_store(),
+            verify_spans=verify_spans
+        )
 
     def _run(
         self,
@@ -43,20 +54,31 @@ class ResponseTool(BaseTool):
         run_manager: Optional[CallbackManagerForToolRun] = None,
     ) -> str:
         # Query and then reorder results to match input order
-        with self.neo4j_driver.session() as session:
-            results = session.run(self.CYPHER_QUERY, {"sub_component_ids": sub_component_ids})
-            records = [record.data() for record in results]
+        records = run_query(self.neo4j_driver, self.CYPHER_QUERY, {"sub_component_ids": sub_component_ids})
+        return self._resolve_spans(self._reorder(records, sub_component_ids))
 
+    @staticmethod
+    def _reorder(records: List[Dict[str, Any]], sub_component_ids: List[str]) -> List[Dict[str, Any]]:
+        order = {chunk_id: i for i, chunk_id in enumerate(sub_component_ids)}
+        return sorted(records, key=lambda record: order.get(record['id'], len(order)))
+
+    def _resolve_spans(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         final_records = []
 
         for record in records:
-            with open(f"./data/corpus/{record['file_path']}", "r") as f:
-                contract_content = f.read()
-            start_index = contract_content.find(record['content'])
-            end_index = start_index + len(record['content'])
-            if start_index == -1 or end_index == -1:
+            span = record.get('span')
+            if not self.verify_spans and span:
+                record['span'] = [int(span[0]), int(span[1])]
+                final_records.append(record)
                 continue
-            record['span'] = [start_index, end_index]
+            # ingest 시 저장된 절대 span을 우선 사용하고, 원문과 다를 때만 content로 위치를 다시 찾음
+            if span and self.corpus_store.text(record['file_path'], span) == record['content']:
+                record['span'] = [int(span[0]), int(span[1])]
+            else:
+                found = self.corpus_store.find(record['file_path'], record['content'])
+                if found is None:
+                    continue
+                record['span'] = list(found)
             final_records.append(record)
 
         return final_records
@@ -66,6 +88,9 @@ class ResponseTool(BaseTool):
         sub_component_ids: List[str],
         run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
     ) -> str:
-        return self._run(sub_component_ids)
+        if self.async_neo4j_driver is None:
+            return self._run(sub_component_ids)
+        records = await arun_query(self.async_neo4j_driver, self.CYPHER_QUERY, {"sub_component_ids": sub_component_ids})
+        return self._resolve_spans(self._reorder(records, sub_component_ids))
 
 
@@ -6,6 +6,29 @@ from langchain_core.callbacks import (
     AsyncCallbackManagerForToolRun,
     CallbackManagerForToolRun,
 )
+from .query import run_query, arun_query
+
+
+def _order_by_rank(ranked, records):
+    records_by_id = {record.pop("id"): record for record in records}
+    return [records_by_id[child_id] for child_id, _ in ranked if child_id in records_by_id]
+
+
+def search_children_with_cache(neo4j_driver, vector_cache, hydrate_query, id, query_vector, top_k, similarity_threshold):
+    # 점수 계산은 메모리 내 행렬로 하고, Neo4j는 이름/요약 조회에만 사용
+    ranked = vector_cache.top_k(id, query_vector, top_k, similarity_threshold)
+    if not ranked:
+        return []
+    records = run_query(neo4j_driver, hydrate_query, {"ids": [child_id for child_id, _ in ranked]})
+    return _order_by_rank(ranked, records)
+
+
+async def asearch_children_with_cache(async_neo4j_driver, vector_cache, hydrate_query, id, query_vector, top_k, similarity_threshold):
+    ranked = await vector_cache.atop_k(id, query_vector, top_k, similarity_threshold)
+    if not ranked:
+        return []
+    records = await arun_query(async_neo4j_driver, hydrate_query, {"ids": [child_id for child_id, _ in ranked]})
+    return _order_by_rank(ranked, records)
 
 
 class SearchSubComponentInput(BaseModel):
@@ -31,11 +54,15 @@ class SearchSubComponentTool(BaseTool):
     embedding_model: Any = None
     top_k: int = 5
     similarity_threshold: float = 0.0
+    vector_cache: Any = None
+    async_neo4j_driver: Any = None
 
     CYPHER_QUERY: ClassVar[str] = """
+    OPTIONAL MATCH (e:Meta {id: 'embedding'})
+    WITH coalesce(e.property, 'vector') AS vector_property
     MATCH (n)-[:CHILD]->(c:Chunk)
-    WHERE (n:Corpus OR n:Chunk) AND n.id = $id AND c.vector IS NOT NULL
-    WITH c, gds.similarity.cosine(c.vector, $query_vector) AS score
+    WHERE (n:Corpus OR n:Chunk) AND n.id = $id AND c[vector_property] IS NOT NULL
+    WITH c, gds.similarity.cosine(c[vector_property], $query_vector) AS score
     WHERE score > $similarity_threshold
     RETURN c.id AS sub_component_id,
            c.name AS sub_component_name,
@@ -45,12 +72,24 @@ class SearchSubComponentTool(BaseTool):
     LIMIT $top_k
     """
 
-    def __init__(self, neo4j_driver: Any, embedding_model: Any, top_k: int = 5, similarity_threshold: float = 0.0):
+    HYDRATE_QUERY: ClassVar[str] = """
+    MATCH (c:Chunk)
+    WHERE c.id IN $ids
+    RETURN c.id AS id,
+           c.id AS sub_component_id,
+           c.name AS sub_component_name,
+           CASE WHEN c.summary IS NULL OR c.summary = '' THEN c.content ELSE c.summary END AS sub_component_summary,
+           c.leaf AS sub_component_leaf
+    """
+
+    def __init__(self, neo4j_driver: Any, embedding_model: Any, top_k: int = 5, similarity_threshold: float = 0.0, vector_cache: Any = None, async_neo4j_driver: Any = None):
         super().__init__(
             neo4j_driver=neo4j_driver,
             embedding_model=embedding_model,
             top_k=top_k,
-            similarity_threshold=similarity_threshold
+            similarity_threshold=similarity_threshold,
+            vector_cache=vector_cache,
+            async_neo4j_driver=async_neo4j_driver
         )
 
     def _run(
@@ -59,17 +98,19 @@ class SearchSubComponentTool(BaseTool):
         query: str,
         run_manager: Optional[CallbackManagerForToolRun] = None,
     ) -> str:
-        with self.neo4j_driver.session() as session:
-            params = {
-                "id": id,
-                "query_vector": self.embedding_model.embed_query(query),
-                "similarity_threshold": self.similarity_threshold,
-                "top_k": self.top_k
-            }
-
-            results = session.run(self.CYPHER_QUERY, params)
-            dict_results = [record.data() for record in results]
-            return dict_results
+        query_vector = self.embedding_model.embed_query(query)
+        if self.vector_cache is not None:
+            return search_children_with_cache(
+                self.neo4j_driver, self.vector_cache, self.HYDRATE_QUERY, id,
+                query_vector, self.top_k, self.similarity_threshold
+            )
+        params = {
+            "id": id,
+            "query_vector": query_vector,
+            "similarity_threshold": self.similarity_threshold,
+            "top_k": self.top_k
+        }
+        return run_query(self.neo4j_driver, self.CYPHER_QUERY, params)
 
     async def _arun(
         self,
@@ -77,7 +118,21 @@ class SearchSubComponentTool(BaseTool):
         query: str,
         run_manager: Optional[AsyncCallbackManagerForToolRun] = None
     ) -> str:
-        return self._run(id, query)
+        if self.async_neo4j_driver is None:
+            return self._run(id, query)
+        query_vector = await self.embedding_model.aembed_query(query)
+        if self.vector_cache is not None:
+            return await asearch_children_with_cache(
+                self.async_neo4j_driver, self.vector_cache, self.HYDRATE_QUERY, id,
+                query_vector, self.top_k, self.similarity_threshold
+            )
+        params = {
+            "id": id,
+            "query_vector": query_vector,
+            "similarity_threshold": self.similarity_threshold,
+            "top_k": self.top_k
+        }
+        return await arun_query(self.async_neo4j_driver, self.CYPHER_QUERY, params)
 
 
 
@@ -104,11 +159,15 @@ class SearchComponentTool(BaseTool):
     embedding_model: Any = None
     top_k: int = 5
     similarity_threshold: float = 0.0
+    vector_cache: Any = None
+    async_neo4j_driver: Any = None
 
     CYPHER_QUERY: ClassVar[str] = """
+    OPTIONAL MATCH (e:Meta {id: 'embedding'})
+    WITH coalesce(e.property, 'vector') AS vector_property
     MATCH (n)-[:CHILD]->(c:Chunk)
-    WHERE (n:Corpus OR n:Chunk) AND n.id = $id AND c.vector IS NOT NULL
-    WITH c, gds.similarity.cosine(c.vector, $query_vector) AS score
+    WHERE (n:Corpus OR n:Chunk) AND n.id = $id AND c[vector_property] IS NOT NULL
+    WITH c, gds.similarity.cosine(c[vector_property], $query_vector) AS score
     WHERE score > $similarity_threshold
     RETURN c.id AS component_id,
            c.name AS component_name,
@@ -117,12 +176,23 @@ class SearchComponentTool(BaseTool):
     LIMIT $top_k
     """
 
-    def __init__(self, neo4j_driver: Any, embedding_model: Any, top_k: int = 5, similarity_threshold: float = 0.0):
+    HYDRATE_QUERY: ClassVar[str] = """
+    MATCH (c:Chunk)
+    WHERE c.id IN $ids
+    RETURN c.id AS id,
+           c.id AS component_id,
+           c.name AS component_name,
+           CASE WHEN c.summary IS NULL OR c.summary = '' THEN c.content ELSE c.summary END AS component_summary
+    """
+
+    def __init__(self, neo4j_driver: Any, embedding_model: Any, top_k: int = 5, similarity_threshold: float = 0.0, vector_cache: Any = None, async_neo4j_driver: Any = None):
         super().__init__(
             neo4j_driver=neo4j_driver,
             embedding_model=embedding_model,
             top_k=top_k,
-            similarity_threshold=similarity_threshold
+            similarity_threshold=similarity_threshold,
+            vector_cache=vector_cache,
+            async_neo4j_driver=async_neo4j_driver
         )
 
     def _run(
@@ -131,17 +201,19 @@ class SearchComponentTool(BaseTool):
         query: str,
         run_manager: Optional[CallbackManagerForToolRun] = None,
     ) -> str:
-        with self.neo4j_driver.session() as session:
-            params = {
-                "id": id,
-                "query_vector": self.embedding_model.embed_query(query),
-                "similarity_threshold": self.similarity_threshold,
-                "top_k": self.top_k
-            }
-
-            results = session.run(self.CYPHER_QUERY, params)
-            dict_results = [record.data() for record in results]
-            return dict_results
+        query_vector = self.embedding_model.embed_query(query)
+        if self.vector_cache is not None:
+            return search_children_with_cache(
+                self.neo4j_driver, self.vector_cache, self.HYDRATE_QUERY, id,
+                query_vector, self.top_k, self.similarity_threshold
+            )
+        params = {
+            "id": id,
+            "query_vector": query_vector,
+            "similarity_threshold": self.similarity_threshold,
+            "top_k": self.top_k
+        }
+        return run_query(self.neo4j_driver, self.CYPHER_QUERY, params)
 
     async def _arun(
         self,
@@ -149,4 +221,18 @@ class SearchComponentTool(BaseTool):
         query: str,
         run_manager: Optional[AsyncCallbackManagerForToolRun] = None
     ) -> str:
-        return self._run(id, query)
+        if self.async_neo4j_driver is None:
+            return self._run(id, query)
+        query_vector = await self.embedding_model.aembed_query(query)
+        if self.vector_cache is not None:
+            return await asearch_children_with_cache(
+                self.async_neo4j_driver, self.vector_cache, self.HYDRATE_QUERY, id,
+                query_vector, self.top_k, self.similarity_threshold
+            )
+        params = {
+            "id": id,
+            "query_vector": query_vector,
+            "similarity_threshold": self.similarity_threshold,
+            "top_k": self.top_k
+        }
+        return await arun_query(self.async_neo4j_driver, self.CYPHER_QUERY, params)
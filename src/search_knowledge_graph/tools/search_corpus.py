@@ -6,6 +6,7 @@ from langchain_core.callbacks import (
     AsyncCallbackManagerForToolRun,
     CallbackManagerForToolRun,
 )
+from .query import run_query, arun_query
 
 
 class SearchCorpusTool(BaseTool):
@@ -19,6 +20,7 @@ class SearchCorpusTool(BaseTool):
 
     # 필요한 의존성 주입
     neo4j_driver: Any = None
+    async_neo4j_driver: Any = None
 
     CYPHER_QUERY: ClassVar[str] = """
     MATCH (c:Corpus)
@@ -26,9 +28,10 @@ class SearchCorpusTool(BaseTool):
     ORDER BY c.name
     """
 
-    def __init__(self, neo4j_driver: Any):
+    def __init__(self, neo4j_driver: Any, async_neo4j_driver: Any = None):
         super().__init__(
-            neo4j_driver=neo4j_driver
+            neo4j_driver=neo4j_driver,
+            async_neo4j_driver=async_neo4j_driver
         )
 
     def _run(
@@ -36,14 +39,14 @@ class SearchCorpusTool(BaseTool):
         run_manager: Optional[CallbackManagerForToolRun] = None,
         **kwargs: Any
     ) -> str:
-        with self.neo4j_driver.session() as session:
-            results = session.run(self.CYPHER_QUERY)
-            dict_results = [record.data() for record in results]
-            return dict_results
+        return run_query(self.neo4j_driver, self.CYPHER_QUERY)
 
     async def _arun(
         self, 
         run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
         **kwargs: Any
     ) -> str:
-        return self._run(**kwargs) 
+        if self.async_neo4j_driver is None:
+            return self._run(**kwargs)
+        return await arun_query(self.async_neo4j_driver, self.CYPHER_QUERY)
+
@@ -6,6 +6,7 @@ from langchain_core.callbacks import (
     AsyncCallbackManagerForToolRun,
     CallbackManagerForToolRun,
 )
+from .query import run_query, arun_query
 
 
 class SearchNeighborChunkInput(BaseModel):
@@ -26,6 +27,7 @@ class SearchNeighborChunkTool(BaseTool):
 
     # Dependency injection
     neo4j_driver: Any = None
+    async_neo4j_driver: Any = None
 
     CYPHER_QUERY: ClassVar[str] = """
     MATCH (c:Chunk {id: $chunk_id})-[:NEXT]->(nb:Chunk)
@@ -39,25 +41,25 @@ class SearchNeighborChunkTool(BaseTool):
            CASE WHEN nb.summary IS NULL OR nb.summary = '' THEN nb.content ELSE nb.summary END AS summary
     """
 
-    def __init__(self, neo4j_driver: Any):
-        super().__init__(neo4j_driver=neo4j_driver)
+    def __init__(self, neo4j_driver: Any, async_neo4j_driver: Any = None):
+        super().__init__(neo4j_driver=neo4j_driver, async_neo4j_driver=async_neo4j_driver)
 
     def _run(
         self,
         section_id: str,
         run_manager: Optional[CallbackManagerForToolRun] = None,
     ) -> str:
-        with self.neo4j_driver.session() as session:
-            params = {"section_id": section_id}
-            results = session.run(self.CYPHER_QUERY, params)
-            dict_results = [record.data() for record in results]
-            return dict_results
+        params = {"section_id": section_id}
+        return run_query(self.neo4j_driver, self.CYPHER_QUERY, params)
 
     async def _arun(
         self,
         section_id: str,
         run_manager: Optional[AsyncCallbackManagerForToolRun] = None
     ) -> str:
-        return self._run(section_id)
+        if self.async_neo4j_driver is None:
+            return self._run(section_id)
+        params = {"section_id": section_id}
+        return await arun_query(self.async_neo4j_driver, self.CYPHER_QUERY, params)
 
 
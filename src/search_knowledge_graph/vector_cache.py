@@ -0,0 +1,380 @@
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+import numpy as np
+
+
+COMPACT_DTYPES = ("float16", "int8")
+
+
+@dataclass(frozen=True)
+class CompactSpec:
+    """1차 점수용 압축 벡터 설정.
+
+    - dims: 앞쪽 차원만 사용 (None이면 전체 차원). 잘라낸 벡터는 다시 정규화
+    - dtype: float16 또는 int8 (int8은 행별 scale = max|x| / 127)
+    - rescore_factor: top_k * rescore_factor개 후보를 full 벡터로 다시 점수 계산 (0이면 압축 점수를 그대로 사용)
+    - keep_full: True면 full 행렬도 메모리에 두고 재점수, False면 후보의 full 벡터만 Neo4j에서 읽음
+    """
+
+    dims: int = None
+    dtype: str = "int8"
+    rescore_factor: int = 4
+    keep_full: bool = False
+
+    def __post_init__(self):
+        if self.dtype not in COMPACT_DTYPES:
+            raise ValueError(f"지원하지 않는 압축 dtype: {self.dtype} ({', '.join(COMPACT_DTYPES)})")
+        if self.dims is not None and self.dims <= 0:
+            raise ValueError(f"dims는 양수여야 합니다: {self.dims}")
+
+
+class CompactMatrix:
+    """정규화된 float32 행렬을 잘라낸 차원 + 양자화 코드(+ 행별 scale)로 보관합니다."""
+
+    def __init__(self, matrix: np.ndarray, spec: CompactSpec):
+        self.dimensions = matrix.shape[1]
+        prefix = np.array(matrix[:, :spec.dims] if spec.dims else matrix, dtype=np.float32)
+        norms = np.linalg.norm(prefix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        prefix /= norms
+        self.prefix_dims = prefix.shape[1]
+        if spec.dtype == "int8":
+            scales = np.abs(prefix).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self.codes = np.rint(prefix / scales[:, None]).astype(np.int8)
+            self.scales = scales.astype(np.float32)
+        else:
+            self.codes = prefix.astype(np.float16)
+            self.scales = None
+        self.full = matrix if spec.keep_full else None
+
+    @property
+    def shape(self):
+        # 쿼리 차원 검사는 원래(full) 차원 기준
+        return self.codes.shape[0], self.dimensions
+
+    @property
+    def nbytes(self) -> int:
+        nbytes = self.codes.nbytes
+        if self.scales is not None:
+            nbytes += self.scales.nbytes
+        if self.full is not None:
+            nbytes += self.full.nbytes
+        return nbytes
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """정규화된 full 쿼리 벡터에 대한 근사 cosine 점수"""
+        prefix = query[:self.prefix_dims]
+        norm = np.linalg.norm(prefix)
+        if norm > 0:
+            prefix = prefix / norm
+        scores = self.codes.astype(np.float32) @ prefix
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+
+class ChildVectorCache:
+    """부모 노드별 자식 Chunk 벡터를 정규화된 float32 행렬로 메모리에 보관합니다.
+
+    - 부모 단위로 지연 로딩하거나 warm_up()으로 미리 적재
+    - max_bytes를 넘으면 가장 오래 사용하지 않은 부모부터 제거(LRU)
+    - 그래프 재적재 시 (:Meta {id: 'graph'}).version이 바뀌면 전체 무효화
+    - 벡터는 (:Meta {id: 'embedding'}).property가 가리키는 속성에서 읽음 (없으면 기존 vector 속성).
+      임베딩 모델 전환도 그래프 버전을 바꾸므로, 속성/모델(active_space)은 캐시 무효화와 같은 시점에 바뀜
+    - compact(CompactSpec)를 주면 압축 벡터로 1차 점수를 매기고, 상위 후보만 full 벡터로 재점수
+    """
+
+    LOAD_QUERY = """
+    MATCH (n)-[:CHILD]->(c:Chunk)
+    WHERE (n:Corpus OR n:Chunk) AND n.id = $id AND c[$property] IS NOT NULL
+    RETURN c.id AS id, c[$property] AS vector
+    """
+
+    # 루트(parent_id=None)의 "자식"은 벡터가 있는 Corpus 노드 전체
+    ROOT_QUERY = """
+    MATCH (co:Corpus)
+    WHERE co[$property] IS NOT NULL
+    RETURN co.id AS id, co[$property] AS vector
+    """
+    ROOT_KEY = "__root__"
+
+    WARMUP_QUERY = """
+    MATCH (n)-[:CHILD]->(c:Chunk)
+    WHERE (n:Corpus OR n:Chunk) AND c[$property] IS NOT NULL
+    RETURN n.id AS parent_id, collect(c.id) AS ids, collect(c[$property]) AS vectors
+    """
+
+    VERSION_QUERY = """
+    OPTIONAL MATCH (m:Meta {id: 'graph'})
+    OPTIONAL MATCH (e:Meta {id: 'embedding'})
+    RETURN m.version AS version, e.property AS property, e.model AS model
+    """
+    DEFAULT_PROPERTY = "vector"
+
+    # 압축 벡터 재점수용: 후보 노드의 full 벡터만 읽음 (루트의 자식은 Corpus, 그 외는 Chunk)
+    FULL_VECTOR_QUERY = """
+    MATCH (n:{label})
+    WHERE n.id IN $ids
+    RETURN n.id AS id, n[$property] AS vector
+    """
+
+    def __init__(self, neo4j_driver, max_bytes: int = 512 * 1024 * 1024, version_check_interval: float = 30.0, async_neo4j_driver=None, compact: CompactSpec = None):
+        self.neo4j_driver = neo4j_driver
+        self.async_neo4j_driver = async_neo4j_driver
+        self.max_bytes = max_bytes
+        self.version_check_interval = version_check_interval
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.RLock()
+        self._version = None
+        self._version_checked_at = 0.0
+        # 현재 검색에 쓰는 벡터 속성과 쿼리 임베딩 모델 (None이면 기본 모델)
+        self.vector_property = self.DEFAULT_PROPERTY
+        self.embedding_model_name = None
+        self.compact = compact
+
+    @staticmethod
+    def _normalized_matrix(vectors) -> np.ndarray:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        return matrix
+
+    def _build_entry(self, ids, vectors):
+        if not ids:
+            return tuple(), np.zeros((0, 0), dtype=np.float32)
+        matrix = self._normalized_matrix(vectors)
+        if self.compact is not None:
+            return tuple(ids), CompactMatrix(matrix, self.compact)
+        return tuple(ids), matrix
+
+    def _put(self, parent_id, entry):
+        with self._lock:
+            if parent_id in self._entries:
+                self._nbytes -= self._entries.pop(parent_id)[1].nbytes
+            self._entries[parent_id] = entry
+            self._nbytes += entry[1].nbytes
+            while self._nbytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    def _version_check_due(self) -> bool:
+        return time.monotonic() - self._version_checked_at >= self.version_check_interval
+
+    def _apply_version(self, record):
+        version = record["version"] if record else None
+        vector_property = (record["property"] if record else None) or self.DEFAULT_PROPERTY
+        with self._lock:
+            self._version_checked_at = time.monotonic()
+            self.embedding_model_name = record["model"] if record else None
+            if version != self._version or vector_property != self.vector_property:
+                self._version = version
+                self.vector_property = vector_property
+                self.invalidate()
+
+    def _check_version(self, session):
+        if self._version_check_due():
+            self._apply_version(session.run(self.VERSION_QUERY).single())
+
+    def active_space(self):
+        """(벡터 속성, 쿼리 임베딩 모델 이름)을 반환합니다. 확인 주기가 지났으면 Meta를 다시 읽음"""
+        if self._version_check_due():
+            with self.neo4j_driver.session() as session:
+                self._check_version(session)
+        return self.vector_property, self.embedding_model_name
+
+    async def aactive_space(self):
+        if self.async_neo4j_driver is None:
+            return self.active_space()
+        if self._version_check_due():
+            async with self.async_neo4j_driver.session() as session:
+                result = await session.run(self.VERSION_QUERY)
+                self._apply_version(await result.single())
+        return self.vector_property, self.embedding_model_name
+
+    def _lookup(self, parent_id):
+        with self._lock:
+            entry = self._entries.get(parent_id)
+            if entry is not None:
+                self._entries.move_to_end(parent_id)
+            return entry
+
+    def warm_up(self):
+        with self.neo4j_driver.session() as session:
+            self._check_version(session)
+            for record in session.run(self.WARMUP_QUERY, {"property": self.vector_property}):
+                self._put(record["parent_id"], self._build_entry(record["ids"], record["vectors"]))
+                if self._nbytes >= self.max_bytes:
+                    break
+
+    def get(self, parent_id):
+        with self.neo4j_driver.session() as session:
+            self._check_version(session)
+            key = self.ROOT_KEY if parent_id is None else parent_id
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry
+            query = self.ROOT_QUERY if parent_id is None else self.LOAD_QUERY
+            records = list(session.run(query, {"id": parent_id, "property": self.vector_property}))
+        entry = self._build_entry([r["id"] for r in records], [r["vector"] for r in records])
+        self._put(key, entry)
+        return entry
+
+    async def aget(self, parent_id):
+        if self.async_neo4j_driver is None:
+            return self.get(parent_id)
+        async with self.async_neo4j_driver.session() as session:
+            if self._version_check_due():
+                result = await session.run(self.VERSION_QUERY)
+                self._apply_version(await result.single())
+            key = self.ROOT_KEY if parent_id is None else parent_id
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry
+            query = self.ROOT_QUERY if parent_id is None else self.LOAD_QUERY
+            result = await session.run(query, {"id": parent_id, "property": self.vector_property})
+            records = [record async for record in result]
+        entry = self._build_entry([r["id"] for r in records], [r["vector"] for r in records])
+        self._put(key, entry)
+        return entry
+
+    @staticmethod
+    def _query(matrix, query_vector):
+        query = np.asarray(query_vector, dtype=np.float32)
+        if matrix.shape[1] != query.shape[0]:
+            # 임베딩 모델 전환 직후 이전 모델로 만든 쿼리 벡터: 차원이 달라 비교할 수 없음
+            return None
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        return query
+
+    @staticmethod
+    def _top(scores, top_k: int):
+        if top_k < len(scores):
+            top = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            top = np.arange(len(scores))
+        return top[np.argsort(-scores[top], kind="stable")]
+
+    @classmethod
+    def rank(cls, entry, query_vector, top_k: int, similarity_threshold: float = 0.0):
+        ids, matrix = entry
+        if not ids:
+            return []
+        query = cls._query(matrix, query_vector)
+        if query is None:
+            return []
+        scores = matrix.scores(query) if isinstance(matrix, CompactMatrix) else matrix @ query
+        top = cls._top(scores, top_k)
+        return [(ids[i], float(scores[i])) for i in top if scores[i] > similarity_threshold]
+
+    def _shortlist(self, entry, query_vector, top_k: int):
+        """재점수할 후보의 행 번호. 압축 행렬이 아니거나 재점수를 하지 않으면 None"""
+        ids, matrix = entry
+        if not isinstance(matrix, CompactMatrix) or not self.compact.rescore_factor or not ids:
+            return None
+        query = self._query(matrix, query_vector)
+        if query is None:
+            return []
+        return self._top(matrix.scores(query), top_k * self.compact.rescore_factor)
+
+    def _rescore_entry(self, entry, positions, records=None):
+        """후보의 full 벡터로 만든 (ids, 행렬). records가 있으면 Neo4j에서 읽은 벡터 사용"""
+        ids, matrix = entry
+        if records is None:
+            return tuple(ids[i] for i in positions), matrix.full[positions]
+        vectors = {r["id"]: r["vector"] for r in records if r["vector"] is not None}
+        # 목록을 읽은 뒤 삭제된 노드는 제외
+        found = [ids[i] for i in positions if ids[i] in vectors]
+        if not found:
+            return tuple(), np.zeros((0, 0), dtype=np.float32)
+        return tuple(found), self._normalized_matrix([vectors[node_id] for node_id in found])
+
+    def _full_vector_query(self, parent_id):
+        return self.FULL_VECTOR_QUERY.format(label="Corpus" if parent_id is None else "Chunk")
+
+    def _fetch_full(self, parent_id, entry, positions):
+        with self.neo4j_driver.session() as session:
+            return list(session.run(
+                self._full_vector_query(parent_id),
+                {"ids": [entry[0][i] for i in positions], "property": self.vector_property},
+            ))
+
+    async def _afetch_full(self, parent_id, entry, positions):
+        if self.async_neo4j_driver is None:
+            return self._fetch_full(parent_id, entry, positions)
+        async with self.async_neo4j_driver.session() as session:
+            result = await session.run(
+                self._full_vector_query(parent_id),
+                {"ids": [entry[0][i] for i in positions], "property": self.vector_property},
+            )
+            return [record async for record in result]
+
+    def top_k(self, parent_id, query_vector, top_k: int, similarity_threshold: float = 0.0):
+        """[(child_id, score), ...]를 점수 내림차순으로 반환합니다."""
+        entry = self.get(parent_id)
+        positions = self._shortlist(entry, query_vector, top_k)
+        if positions is None:
+            return self.rank(entry, query_vector, top_k, similarity_threshold)
+        if not len(positions):
+            return []
+        records = None if entry[1].full is not None else self._fetch_full(parent_id, entry, positions)
+        return self.rank(self._rescore_entry(entry, positions, records), query_vector, top_k, similarity_threshold)
+
+    async def atop_k(self, parent_id, query_vector, top_k: int, similarity_threshold: float = 0.0):
+        entry = await self.aget(parent_id)
+        positions = self._shortlist(entry, query_vector, top_k)
+        if positions is None:
+            return self.rank(entry, query_vector, top_k, similarity_threshold)
+        if not len(positions):
+            return []
+        records = None if entry[1].full is not None else await self._afetch_full(parent_id, entry, positions)
+        return self.rank(self._rescore_entry(entry, positions, records), query_vector, top_k, similarity_threshold)
+
+
+class ActiveEmbeddings:
+    """검색 쿼리를 현재 활성 임베딩 모델로 임베딩합니다.
+
+    모델 이름은 ChildVectorCache.active_space()에서 읽으므로, 모델 전환 시 벡터 속성과 쿼리 모델이 함께 바뀝니다.
+    factory(model_name)은 모델별 임베딩 객체(CachedEmbeddings)를 만들고, 모델마다 한 번만 호출됩니다.
+    """
+
+    def __init__(self, vector_cache: ChildVectorCache, factory, default_model: str):
+        self.vector_cache = vector_cache
+        self.factory = factory
+        self.default_model = default_model
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def model(self, model_name: str = None):
+        model_name = model_name or self.default_model
+        with self._lock:
+            if model_name not in self._models:
+                self._models[model_name] = self.factory(model_name)
+            return self._models[model_name]
+
+    def embed_query(self, text: str) -> list:
+        _, model_name = self.vector_cache.active_space()
+        return self.model(model_name).embed_query(text)
+
+    async def aembed_query(self, text: str) -> list:
+        _, model_name = await self.vector_cache.aactive_space()
+        return await self.model(model_name).aembed_query(text)
+
+    def embed_documents(self, texts: list) -> list:
+        _, model_name = self.vector_cache.active_space()
+        return self.model(model_name).embed_documents(texts)
+
+    async def aembed_documents(self, texts: list) -> list:
+        _, model_name = await self.vector_cache.aactive_space()
+        return await self.model(model_name).aembed_documents(texts)